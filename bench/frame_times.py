@@ -0,0 +1,403 @@
+# --- Frame-time benchmarks for the UI screens ---
+# Drives dashboard_screen and pick_rom_file_modal headlessly (SDL dummy
+# video driver) with scripted input and records how long every drawn frame
+# takes, at each SCALE:
+#   dashboard_tray_hover    mouse over each tray icon, long enough for the tooltip
+#   dashboard_notices       open the notices popup, hover its rows, close it
+#   dashboard_maximize      toggle maximize / restore
+#   rom_list_scroll         10k-entry ROM list: wheel, PgDn, type-ahead
+#
+# The screens run unmodified: main.FrameScheduler is swapped for a
+# subclass whose poll() hands out the script's events instead of blocking
+# and whose frame_done() records the frame time instead of capping the
+# frame rate, and pygame.mouse reports the script's pointer.  A frame is
+# poll() returning to frame_done().  Each scenario runs REPEATS times for
+# timings (figures are medians over the runs) and once more under
+# tracemalloc for per-frame allocations (peak bytes allocated while
+# drawing, and net memory blocks left behind).
+#
+# dashboard_maximize includes the dashboard's own 250 ms settle sleep after
+# each mode change; it shows up in p95 / p99 by design.
+#
+# HOME and the ROM roots point at a scratch directory, so the library
+# index, ident cache and projects of the user are never touched.
+#
+#   python -m bench.frame_times              compare with bench/baseline.json
+#   python -m bench.frame_times --update     record a new baseline
+#
+# Exits 1 when a timing or allocation figure regresses past the baseline
+# by more than the tolerance.
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+import numpy as np
+import pygame
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+BASELINE_VERSION = 1
+SCALES = (1, 2, 3)
+ROM_LIST_SIZE = 10000
+WARMUP_FRAMES = 3         # Cold frames (asset loads, first renders) are reported apart
+TOOLTIP_WAIT_MS = 400     # A little over the dashboard's tooltip delay
+REPEATS = 3               # Timing runs per scenario and scale (figures are medians)
+MAX_IDLE_POLLS = 1000     # Script ran out and the screen still has not exited
+
+# A figure regresses when it exceeds baseline * (1 + tolerance) + slack
+TIME_TOLERANCE = 0.25
+TIME_SLACK_MS = 0.5
+ALLOC_TOLERANCE = 0.25
+ALLOC_SLACK_KB = 16
+CHECKED = (("p50_ms", TIME_TOLERANCE, TIME_SLACK_MS), ("p95_ms", TIME_TOLERANCE, TIME_SLACK_MS),
+           ("p99_ms", TIME_TOLERANCE, TIME_SLACK_MS), ("alloc_kb_p95", ALLOC_TOLERANCE, ALLOC_SLACK_KB))
+
+
+# --- Scripted input ---
+class Step:
+    # One poll(): move the pointer (virtual 1x coords), then deliver events.
+    # events is a list of callables phys_pos -> pygame Event, since physical
+    # coordinates depend on the scale / window size at the time
+    def __init__(self, pos=None, events=(), wait_ms=0, buttons=(0, 0, 0)):
+        self.pos = pos
+        self.events = events
+        self.wait_ms = wait_ms
+        self.buttons = buttons
+
+
+def motion(phys):
+    return pygame.event.Event(pygame.MOUSEMOTION, pos=phys, rel=(0, 0), buttons=(0, 0, 0))
+
+
+def button(kind):
+    return lambda phys: pygame.event.Event(kind, pos=phys, button=1)
+
+
+def key(k, unicode=""):
+    return lambda phys: pygame.event.Event(pygame.KEYDOWN, key=k, mod=0, unicode=unicode, scancode=0)
+
+
+def text(s):
+    return lambda phys: pygame.event.Event(pygame.TEXTINPUT, text=s)
+
+
+def wheel(y):
+    return lambda phys: pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=y, flipped=False)
+
+
+def quit_event(phys):
+    return pygame.event.Event(pygame.QUIT)
+
+
+class Recorder:
+    def __init__(self, trace_allocations=False):
+        self.trace = trace_allocations
+        self.frames_ms = []
+        self.alloc_kb = []
+        self.blocks = 0
+
+
+class Pointer:
+    # Stands in for pygame.mouse while a scenario runs
+    def __init__(self):
+        self.pos = (0, 0)
+        self.buttons = (0, 0, 0)
+
+    def __enter__(self):
+        self._saved = pygame.mouse.get_pos, pygame.mouse.get_pressed
+        pygame.mouse.get_pos = lambda: self.pos
+        pygame.mouse.get_pressed = lambda num_buttons=3: self.buttons
+        return self
+
+    def __exit__(self, *exc):
+        pygame.mouse.get_pos, pygame.mouse.get_pressed = self._saved
+
+
+def to_physical(main, virt):
+    # Centre of the virtual pixel, in window coordinates (the dashboard centres
+    # its SCREEN_W x SCREEN_H * SCALE image in the window)
+    real_w, real_h = pygame.display.get_surface().get_size()
+    offset_x = (real_w - main.SCREEN_W * main.SCALE) // 2
+    offset_y = (real_h - main.SCREEN_H * main.SCALE) // 2
+    return (offset_x + virt[0] * main.SCALE + main.SCALE // 2,
+            offset_y + virt[1] * main.SCALE + main.SCALE // 2)
+
+
+def make_scheduler_class(main, script, recorder, pointer, finish):
+    class ScriptedScheduler(main.FrameScheduler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._started = None
+            self._idle = 0
+
+        def poll(self):
+            self.became_visible = False
+            if script:
+                step = script.pop(0)
+            else:
+                self._idle += 1
+                if self._idle > MAX_IDLE_POLLS:
+                    raise RuntimeError("screen did not exit at the end of the script")
+                step = Step(events=finish)
+            if step.wait_ms:
+                time.sleep(step.wait_ms / 1000)
+            pygame.event.pump()
+            if step.pos is not None:
+                pointer.pos = to_physical(main, step.pos)
+            pointer.buttons = step.buttons
+            events = [motion(pointer.pos)] if step.pos is not None else []
+            events += [make(pointer.pos) for make in step.events]
+            events += pygame.event.get()   # Whatever the screen posted itself
+            for event in events:
+                self._track_window(event)
+            self.redraw = True
+            self._deadline = None
+            if recorder.trace:
+                tracemalloc.reset_peak()
+                self._mem = tracemalloc.get_traced_memory()[0]
+                self._blocks = sys.getallocatedblocks()
+            self._started = time.perf_counter()
+            return events
+
+        def frame_done(self):
+            elapsed = time.perf_counter() - self._started
+            self.redraw = False
+            if recorder.trace:
+                recorder.alloc_kb.append((tracemalloc.get_traced_memory()[1] - self._mem) / 1024)
+                recorder.blocks += sys.getallocatedblocks() - self._blocks
+            else:
+                recorder.frames_ms.append(elapsed * 1000)
+
+    return ScriptedScheduler
+
+
+# --- Scenarios ---
+# Each returns (screen runner, script, events that make the screen exit).
+# Scripts open with an empty step: the dashboard only knows where the
+# pointer is once it has drawn a frame.
+def tray_icon_centres(main):
+    from core.asset_cache import get_image
+    tray_h = get_image("panel_traymenu_3slice.png").get_height()
+    icon_y = main.SCREEN_H - tray_h + (tray_h - 12) // 2
+    return [(7 + i * 21 + 6, icon_y + 6) for i in range(6)]
+
+
+def dashboard_runner(main, fonts, rom_path):
+    def run():
+        main.dashboard_screen(pygame.display.get_surface(), fonts["bold"][0], fonts["bold"][1],
+                              fonts["regular"][0], fonts["regular"][1], rom_path)
+    return run
+
+
+def scenario_tray_hover(main, fonts, rom_path):
+    script = [Step(), Step(pos=(main.SCREEN_W // 2, main.SCREEN_H // 2))]
+    for _ in range(3):
+        for centre in tray_icon_centres(main):
+            script.append(Step(pos=centre))
+            script.append(Step(pos=(centre[0] + 1, centre[1])))
+            script.append(Step(pos=(centre[0] + 1, centre[1]), wait_ms=TOOLTIP_WAIT_MS))
+        script.append(Step(pos=(main.SCREEN_W // 2, main.SCREEN_H // 2)))
+    return dashboard_runner(main, fonts, rom_path), script, [quit_event]
+
+
+def scenario_notices(main, fonts, rom_path):
+    button_pos = (main.SCREEN_W - 130 + 26, 12 + 8)
+    popup_x, popup_y = (main.SCREEN_W - 240) // 2, (main.SCREEN_H - 110) // 2
+    script = [Step(), Step(pos=(main.SCREEN_W // 2, 60))]
+    for _ in range(10):
+        script.append(Step(pos=button_pos))
+        for row in range(4):
+            script.append(Step(pos=(popup_x + 40, popup_y + 32 + row * 18 + 8)))
+        script.append(Step(pos=(popup_x + 40, popup_y + 32 + 8), events=[button(pygame.MOUSEBUTTONDOWN)]))
+        script.append(Step(pos=(main.SCREEN_W // 2, main.SCREEN_H - 40), events=[key(pygame.K_ESCAPE)]))
+    return dashboard_runner(main, fonts, rom_path), script, [quit_event]
+
+
+def scenario_maximize(main, fonts, rom_path):
+    # The window buttons sit in the top-right corner (see dashboard_screen)
+    max_pos = (main.SCREEN_W - 17 - 13 - 17 - 1 + 8, 12 + 8)
+    script = [Step(), Step(pos=(main.SCREEN_W // 2, 60))]
+    for _ in range(3):
+        for _ in range(2):   # Maximize, then restore
+            script.append(Step(pos=max_pos))
+            script.append(Step(pos=max_pos, events=[button(pygame.MOUSEBUTTONDOWN)], buttons=(1, 0, 0)))
+            script.append(Step(pos=max_pos, events=[button(pygame.MOUSEBUTTONUP)]))
+            script.append(Step(pos=(main.SCREEN_W // 2, 60)))
+    return dashboard_runner(main, fonts, rom_path), script, [quit_event]
+
+
+def scenario_rom_list(main, fonts, rom_path):
+    centre = (main.SCREEN_W // 2, main.SCREEN_H // 2)
+    script = [Step(), Step(pos=centre)]
+    script += [Step(pos=centre, events=[wheel(-1)]) for _ in range(40)]
+    script += [Step(pos=centre, events=[key(pygame.K_PAGEDOWN)]) for _ in range(40)]
+    script += [Step(pos=(centre[0], centre[1] + (i % 8) * 14 - 56)) for i in range(24)]
+    script += [Step(pos=centre, events=[text(c)]) for c in "rom 1"]
+    script += [Step(pos=centre, events=[key(pygame.K_BACKSPACE)]) for _ in range(5)]
+    script += [Step(pos=centre, events=[key(pygame.K_DOWN)]) for _ in range(20)]
+
+    def run():
+        surface = pygame.display.get_surface()
+        surface.fill((16, 16, 16))
+        main.pick_rom_file_modal(surface, fonts["bold"][0], fonts["bold"][1],
+                                 fonts["regular"][0], fonts["regular"][1])
+    return run, script, [key(pygame.K_ESCAPE)]
+
+
+SCENARIOS = {
+    "dashboard_tray_hover": scenario_tray_hover,
+    "dashboard_notices": scenario_notices,
+    "dashboard_maximize": scenario_maximize,
+    "rom_list_scroll": scenario_rom_list,
+}
+
+
+# --- Fixtures ---
+def make_fixtures(root):
+    # Scratch HOME, a 10k-entry ROM directory and one ROM for the dashboard
+    os.environ["HOME"] = os.path.join(root, "home")
+    roms = os.path.join(root, "roms")
+    os.makedirs(roms)
+    for i in range(ROM_LIST_SIZE):
+        open(os.path.join(roms, "rom %05d.sfc" % i), "wb").close()
+    os.environ["SUBPIXEL_ROM_ROOTS"] = roms
+    rom_path = os.path.join(root, "bench.sfc")
+    rng = np.random.default_rng(0)
+    with open(rom_path, "wb") as f:
+        f.write(rng.integers(0, 256, 1 << 19, dtype=np.uint8).tobytes())
+    return rom_path
+
+
+def load_fonts(main):
+    return {"bold": main.load_bitmap_font(main.FONT_FILE, main.FONT_MAP),
+            "regular": main.load_bitmap_font(main.FONT_REGULAR_FILE, main.FONT_REGULAR_MAP)}
+
+
+# --- Running ---
+def run_scenario(main, name, scale, fonts, rom_path, trace_allocations):
+    from core.asset_cache import invalidate
+    main.SCALE = scale
+    pygame.display.set_mode((main.SCREEN_W * scale, main.SCREEN_H * scale), pygame.RESIZABLE)
+    invalidate()   # Display-format surfaces belong to the old mode
+    runner, script, finish = SCENARIOS[name](main, fonts, rom_path)
+    recorder = Recorder(trace_allocations)
+    saved = main.FrameScheduler
+    pygame.event.clear()
+    with Pointer() as pointer:
+        main.FrameScheduler = make_scheduler_class(main, script, recorder, pointer, finish)
+        try:
+            if trace_allocations:
+                tracemalloc.start()
+            runner()
+        finally:
+            if trace_allocations:
+                tracemalloc.stop()
+            main.FrameScheduler = saved
+    return recorder
+
+
+def _timing(frames_ms):
+    frames = np.array(frames_ms)
+    warm = frames[WARMUP_FRAMES:] if len(frames) > WARMUP_FRAMES else frames
+    if not len(warm):
+        return dict.fromkeys(("first_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"), 0.0)
+    return {
+        "first_ms": float(frames[:WARMUP_FRAMES].max()),
+        "mean_ms": float(warm.mean()),
+        "p50_ms": float(np.percentile(warm, 50)),
+        "p95_ms": float(np.percentile(warm, 95)),
+        "p99_ms": float(np.percentile(warm, 99)),
+        "max_ms": float(warm.max()),
+    }
+
+
+def summarize(timed_runs, traced):
+    # Timing figures are the median over the repeated runs, which keeps one
+    # stray scheduler hiccup from deciding p99 on its own
+    runs = [_timing(run.frames_ms) for run in timed_runs]
+    figures = {"frames": len(timed_runs[0].frames_ms)}
+    for field in runs[0]:
+        figures[field] = round(float(np.median([run[field] for run in runs])), 3)
+    allocs = np.array(traced.alloc_kb[WARMUP_FRAMES:] or [0.0])
+    figures["alloc_kb_p50"] = round(float(np.percentile(allocs, 50)), 1)
+    figures["alloc_kb_p95"] = round(float(np.percentile(allocs, 95)), 1)
+    figures["net_blocks"] = traced.blocks
+    return figures
+
+
+def compare(results, baseline):
+    # Regression messages: figures over baseline * (1 + tolerance) + slack
+    failures = []
+    for name, by_scale in results.items():
+        for scale, figures in by_scale.items():
+            base = baseline.get("results", {}).get(name, {}).get(scale)
+            if base is None:
+                continue
+            for field, tolerance, slack in CHECKED:
+                limit = base[field] * (1 + tolerance) + slack
+                if figures[field] > limit:
+                    failures.append("%s @%sx: %s %.3f > %.3f (baseline %.3f)" % (
+                        name, scale, field, figures[field], limit, base[field]))
+    return failures
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(prog="bench.frame_times", description="Headless frame-time benchmarks.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=REPEATS, help="timing runs per scenario and scale")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="run just these scenarios")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--out", help="also write this run's results here")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="sd-bench-", ignore_cleanup_errors=True) as root:
+        rom_path = make_fixtures(root)
+        pygame.init()
+        import main
+        pygame.display.set_mode((main.SCREEN_W, main.SCREEN_H))
+        fonts = load_fonts(main)
+        results = {}
+        for name in args.only or SCENARIOS:
+            for scale in args.scales:
+                timed = [run_scenario(main, name, scale, fonts, rom_path, False) for _ in range(args.repeat)]
+                traced = run_scenario(main, name, scale, fonts, rom_path, True)
+                figures = summarize(timed, traced)
+                results.setdefault(name, {})[str(scale)] = figures
+                print("%-22s %dx  %4d frames  p50 %7.3f  p95 %7.3f  p99 %7.3f ms  alloc p95 %8.1f KB" % (
+                    name, scale, figures["frames"], figures["p50_ms"], figures["p95_ms"], figures["p99_ms"],
+                    figures["alloc_kb_p95"]))
+        pygame.quit()
+
+    report = {"version": BASELINE_VERSION, "python": platform.python_version(), "pygame": pygame.version.ver,
+              "machine": platform.platform(), "results": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if args.update:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print("Baseline written to %s" % args.baseline)
+        return 0
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except OSError:
+        print("No baseline at %s; run with --update to record one" % args.baseline)
+        return 0
+    failures = compare(results, baseline)
+    for line in failures:
+        print("REGRESSION " + line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
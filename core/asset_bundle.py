@@ -0,0 +1,301 @@
+# --- Packed asset bundle ---
+# One file holding every image of the assets directory pre-decoded into a
+# single RGBA texture atlas, plus every sound pre-decoded to raw samples in
+# the mixer's format, so startup maps one file instead of decoding dozens
+# of PNGs / WAVs.
+#
+# Layout (little-endian):
+#   "SDAB"  u32 version  u32 index length  JSON index  (pad to 16)
+#   atlas pixels (width * height * 4 bytes, RGBA, row-major)
+#   sound sample buffers
+# The index holds each image's rect in the atlas, each sound's byte range,
+# the mixer format the sounds were decoded for, and the size / mtime of
+# every source file.
+#
+# At runtime the file is memory-mapped once and the atlas becomes one
+# surface via pygame.image.frombuffer (no copy, no decode); images are
+# subsurfaces of it, which core.asset_cache then converts for the display
+# as it does loose files.  Entries whose source file has changed since the
+# build, and sounds built for another mixer format, are left to the loose
+# files.
+#
+#   python -m core.asset_bundle build     pack the assets directory
+#   python -m core.asset_bundle report    time loose files against the bundle
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+import pygame
+
+MAGIC = b"SDAB"
+VERSION = 1
+BUNDLE_NAME = "assets.sdab"
+ATLAS_WIDTH = 1024
+ATLAS_PADDING = 1     # Transparent gap between images (no bleeding when scaled)
+ALIGN = 16
+IMAGE_EXTENSIONS = (".png",)
+SOUND_EXTENSIONS = (".wav", ".ogg")
+
+_HEADER = struct.Struct("<4sII")
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def list_assets(assets_dir):
+    # (images, sounds): names relative to assets_dir, as asset_path() takes them
+    images, sounds = [], []
+    for root, dirs, files in os.walk(assets_dir):
+        dirs.sort()
+        for f in sorted(files):
+            name = os.path.relpath(os.path.join(root, f), assets_dir).replace(os.sep, "/")
+            ext = os.path.splitext(f)[1].lower()
+            if ext in IMAGE_EXTENSIONS:
+                images.append(name)
+            elif ext in SOUND_EXTENSIONS:
+                sounds.append(name)
+    return images, sounds
+
+
+def _source_key(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+# --- Build ---
+def pack_shelves(sizes, width=ATLAS_WIDTH, padding=ATLAS_PADDING):
+    # Shelf packing, tallest first: {index: (x, y)} and the atlas (width, height)
+    width = max([width] + [w + padding for w, _ in sizes])
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    places = {}
+    x = y = shelf_h = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > width:
+            x, y, shelf_h = 0, y + shelf_h + padding, 0
+        places[i] = (x, y)
+        x += w + padding
+        shelf_h = max(shelf_h, h)
+    return places, (width, max(1, y + shelf_h))
+
+
+def build(assets_dir, out_path=None):
+    # Writes the bundle; returns its path
+    out_path = out_path or os.path.join(assets_dir, BUNDLE_NAME)
+    image_names, sound_names = list_assets(assets_dir)
+
+    surfaces = [pygame.image.load(os.path.join(assets_dir, name)) for name in image_names]
+    places, (atlas_w, atlas_h) = pack_shelves([s.get_size() for s in surfaces])
+    atlas = np.zeros((atlas_h, atlas_w, 4), dtype=np.uint8)
+    images = {}
+    sources = {}
+    for i, (name, surface) in enumerate(zip(image_names, surfaces)):
+        x, y = places[i]
+        w, h = surface.get_size()
+        # Raw RGBA copy (opaque images get alpha 255); blitting would blend
+        atlas[y:y + h, x:x + w] = np.frombuffer(pygame.image.tobytes(surface, "RGBA"), dtype=np.uint8).reshape(h, w, 4)
+        images[name] = [x, y, w, h]
+        sources[name] = _source_key(os.path.join(assets_dir, name))
+    pixels = atlas.tobytes()
+
+    sounds = {}
+    blobs = []
+    mixer_format = None
+    if sound_names:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        mixer_format = list(pygame.mixer.get_init())
+        for name in sound_names:
+            raw = pygame.mixer.Sound(os.path.join(assets_dir, name)).get_raw()
+            sounds[name] = len(raw)
+            sources[name] = _source_key(os.path.join(assets_dir, name))
+            blobs.append((name, raw))
+
+    index = {"atlas": [atlas_w, atlas_h], "images": images, "mixer": mixer_format, "sources": sources}
+    # Sound offsets follow the atlas; fill them in before the index is sized
+    index_len = 0
+    while True:
+        data_start = _align(_HEADER.size + index_len)
+        offset = data_start + len(pixels)
+        index["sounds"] = {}
+        for name, raw in blobs:
+            index["sounds"][name] = [offset, len(raw)]
+            offset += len(raw)
+        index["pixels"] = data_start
+        encoded = json.dumps(index, separators=(",", ":")).encode("utf-8")
+        if len(encoded) == index_len:
+            break
+        index_len = len(encoded)
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * (data_start - _HEADER.size - len(encoded)))
+        f.write(pixels)
+        for _, raw in blobs:
+            f.write(raw)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+# --- Runtime ---
+class AssetBundle:
+    def __init__(self, path, assets_dir=None):
+        self.path = path
+        self.assets_dir = assets_dir
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise
+        magic, version, index_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("%s: not a version %d asset bundle" % (path, VERSION))
+        self.index = json.loads(self._mm[_HEADER.size:_HEADER.size + index_len])
+        self._atlas = None
+        self._fresh = {}
+
+    def close(self):
+        # Only once no surface made from the bundle is in use any more
+        self._atlas = None
+        self._mm.close()
+        self._file.close()
+
+    def _is_fresh(self, name):
+        # Entry still matches its source file (or the source isn't shipped)
+        fresh = self._fresh.get(name)
+        if fresh is None:
+            fresh = True
+            if self.assets_dir is not None:
+                try:
+                    fresh = _source_key(os.path.join(self.assets_dir, name)) == self.index["sources"].get(name)
+                except OSError:
+                    pass
+            self._fresh[name] = fresh
+        return fresh
+
+    def atlas(self):
+        if self._atlas is None:
+            width, height = self.index["atlas"]
+            start = self.index["pixels"]
+            view = memoryview(self._mm)[start:start + width * height * 4]
+            self._atlas = pygame.image.frombuffer(view, (width, height), "RGBA")
+        return self._atlas
+
+    def image(self, name):
+        # Unconverted subsurface of the atlas, or None
+        rect = self.index["images"].get(name)
+        if rect is None or not self._is_fresh(name):
+            return None
+        return self.atlas().subsurface(rect)
+
+    def sound(self, name):
+        # Sound from the pre-decoded samples, or None (missing, stale, other mixer format)
+        entry = self.index["sounds"].get(name)
+        mixer = pygame.mixer.get_init()
+        if entry is None or not mixer or list(mixer) != self.index["mixer"] or not self._is_fresh(name):
+            return None
+        offset, length = entry
+        return pygame.mixer.Sound(buffer=self._mm[offset:offset + length])
+
+
+def open_bundle(path, assets_dir=None):
+    # AssetBundle, or None when there is no usable bundle at path
+    if not os.path.exists(path):
+        return None
+    try:
+        return AssetBundle(path, assets_dir)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+# --- Timing report ---
+def _ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def timing_report(assets_dir, bundle_path=None):
+    # Load every image (and sound) both ways, converted for the display as
+    # core.asset_cache does; returns printable lines
+    bundle_path = bundle_path or os.path.join(assets_dir, BUNDLE_NAME)
+    image_names, sound_names = list_assets(assets_dir)
+
+    start = time.perf_counter()
+    for name in image_names:
+        pygame.image.load(os.path.join(assets_dir, name)).convert_alpha()
+    loose_images = _ms(start)
+
+    start = time.perf_counter()
+    bundle = open_bundle(bundle_path, assets_dir)
+    if bundle is None:
+        return ["No usable bundle at %s; run: python -m core.asset_bundle build" % bundle_path]
+    opened = _ms(start)
+    missing = 0
+    for name in image_names:
+        img = bundle.image(name)
+        if img is None:
+            missing += 1
+            img = pygame.image.load(os.path.join(assets_dir, name))
+        img.convert_alpha()
+    bundle_images = _ms(start)
+
+    lines = ["images: %d" % len(image_names),
+             "  loose files  %8.2f ms" % loose_images,
+             "  bundle       %8.2f ms  (open + index %.2f ms, %d from loose files)" % (bundle_images, opened, missing)]
+
+    if sound_names and pygame.mixer.get_init():
+        start = time.perf_counter()
+        for name in sound_names:
+            pygame.mixer.Sound(os.path.join(assets_dir, name))
+        loose_sounds = _ms(start)
+        start = time.perf_counter()
+        missing = 0
+        for name in sound_names:
+            if bundle.sound(name) is None:
+                missing += 1
+                pygame.mixer.Sound(os.path.join(assets_dir, name))
+        lines += ["sounds: %d" % len(sound_names),
+                  "  loose files  %8.2f ms" % loose_sounds,
+                  "  bundle       %8.2f ms  (%d from loose files)" % (_ms(start), missing)]
+    return lines
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "report"
+    if command not in ("build", "report"):
+        print("usage: python -m core.asset_bundle [build|report] [assets_dir] [bundle_path]")
+        return 2
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if len(argv) > 1:
+        assets_dir = argv[1]
+    else:
+        from core.assets import asset_path
+        assets_dir = os.path.dirname(asset_path(BUNDLE_NAME))
+    bundle_path = argv[2] if len(argv) > 2 else None
+
+    pygame.init()
+    try:
+        if command == "build":
+            start = time.perf_counter()
+            path = build(assets_dir, bundle_path)
+            print("Wrote %s (%d bytes) in %.1f ms" % (path, os.path.getsize(path), _ms(start)))
+        else:
+            pygame.display.set_mode((1, 1))   # convert_alpha() needs a display format
+            for line in timing_report(assets_dir, bundle_path):
+                print(line)
+    finally:
+        pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# --- Shared asset registry ---
+# Decodes each image / sound once and hands the same converted surface (or
+# preloaded Sound) to every screen, instead of hitting the disk every frame.
+#
+# Converted surfaces are tied to the pixel format of the current display, so
+# the image cache is dropped whenever the display mode changes.  Screens that
+# call pygame.display.set_mode() should call invalidate() right after; the
+# registry also notices format changes on its own the next time an image is
+# requested.
+#
+# When a packed bundle (core.asset_bundle, built into the assets directory)
+# is present, misses are served from its pre-decoded atlas and samples and
+# only fall back to the loose files for entries the bundle lacks or that
+# changed since it was built.  The bundle stays mapped for the whole run.
+import os
+
+import pygame
+from core import asset_bundle, profiler
+from core.assets import asset_path
+
+_images = {}
+_sounds = {}
+_display_key = None
+_invalidate_callbacks = []
+_bundle = None
+_bundle_checked = False
+
+_stats = {
+    "image_hits": 0,
+    "image_misses": 0,
+    "sound_hits": 0,
+    "sound_misses": 0,
+    "bundle_images": 0,
+    "bundle_sounds": 0,
+    "invalidations": 0,
+}
+
+
+def _current_display_key():
+    surf = pygame.display.get_surface()
+    if surf is None:
+        return None
+    return (surf.get_bitsize(), surf.get_masks(), surf.get_flags() & pygame.FULLSCREEN)
+
+
+def _check_display():
+    global _display_key
+    key = _current_display_key()
+    if key != _display_key:
+        if _display_key is not None:
+            invalidate()
+        _display_key = key
+
+
+def _get_bundle():
+    global _bundle, _bundle_checked
+    if not _bundle_checked:
+        _bundle_checked = True
+        path = asset_path(asset_bundle.BUNDLE_NAME)
+        _bundle = asset_bundle.open_bundle(path, os.path.dirname(path))
+    return _bundle
+
+
+def get_image(name, alpha=True):
+    # Returns a shared surface; callers must not draw onto it
+    _check_display()
+    key = (name, alpha)
+    img = _images.get(key)
+    if img is not None:
+        _stats["image_hits"] += 1
+        return img
+    _stats["image_misses"] += 1
+    with profiler.scope("assets"):
+        bundle = _get_bundle()
+        img = bundle.image(name) if bundle is not None else None
+        if img is None:
+            img = pygame.image.load(asset_path(name))
+        else:
+            _stats["bundle_images"] += 1
+        img = img.convert_alpha() if alpha else img.convert()
+    _images[key] = img
+    return img
+
+
+def get_sound(name):
+    snd = _sounds.get(name)
+    if snd is not None:
+        _stats["sound_hits"] += 1
+        return snd
+    _stats["sound_misses"] += 1
+    bundle = _get_bundle()
+    snd = bundle.sound(name) if bundle is not None else None
+    if snd is None:
+        snd = pygame.mixer.Sound(asset_path(name))
+    else:
+        _stats["bundle_sounds"] += 1
+    _sounds[name] = snd
+    return snd
+
+
+def preload(images=(), sounds=()):
+    # Warm the cache at screen entry so the first frame doesn't stall
+    for name in images:
+        get_image(name)
+    for name in sounds:
+        get_sound(name)
+
+
+def invalidate(sounds=False):
+    # Drop converted surfaces (e.g. after pygame.display.set_mode).  Sounds
+    # don't depend on the display, so they're kept unless asked.
+    global _display_key
+    _images.clear()
+    if sounds:
+        _sounds.clear()
+    _display_key = _current_display_key()
+    _stats["invalidations"] += 1
+    for callback in list(_invalidate_callbacks):
+        callback()
+
+
+def on_invalidate(callback):
+    # Lets derived caches (text runs, panels...) flush together with the images
+    if callback not in _invalidate_callbacks:
+        _invalidate_callbacks.append(callback)
+
+
+def stats():
+    out = dict(_stats)
+    out["images_cached"] = len(_images)
+    out["sounds_cached"] = len(_sounds)
+    out["bundle"] = _bundle.path if _bundle is not None else None
+    return out
+
+
+def reset_stats():
+    for key in _stats:
+        _stats[key] = 0
@@ -0,0 +1,232 @@
+# --- Headless batch analysis ---
+# Runs the same analyzers as the dashboard (hashing, disassembly, pointer
+# and compression scans) over many ROMs with no window: one ROM per task
+# on a process pool, each worker running the job functions from core.jobs
+# in-line with a private message queue instead of the UI's.  Results are
+# applied to an in-memory ClassificationMap (code guesses first, then
+# data, as the dashboard does) and summed up into a report.
+#
+# Reports stream out as NDJSON, one line per ROM, flushed as each ROM
+# finishes; the report file doubles as the checkpoint, so a rerun after an
+# interruption skips every ROM (same path, size and mtime) already in it.
+# Optionally each report is also written as its own JSON file.
+#
+#   python -m core.batch ROMS_DIR ... [--list FILE] [--out reports.ndjson]
+#   python main.py --batch ...        (same arguments)
+#
+# Nothing here imports pygame.
+import argparse
+import json
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+
+from core.compression.probe import SYSTEM_CODECS
+from core.coverage import ClassificationMap, CODE, DATA
+from core.disasm import SYSTEMS as DISASM_SYSTEMS
+from core.jobs import JobContext, RESULT, NOTICE, disassemble, scan_pointers, find_compressed
+from core.library import ROM_EXTENSIONS
+from core.pointers import POINTER_FORMATS
+from core.rom_ident import identify
+
+REPORT_VERSION = 1
+MAX_NOTICES = 50
+HEADER_FIELDS = ("size", "mtime", "system", "title", "region", "mapper", "copier_header", "crc32", "sha1")
+
+
+# --- Input ---
+def collect_roms(paths=(), lists=()):
+    # Absolute paths, in order, without duplicates: directories are walked for
+    # ROM extensions, files are taken as given, list files hold one path per line
+    names = []
+    for name in lists:
+        f = sys.stdin if name == "-" else open(name, encoding="utf-8")
+        try:
+            names.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    names.extend(paths)
+
+    found = []
+    seen = set()
+    for name in names:
+        if os.path.isdir(name):
+            batch = []
+            for root, dirs, files in os.walk(name):
+                dirs.sort()
+                batch.extend(os.path.join(root, f) for f in sorted(files)
+                             if os.path.splitext(f)[1].lower() in ROM_EXTENSIONS)
+        else:
+            batch = [name]
+        for path in batch:
+            path = os.path.abspath(path)
+            if path not in seen:
+                seen.add(path)
+                found.append(path)
+    return found
+
+
+# --- Worker side ---
+def _run_analyzer(fn, path, classification, kind, notices):
+    # fn(ctx, path) from core.jobs, run in-line; RESULT ranges become guesses
+    messages = queue.SimpleQueue()
+    ctx = JobContext(0, fn.__name__, messages, SimpleNamespace(value=0))
+    try:
+        value = fn(ctx, path)
+    except Exception as e:
+        notices.append("Analysis '%s' failed: %s: %s" % (fn.__name__, type(e).__name__, e))
+        value = None
+    while not messages.empty():
+        msg = messages.get()
+        if msg.kind == RESULT:
+            for start, end in msg.payload:
+                classification.suggest(start, end, kind)
+        elif msg.kind == NOTICE:
+            notices.append(msg.payload)
+    return value
+
+
+def analyze_rom(path):
+    # Full report for one ROM (raises on unreadable files)
+    started = time.perf_counter()
+    info = identify(path)
+    report = {"version": REPORT_VERSION, "path": path}
+    report.update((k, info[k]) for k in HEADER_FIELDS)
+
+    classification = ClassificationMap(path)
+    notices = []
+    system = info["system"]
+    if system in DISASM_SYSTEMS:
+        code = _run_analyzer(disassemble, path, classification, CODE, notices)
+        if code is not None:
+            report["instructions"] = code["instructions"]
+            report["routines"] = len(code["routines"])
+    if system in POINTER_FORMATS:
+        tables = _run_analyzer(scan_pointers, path, classification, DATA, notices)
+        if tables is not None:
+            report["pointer_tables"] = tables["tables"]
+    if system in SYSTEM_CODECS:
+        streams = _run_analyzer(find_compressed, path, classification, DATA, notices)
+        if streams is not None:
+            report["compressed_streams"] = len(streams)
+
+    confirmed, uncertain, left = classification.coverage()
+    report["coverage"] = {"confirmed": round(confirmed * 100, 2), "uncertain": round(uncertain * 100, 2),
+                          "left": round(left * 100, 2)}
+    report["kinds"] = classification.kind_totals()
+    report["notices"] = notices[:MAX_NOTICES]
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def _analyze_or_error(path):
+    # Pool task: failures become reports too, so one bad file never stops a run
+    try:
+        return analyze_rom(path)
+    except Exception as e:
+        report = {"version": REPORT_VERSION, "path": path, "error": "%s: %s" % (type(e).__name__, e)}
+        try:
+            st = os.stat(path)
+            report.update(size=st.st_size, mtime=st.st_mtime_ns)
+        except OSError:
+            pass
+        return report
+
+
+# --- Checkpoint ---
+def load_checkpoint(out_path):
+    # path -> (size, mtime) of every complete report line; a line torn by an
+    # interruption is cut off so appending starts on a clean line
+    done = {}
+    if not os.path.exists(out_path):
+        return done
+    good = 0
+    with open(out_path, "rb+") as f:
+        for line in f:
+            try:
+                report = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            done[report.get("path")] = (report.get("size"), report.get("mtime"))
+            good += len(line)
+        f.truncate(good)
+    return done
+
+
+def _unchanged(path, seen):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return seen == (st.st_size, st.st_mtime_ns)
+
+
+def _report_name(report):
+    base = os.path.splitext(os.path.basename(report["path"]))[0]
+    return "%s.%s.json" % (base, report.get("crc32") or "error")
+
+
+def _write_json(directory, report):
+    path = os.path.join(directory, _report_name(report))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    os.replace(tmp, path)
+
+
+# --- Driver ---
+def run(argv=None):
+    parser = argparse.ArgumentParser(prog="batch", description="Analyze ROMs without a window.")
+    parser.add_argument("paths", nargs="*", help="ROM files or directories to scan")
+    parser.add_argument("--list", action="append", default=[], metavar="FILE",
+                        help="file with one ROM path per line ('-' for stdin)")
+    parser.add_argument("--out", default="reports.ndjson", help="NDJSON report / checkpoint file")
+    parser.add_argument("--json-dir", help="also write each report as its own JSON file here")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of skipping finished ROMs")
+    args = parser.parse_args(argv)
+
+    roms = collect_roms(args.paths, args.list)
+    if args.no_resume and os.path.exists(args.out):
+        os.remove(args.out)
+    done = load_checkpoint(args.out)
+    todo = [path for path in roms if not (path in done and _unchanged(path, done[path]))]
+    if args.json_dir:
+        os.makedirs(args.json_dir, exist_ok=True)
+    print("%d ROMs, %d already reported, %d to analyze" % (len(roms), len(roms) - len(todo), len(todo)),
+          file=sys.stderr)
+
+    failures = 0
+    with open(args.out, "a", encoding="utf-8") as out:
+        def emit(n, report):
+            nonlocal failures
+            out.write(json.dumps(report) + "\n")
+            out.flush()
+            if args.json_dir:
+                _write_json(args.json_dir, report)
+            if "error" in report:
+                failures += 1
+                status = "error: " + report["error"]
+            else:
+                status = "%.1f%% classified in %.1f s" % (100 - report["coverage"]["left"], report["seconds"])
+            print("[%d/%d] %s: %s" % (n, len(todo), report["path"], status), file=sys.stderr)
+
+        if args.workers == 1 or len(todo) <= 1:
+            for n, path in enumerate(todo, 1):
+                emit(n, _analyze_or_error(path))
+        elif todo:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                futures = [pool.submit(_analyze_or_error, path) for path in todo]
+                for n, future in enumerate(as_completed(futures), 1):
+                    emit(n, future.result())
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,68 @@
+# --- Decompression: codec interface ---
+# A codec decodes one compressed stream starting at a ROM offset.  decode()
+# is a generator: it yields the output in pieces of at most `chunk` bytes
+# as it goes and returns the input offset just past the stream, so a viewer
+# can show the first tiles of a big block before the rest is decoded, and
+# only a codec's back-reference window is held on top of the next chunk.
+# Output past `limit` bytes is an error, which keeps probing garbage cheap.
+#
+# candidates() is the cheap half of the probe: a vectorized pass over the
+# whole ROM returning the offsets worth a real decode attempt.
+from collections import namedtuple
+
+import numpy as np
+
+CHUNK = 4096
+MAX_OUTPUT = 1 << 20     # Larger than any real block; anything bigger is garbage
+MIN_OUTPUT = 32          # Smaller streams are too likely to be noise
+
+Stream = namedtuple("Stream", "offset end codec size")
+# offset / end: input bytes of the stream; size: decompressed bytes
+
+
+class DecodeError(ValueError):
+    def __init__(self, message, end=None):
+        super().__init__(message)
+        self.end = end          # Input offset the decoder got to, when the codec knows it
+        self.produced = 0       # Output bytes yielded before the error (set by decompress)
+
+
+def as_bytes(data):
+    # Indexable-as-int view of any buffer (bytes, mmap, NumPy array)
+    return memoryview(data).cast("B") if not isinstance(data, (bytes, bytearray)) else data
+
+
+def as_array(data):
+    return data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.uint8)
+
+
+class Codec:
+    name = None
+    aligned = 1          # Streams only start at multiples of this
+
+    def decode(self, data, offset, limit=MAX_OUTPUT, chunk=CHUNK):
+        raise NotImplementedError
+        yield
+
+    def candidates(self, data, start=0, end=None):
+        # Offsets in [start, end) that might start a stream of this codec
+        data = as_array(data)
+        end = len(data) if end is None else end
+        first = -(-start // self.aligned) * self.aligned
+        return np.arange(first, end, self.aligned, dtype=np.int64)
+
+
+def decompress(codec, data, offset, limit=MAX_OUTPUT):
+    # Whole stream at once: (output bytes, input end offset)
+    out = bytearray()
+    decoder = codec.decode(data, offset, limit)
+    while True:
+        try:
+            out += next(decoder)
+        except StopIteration as stop:
+            return bytes(out), stop.value
+        except IndexError:
+            raise DecodeError("stream runs past the end of the data") from None
+        except DecodeError as e:
+            e.produced = len(out)
+            raise
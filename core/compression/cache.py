@@ -0,0 +1,48 @@
+# --- Decompressed block cache ---
+# Bounded LRU of decoded blocks keyed by (ROM SHA-1, offset, codec name),
+# so flipping back to a block in a viewer never decodes it twice.  Bounded
+# by total bytes, not entries: blocks range from a few bytes to a megabyte.
+from collections import OrderedDict
+
+from core.compression.base import MAX_OUTPUT, decompress
+from core.compression.probe import CODECS
+
+MAX_BYTES = 32 << 20
+
+_blocks = OrderedDict()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "bytes": 0,
+}
+
+
+def get_block(rom_sha1, data, offset, codec, limit=MAX_OUTPUT):
+    # Decompressed bytes of the stream at offset (raises DecodeError)
+    key = (rom_sha1, offset, codec)
+    block = _blocks.get(key)
+    if block is not None:
+        _blocks.move_to_end(key)
+        _stats["hits"] += 1
+        return block
+    _stats["misses"] += 1
+    block, _ = decompress(CODECS[codec], data, offset, limit)
+    _blocks[key] = block
+    _stats["bytes"] += len(block)
+    while _stats["bytes"] > MAX_BYTES and len(_blocks) > 1:
+        _, old = _blocks.popitem(last=False)
+        _stats["bytes"] -= len(old)
+        _stats["evictions"] += 1
+    return block
+
+
+def clear():
+    _blocks.clear()
+    _stats["bytes"] = 0
+
+
+def stats():
+    out = dict(_stats)
+    out["blocks_cached"] = len(_blocks)
+    return out
@@ -0,0 +1,184 @@
+# --- GBA BIOS compression (LZ77 0x10, Huffman 0x24 / 0x28, RLE 0x30) ---
+# The formats the BIOS decompression calls take, as documented in GBATEK.
+# Every stream starts with a 32-bit header: the type in the low byte and
+# the decompressed size in the upper 24 bits, and sits on a 4-byte
+# boundary, so candidates() only has to look at aligned header bytes with
+# a plausible size.
+import numpy as np
+
+from core.compression.base import CHUNK, MAX_OUTPUT, MIN_OUTPUT, Codec, DecodeError, as_array, as_bytes
+
+LZ77_WINDOW = 0x1000
+
+
+class _BiosCodec(Codec):
+    aligned = 4
+    types = ()
+
+    def _header(self, src, offset, limit):
+        if src[offset] not in self.types:
+            raise DecodeError("not a %s stream" % self.name)
+        size = src[offset + 1] | (src[offset + 2] << 8) | (src[offset + 3] << 16)
+        if size > limit:
+            raise DecodeError("declared size %d over the limit" % size)
+        return size
+
+    def _first_ok(self, data, offsets):
+        # Extra per-codec check on the bytes after the header
+        return np.ones(len(offsets), dtype=bool)
+
+    def candidates(self, data, start=0, end=None):
+        data = as_array(data)
+        end = min(len(data) - 4, len(data) if end is None else end)
+        first = -(-start // 4) * 4
+        if end <= first:
+            return np.zeros(0, dtype=np.int64)
+        offsets = np.arange(first, end, 4, dtype=np.int64)
+        offsets = offsets[np.isin(data[offsets], self.types)]
+        size = (data[offsets + 1].astype(np.int64) | (data[offsets + 2].astype(np.int64) << 8)
+                | (data[offsets + 3].astype(np.int64) << 16))
+        offsets = offsets[(size >= MIN_OUTPUT) & (size <= MAX_OUTPUT)]
+        offsets = offsets[offsets + 5 < len(data)]
+        return offsets[self._first_ok(data, offsets)]
+
+
+class Lz77Codec(_BiosCodec):
+    name = "gba-lz77"
+    types = (0x10,)
+
+    def _first_ok(self, data, offsets):
+        # Nothing to refer back to yet: the first block must start with a literal
+        return (data[offsets + 4] & 0x80) == 0
+
+    def decode(self, data, offset, limit=MAX_OUTPUT, chunk=CHUNK):
+        src = as_bytes(data)
+        size = self._header(src, offset, limit)
+        pos = offset + 4
+        out = bytearray()     # Back-reference window + not yet yielded output
+        flushed = 0           # Bytes of out already yielded
+        produced = 0
+        while produced < size:
+            flags = src[pos]
+            pos += 1
+            for bit in range(7, -1, -1):
+                if produced >= size:
+                    break
+                if not flags >> bit & 1:
+                    out.append(src[pos])
+                    pos += 1
+                    produced += 1
+                    continue
+                b0, b1 = src[pos], src[pos + 1]
+                pos += 2
+                length = (b0 >> 4) + 3
+                disp = (((b0 & 0x0F) << 8) | b1) + 1
+                start = len(out) - disp
+                if start < 0:
+                    raise DecodeError("back-reference before the start of the output")
+                length = min(length, size - produced)
+                if disp >= length:
+                    out += out[start:start + length]
+                else:
+                    for i in range(length):
+                        out.append(out[start + i])
+                produced += length
+            if len(out) - flushed >= chunk:
+                yield bytes(out[flushed:])
+                drop = max(0, len(out) - LZ77_WINDOW)
+                del out[:drop]
+                flushed = len(out)
+        if len(out) > flushed:
+            yield bytes(out[flushed:])
+        return pos
+
+
+class RleCodec(_BiosCodec):
+    name = "gba-rle"
+    types = (0x30,)
+
+    def decode(self, data, offset, limit=MAX_OUTPUT, chunk=CHUNK):
+        src = as_bytes(data)
+        size = self._header(src, offset, limit)
+        pos = offset + 4
+        out = bytearray()
+        produced = 0
+        while produced < size:
+            flag = src[pos]
+            pos += 1
+            if flag & 0x80:
+                length = min((flag & 0x7F) + 3, size - produced)
+                out += bytes((src[pos],)) * length
+                pos += 1
+            else:
+                length = min((flag & 0x7F) + 1, size - produced)
+                run = src[pos:pos + length]
+                if len(run) < length:
+                    raise DecodeError("stream runs past the end of the data")
+                out += run
+                pos += (flag & 0x7F) + 1
+            produced += length
+            if len(out) >= chunk:
+                yield bytes(out)
+                out.clear()
+        if out:
+            yield bytes(out)
+        return pos
+
+
+class HuffmanCodec(_BiosCodec):
+    name = "gba-huffman"
+    types = (0x24, 0x28)
+
+    def _first_ok(self, data, offsets):
+        # The bitstream after the tree is word-aligned: the tree size byte is odd
+        return (data[offsets + 4] & 1) == 1
+
+    def decode(self, data, offset, limit=MAX_OUTPUT, chunk=CHUNK):
+        src = as_bytes(data)
+        size = self._header(src, offset, limit)
+        bits = src[offset] & 0x0F
+        tree = offset + 5                                  # Root node
+        if not src[offset + 4] & 1:
+            raise DecodeError("bitstream not word-aligned")
+        tree_end = offset + 4 + (src[offset + 4] + 1) * 2
+        pos = tree_end                                     # Bitstream, in 32-bit words
+        out = bytearray()
+        produced = 0
+        pending = 0      # Nibble waiting for its partner (4-bit data)
+        half = False
+        node = tree
+        while produced < size:
+            word = src[pos] | (src[pos + 1] << 8) | (src[pos + 2] << 16) | (src[pos + 3] << 24)
+            pos += 4
+            for shift in range(31, -1, -1):
+                value = src[node]
+                bit = word >> shift & 1
+                rel = node - offset
+                child = offset + (rel & ~1) + (value & 0x3F) * 2 + 2 + bit
+                if child >= tree_end:
+                    raise DecodeError("tree node points past the tree")
+                if not value & (0x80 >> bit):
+                    node = child
+                    continue
+                symbol = src[child]
+                node = tree
+                if bits == 8:
+                    out.append(symbol)
+                    produced += 1
+                elif symbol > 0x0F:
+                    raise DecodeError("8-bit symbol in 4-bit data")
+                elif not half:
+                    pending, half = symbol & 0x0F, True
+                    continue
+                else:
+                    out.append(pending | (symbol & 0x0F) << 4)
+                    produced += 1
+                    half = False
+                if produced >= size:
+                    break
+            if len(out) >= chunk:
+                yield bytes(out)
+                out.clear()
+        if out:
+            yield bytes(out)
+        return pos
@@ -0,0 +1,84 @@
+# --- Finding compressed streams in a ROM ---
+# CODECS is the registry (name -> codec instance); SYSTEM_CODECS lists
+# which ones are worth probing for each system.  find_streams() takes each
+# codec's vectorized candidates() and confirms them with a real, bounded
+# decode, capped at PROBE_LIMIT bytes of output (asset blocks are far
+# smaller; garbage headers often claim a megabyte).  A stream only counts
+# if it decodes to at least MIN_OUTPUT bytes from at least MIN_INPUT and
+# takes fewer bytes than it produces.  Where confirmed streams overlap
+# (noise that happens to decode often runs on into a real stream), the one
+# that compresses better wins.  Streams sharing an end are first reduced
+# to one: the earliest start that compresses nearly as well as the best of
+# them (later starts are the real stream's decodable tails, much earlier
+# ones with a poor ratio are noise running into it).
+#
+# A candidate inside the input span an earlier candidate failed or was
+# rejected through is skipped: it would mostly decode a tail of the same
+# commands (a fill run fails at the output limit from every one of its
+# offsets).  Spans of accepted streams are not, so noise that runs into a
+# real stream can't hide the real start.
+import bisect
+
+from core.compression.base import MIN_OUTPUT, DecodeError, Stream, as_bytes, decompress
+from core.compression.gba import HuffmanCodec, Lz77Codec, RleCodec
+from core.compression.snes import LcLz2Codec
+
+CODECS = {codec.name: codec for codec in (
+    Lz77Codec(), RleCodec(), HuffmanCodec(),
+    LcLz2Codec("snes-lz2", "big"), LcLz2Codec("snes-lz2-le", "little"),
+)}
+
+PROBE_LIMIT = 0x10000
+MIN_INPUT = 16
+TAIL_RATIO = 0.75
+
+SYSTEM_CODECS = {
+    "GBA": ("gba-lz77", "gba-huffman", "gba-rle"),
+    "SNES": ("snes-lz2", "snes-lz2-le"),
+}
+
+
+def _ratio(stream):
+    return stream.size / (stream.end - stream.offset)
+
+
+def find_streams(data, codecs, limit=PROBE_LIMIT, progress=None):
+    # Confirmed streams of the given codec names, by offset
+    src = as_bytes(data)
+    found = []
+    for name in codecs:
+        codec = CODECS[name]
+        candidates = codec.candidates(data).tolist()
+        covered = 0     # Input already decoded through by an earlier candidate
+        for i, offset in enumerate(candidates):
+            if progress is not None and not i & 0xFF:
+                progress(i, len(candidates))
+            if offset < covered:
+                continue
+            try:
+                out, end = decompress(codec, src, offset, limit)
+            except DecodeError as e:
+                if e.end is not None:
+                    covered = max(covered, e.end)
+                continue
+            if len(out) < MIN_OUTPUT or not MIN_INPUT <= end - offset < len(out):
+                covered = max(covered, end)
+                continue
+            found.append(Stream(offset, end, name, len(out)))
+    by_end = {}
+    for stream in found:
+        by_end.setdefault(stream.end, []).append(stream)
+    found = []
+    for group in by_end.values():
+        best = max(_ratio(s) for s in group)
+        found.append(min((s for s in group if _ratio(s) >= best * TAIL_RATIO), key=lambda s: s.offset))
+    found.sort(key=lambda s: -_ratio(s))
+    starts = []
+    streams = []
+    for stream in found:
+        i = bisect.bisect(starts, stream.offset)
+        if (i and streams[i - 1].end > stream.offset) or (i < len(streams) and streams[i].offset < stream.end):
+            continue
+        starts.insert(i, stream.offset)
+        streams.insert(i, stream)
+    return streams
@@ -0,0 +1,141 @@
+# --- SNES LZ (the "LC_LZ2" command format) ---
+# A stream of commands, each a header byte CCCLLLLL (command, length - 1)
+# or, for longer runs, 111CCCLL LLLLLLLL; 0xFF ends the stream:
+#   0 copy the next L bytes          3 byte fill, incrementing each time
+#   1 fill L bytes with one byte     4 copy L bytes of earlier output from
+#   2 fill L bytes with a byte pair    a 16-bit absolute output offset
+# Games disagree on the byte order of that offset: Super Mario World uses
+# big-endian, A Link to the Past little-endian, hence two codecs.
+#
+# There is no header to look for, so candidates() walks the first
+# PROBE_STEPS commands of every offset at once with NumPy, dropping offsets
+# as soon as a command is impossible (unknown command, reference past the
+# output so far, too much output).  Random bytes rarely survive more than a
+# few steps, so only real streams (and a little noise) reach decode().  An
+# end marker within the first MIN_COMMANDS commands is taken as noise too:
+# random bytes hit 0xFF early all the time, real blocks rarely end that fast.
+# Offsets still going after PROBE_STEPS must by then have produced more
+# than they consumed (a long run of zeros is an endless chain of one-byte
+# copies), but not over MAX_PROBE_RATIO times as much: a run of a byte that
+# reads as a fill command (0x3F, 0xEA...) decodes as fill after fill until
+# the output limit, from every offset of the run.
+import numpy as np
+
+from core.compression.base import CHUNK, MAX_OUTPUT, MIN_OUTPUT, Codec, DecodeError, as_array, as_bytes
+
+PROBE_STEPS = 32
+MAX_PROBE_RATIO = 12          # Output per input byte over PROBE_STEPS; more is a fill run
+MIN_COMMANDS = 12
+PROBE_BLOCK = 1 << 20
+SNES_MAX_OUTPUT = 0x10000     # Offsets are 16-bit; no stream outgrows them
+
+# Argument bytes per command (copy: the length itself)
+_ARG_BYTES = np.array([0, 1, 2, 1, 2, 0, 0, 0], dtype=np.int64)
+
+
+class LcLz2Codec(Codec):
+    def __init__(self, name, byteorder):
+        self.name = name
+        self.byteorder = byteorder
+
+    def decode(self, data, offset, limit=MAX_OUTPUT, chunk=CHUNK):
+        src = as_bytes(data)
+        limit = min(limit, SNES_MAX_OUTPUT)
+        big = self.byteorder == "big"
+        pos = offset
+        out = bytearray()       # Whole output: references are absolute
+        flushed = 0
+        while True:
+            header = src[pos]
+            pos += 1
+            if header == 0xFF:
+                break
+            command = header >> 5
+            if command == 7:
+                command = (header >> 2) & 7
+                length = (((header & 3) << 8) | src[pos]) + 1
+                pos += 1
+            else:
+                length = (header & 0x1F) + 1
+            if command == 0:
+                run = src[pos:pos + length]
+                if len(run) < length:
+                    raise DecodeError("stream runs past the end of the data", len(src))
+                out += run
+                pos += length
+            elif command == 1:
+                out += bytes((src[pos],)) * length
+                pos += 1
+            elif command == 2:
+                out += (bytes((src[pos], src[pos + 1])) * ((length + 1) // 2))[:length]
+                pos += 2
+            elif command == 3:
+                first = src[pos]
+                out += bytes((first + i) & 0xFF for i in range(length))
+                pos += 1
+            elif command == 4:
+                source = (src[pos] << 8 | src[pos + 1]) if big else (src[pos] | src[pos + 1] << 8)
+                pos += 2
+                if source >= len(out):
+                    raise DecodeError("reference past the output so far", pos)
+                if source + length <= len(out):
+                    out += out[source:source + length]
+                else:
+                    for i in range(length):
+                        out.append(out[source + i])
+            else:
+                raise DecodeError("unknown command %d" % command, pos)
+            if len(out) > limit:
+                raise DecodeError("output over the limit", pos)
+            if len(out) - flushed >= chunk:
+                yield bytes(out[flushed:])
+                flushed = len(out)
+        if len(out) > flushed:
+            yield bytes(out[flushed:])
+        return pos
+
+    def candidates(self, data, start=0, end=None):
+        data = as_array(data)
+        end = len(data) if end is None else min(end, len(data))
+        found = [self._walk(data, np.arange(block, min(end, block + PROBE_BLOCK), dtype=np.int64))
+                 for block in range(start, end, PROBE_BLOCK)]
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    def _walk(self, data, offsets):
+        # Offsets whose first PROBE_STEPS commands are all possible
+        n = len(data)
+        big = self.byteorder == "big"
+        pos = offsets.copy()
+        produced = np.zeros(len(offsets), dtype=np.int64)
+        index = np.arange(len(offsets))
+        kept = []
+        for step in range(PROBE_STEPS):
+            inside = pos + 2 < n
+            pos, produced, index = pos[inside], produced[inside], index[inside]
+            if not len(pos):
+                break
+            header = data[pos].astype(np.int64)
+            ended = header == 0xFF
+            if step >= MIN_COMMANDS:
+                kept.append(index[ended & (produced >= MIN_OUTPUT)])
+            live = ~ended
+            pos, produced, index, header = pos[live], produced[live], index[live], header[live]
+            extended = (header >> 5) == 7
+            command = np.where(extended, (header >> 2) & 7, header >> 5)
+            length = np.where(extended, (((header & 3) << 8) | data[pos + 1]) + 1, (header & 0x1F) + 1)
+            pos = pos + 1 + extended
+            ok = command <= 4
+            repeat = command == 4
+            if repeat.any():
+                at = np.minimum(pos, n - 2)
+                hi, lo = data[at].astype(np.int64), data[at + 1].astype(np.int64)
+                source = (hi << 8 | lo) if big else (lo << 8 | hi)
+                ok &= ~repeat | (source < produced)
+            pos = pos + np.where(command == 0, length, _ARG_BYTES[command])
+            produced = produced + length
+            ok &= produced <= SNES_MAX_OUTPUT
+            pos, produced, index = pos[ok], produced[ok], index[ok]
+        # Still going after PROBE_STEPS and compressing, but not implausibly: worth a real try
+        consumed = pos - offsets[index]
+        kept.append(index[(produced > consumed) & (produced <= consumed * MAX_PROBE_RATIO)])
+        return offsets[np.sort(np.concatenate(kept))]
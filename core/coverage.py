@@ -0,0 +1,109 @@
+# --- Per-byte classification map ---
+# One uint8 per ROM byte: the low bits hold what the byte is (code, data,
+# graphics, text or still unknown) and the high bit marks it as confirmed by
+# the user rather than guessed by an analyzer.  A 256-bin histogram of those
+# values is kept up to date on every assignment (only the reassigned range is
+# counted), so the dashboard's Confirmed / Uncertain / Left numbers are a
+# reduction over 256 counters, never a rescan of the ROM.
+import os
+import numpy as np
+
+UNKNOWN = 0
+CODE = 1
+DATA = 2
+GRAPHICS = 3
+TEXT = 4
+KIND_NAMES = {UNKNOWN: "unknown", CODE: "code", DATA: "data", GRAPHICS: "graphics", TEXT: "text"}
+
+CONFIRMED = 0x80
+KIND_MASK = 0x07
+
+# Histogram slots for "classified but only guessed" and "classified + confirmed"
+_UNCERTAIN_VALUES = np.array([k for k in KIND_NAMES if k != UNKNOWN])
+_CONFIRMED_VALUES = _UNCERTAIN_VALUES | CONFIRMED
+
+
+def map_rom(path):
+    # Read-only memory map of a ROM (empty files get an empty array)
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+class ClassificationMap:
+    def __init__(self, rom_path, state=None):
+        self.rom_path = rom_path
+        self.rom = map_rom(rom_path)
+        self.size = len(self.rom)
+        if state is None:
+            state = np.zeros(self.size, dtype=np.uint8)
+        self.state = state
+        self.counts = np.bincount(self.state, minlength=256).astype(np.int64)
+        self.version = 0   # bumps on every change, handy for redraw checks
+        self.listeners = []   # fn(start, end, old_values) after each change (journal, undo)
+
+    # --- Edits ---
+    def _apply(self, start, end, new):
+        seg = self.state[start:end]
+        old = seg.copy() if self.listeners else None
+        self.counts -= np.bincount(seg, minlength=256)
+        seg[:] = new
+        if np.isscalar(new):
+            self.counts[new] += end - start
+        else:
+            self.counts += np.bincount(new, minlength=256)
+        self.version += 1
+        for listener in self.listeners:
+            listener(start, end, old)
+
+    def assign(self, start, end, kind, confirmed=False):
+        # Classify [start, end) as one kind
+        start, end = max(0, start), min(self.size, end)
+        if start >= end:
+            return
+        self._apply(start, end, np.uint8(kind | (CONFIRMED if confirmed else 0)))
+
+    def assign_values(self, start, values):
+        # Write raw state values (e.g. a whole analyzer result) starting at start
+        values = np.asarray(values, dtype=np.uint8)
+        end = min(self.size, start + len(values))
+        if start < 0:
+            values, start = values[-start:], 0
+        if start >= end:
+            return
+        self._apply(start, end, values[:end - start])
+
+    def suggest(self, start, end, kind):
+        # Analyzer guess: only fills bytes that are still unknown, never
+        # overrides anything already classified or confirmed
+        start, end = max(0, start), min(self.size, end)
+        if start >= end:
+            return
+        seg = self.state[start:end]
+        if not (seg == UNKNOWN).any():
+            return  # Nothing left to guess here: no change, no listener calls
+        values = np.where(seg == UNKNOWN, np.uint8(kind), seg)
+        self._apply(start, end, values)
+
+    # --- Queries ---
+    def kind_at(self, offset):
+        return int(self.state[offset]) & KIND_MASK
+
+    def is_confirmed(self, offset):
+        return bool(self.state[offset] & CONFIRMED)
+
+    def coverage(self):
+        # (confirmed, uncertain, left) as fractions of the ROM
+        if self.size == 0:
+            return 0.0, 0.0, 1.0
+        confirmed = int(self.counts[_CONFIRMED_VALUES].sum())
+        uncertain = int(self.counts[_UNCERTAIN_VALUES].sum())
+        left = self.size - confirmed - uncertain
+        return confirmed / self.size, uncertain / self.size, left / self.size
+
+    def kind_totals(self):
+        # Bytes per kind, confirmed or not
+        totals = {}
+        for kind, name in KIND_NAMES.items():
+            totals[name] = int(self.counts[kind] + self.counts[kind | CONFIRMED])
+        return totals
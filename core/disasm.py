@@ -0,0 +1,398 @@
+# --- Recursive-descent disassembler (SNES 65816 / NES 6502) ---
+# Follows control flow from the reset / NMI / IRQ vectors with a worklist.
+# Decoding goes through precomputed 256-entry opcode tables (mnemonic,
+# addressing mode, flow type, and instruction length per M/X width on the
+# 65816), and every decoded instruction is memoized per (address, M, X), so
+# paths that meet again stop immediately.
+#
+# The 65816 M/X (and E) flags are tracked per path: REP/SEP/XCE update them,
+# and the state is carried along each worklist entry.
+from collections import namedtuple
+
+from core.formats.loader import open_rom
+
+SYSTEMS = ("SNES", "NES")   # Systems whose CPU has opcode tables here
+
+# --- Flow types ---
+FLOW_NEXT = 0       # falls through
+FLOW_BRANCH = 1     # conditional: target + fall through
+FLOW_JUMP = 2       # unconditional, target known
+FLOW_CALL = 3       # subroutine: target + fall through
+FLOW_RETURN = 4     # rts / rtl / rti
+FLOW_INDIRECT = 5   # jump through a pointer (followed when it points at ROM)
+FLOW_STOP = 6       # brk / stp / invalid
+
+# --- Addressing modes: name -> (operand bytes, format) ---
+# Operand size -1 / -2 means "depends on M / X" (1 byte when 8-bit, else 2)
+MODES = {
+    "imp":    (0, ""),
+    "acc":    (0, "A"),
+    "imm":    (1, "#$%02X"),
+    "immm":   (-1, "#$%0*X"),
+    "immx":   (-2, "#$%0*X"),
+    "dp":     (1, "$%02X"),
+    "dpx":    (1, "$%02X,X"),
+    "dpy":    (1, "$%02X,Y"),
+    "dpind":  (1, "($%02X)"),
+    "dpindx": (1, "($%02X,X)"),
+    "dpindy": (1, "($%02X),Y"),
+    "dpindl": (1, "[$%02X]"),
+    "dpindly": (1, "[$%02X],Y"),
+    "sr":     (1, "$%02X,S"),
+    "sriy":   (1, "($%02X,S),Y"),
+    "abs":    (2, "$%04X"),
+    "absx":   (2, "$%04X,X"),
+    "absy":   (2, "$%04X,Y"),
+    "absind": (2, "($%04X)"),
+    "absindx": (2, "($%04X,X)"),
+    "absindl": (2, "[$%04X]"),
+    "long":   (3, "$%06X"),
+    "longx":  (3, "$%06X,X"),
+    "rel":    (1, "$%04X"),
+    "rell":   (2, "$%04X"),
+    "blk":    (2, "$%02X,$%02X"),
+}
+
+_BRANCH = ("BPL", "BMI", "BVC", "BVS", "BCC", "BCS", "BNE", "BEQ")
+
+# --- 6502 (official opcodes; the rest decode as invalid) ---
+_OPS_6502 = {
+    "ADC": {"imm": 0x69, "dp": 0x65, "dpx": 0x75, "abs": 0x6D, "absx": 0x7D, "absy": 0x79, "dpindx": 0x61, "dpindy": 0x71},
+    "AND": {"imm": 0x29, "dp": 0x25, "dpx": 0x35, "abs": 0x2D, "absx": 0x3D, "absy": 0x39, "dpindx": 0x21, "dpindy": 0x31},
+    "ASL": {"acc": 0x0A, "dp": 0x06, "dpx": 0x16, "abs": 0x0E, "absx": 0x1E},
+    "BCC": {"rel": 0x90}, "BCS": {"rel": 0xB0}, "BEQ": {"rel": 0xF0}, "BMI": {"rel": 0x30},
+    "BNE": {"rel": 0xD0}, "BPL": {"rel": 0x10}, "BVC": {"rel": 0x50}, "BVS": {"rel": 0x70},
+    "BIT": {"dp": 0x24, "abs": 0x2C},
+    "BRK": {"imp": 0x00},
+    "CLC": {"imp": 0x18}, "CLD": {"imp": 0xD8}, "CLI": {"imp": 0x58}, "CLV": {"imp": 0xB8},
+    "CMP": {"imm": 0xC9, "dp": 0xC5, "dpx": 0xD5, "abs": 0xCD, "absx": 0xDD, "absy": 0xD9, "dpindx": 0xC1, "dpindy": 0xD1},
+    "CPX": {"imm": 0xE0, "dp": 0xE4, "abs": 0xEC},
+    "CPY": {"imm": 0xC0, "dp": 0xC4, "abs": 0xCC},
+    "DEC": {"dp": 0xC6, "dpx": 0xD6, "abs": 0xCE, "absx": 0xDE},
+    "DEX": {"imp": 0xCA}, "DEY": {"imp": 0x88},
+    "EOR": {"imm": 0x49, "dp": 0x45, "dpx": 0x55, "abs": 0x4D, "absx": 0x5D, "absy": 0x59, "dpindx": 0x41, "dpindy": 0x51},
+    "INC": {"dp": 0xE6, "dpx": 0xF6, "abs": 0xEE, "absx": 0xFE},
+    "INX": {"imp": 0xE8}, "INY": {"imp": 0xC8},
+    "JMP": {"abs": 0x4C, "absind": 0x6C},
+    "JSR": {"abs": 0x20},
+    "LDA": {"imm": 0xA9, "dp": 0xA5, "dpx": 0xB5, "abs": 0xAD, "absx": 0xBD, "absy": 0xB9, "dpindx": 0xA1, "dpindy": 0xB1},
+    "LDX": {"imm": 0xA2, "dp": 0xA6, "dpy": 0xB6, "abs": 0xAE, "absy": 0xBE},
+    "LDY": {"imm": 0xA0, "dp": 0xA4, "dpx": 0xB4, "abs": 0xAC, "absx": 0xBC},
+    "LSR": {"acc": 0x4A, "dp": 0x46, "dpx": 0x56, "abs": 0x4E, "absx": 0x5E},
+    "NOP": {"imp": 0xEA},
+    "ORA": {"imm": 0x09, "dp": 0x05, "dpx": 0x15, "abs": 0x0D, "absx": 0x1D, "absy": 0x19, "dpindx": 0x01, "dpindy": 0x11},
+    "PHA": {"imp": 0x48}, "PHP": {"imp": 0x08}, "PLA": {"imp": 0x68}, "PLP": {"imp": 0x28},
+    "ROL": {"acc": 0x2A, "dp": 0x26, "dpx": 0x36, "abs": 0x2E, "absx": 0x3E},
+    "ROR": {"acc": 0x6A, "dp": 0x66, "dpx": 0x76, "abs": 0x6E, "absx": 0x7E},
+    "RTI": {"imp": 0x40}, "RTS": {"imp": 0x60},
+    "SBC": {"imm": 0xE9, "dp": 0xE5, "dpx": 0xF5, "abs": 0xED, "absx": 0xFD, "absy": 0xF9, "dpindx": 0xE1, "dpindy": 0xF1},
+    "SEC": {"imp": 0x38}, "SED": {"imp": 0xF8}, "SEI": {"imp": 0x78},
+    "STA": {"dp": 0x85, "dpx": 0x95, "abs": 0x8D, "absx": 0x9D, "absy": 0x99, "dpindx": 0x81, "dpindy": 0x91},
+    "STX": {"dp": 0x86, "dpy": 0x96, "abs": 0x8E},
+    "STY": {"dp": 0x84, "dpx": 0x94, "abs": 0x8C},
+    "TAX": {"imp": 0xAA}, "TAY": {"imp": 0xA8}, "TSX": {"imp": 0xBA},
+    "TXA": {"imp": 0x8A}, "TXS": {"imp": 0x9A}, "TYA": {"imp": 0x98},
+}
+
+# --- 65816: all 256 opcodes, in order, 16 per row ---
+_OPS_65816 = """
+BRK imm  ORA dpindx COP imm  ORA sr  TSB dp  ORA dp  ASL dp  ORA dpindl  PHP imp  ORA immm ASL acc PHD imp TSB abs ORA abs ASL abs ORA long
+BPL rel  ORA dpindy ORA dpind ORA sriy TRB dp ORA dpx ASL dpx ORA dpindly CLC imp ORA absy INC acc TCS imp TRB abs ORA absx ASL absx ORA longx
+JSR abs  AND dpindx JSL long AND sr  BIT dp  AND dp  ROL dp  AND dpindl  PLP imp  AND immm ROL acc PLD imp BIT abs AND abs ROL abs AND long
+BMI rel  AND dpindy AND dpind AND sriy BIT dpx AND dpx ROL dpx AND dpindly SEC imp AND absy DEC acc TSC imp BIT absx AND absx ROL absx AND longx
+RTI imp  EOR dpindx WDM imm  EOR sr  MVP blk EOR dp  LSR dp  EOR dpindl  PHA imp  EOR immm LSR acc PHK imp JMP abs EOR abs LSR abs EOR long
+BVC rel  EOR dpindy EOR dpind EOR sriy MVN blk EOR dpx LSR dpx EOR dpindly CLI imp EOR absy PHY imp TCD imp JML long EOR absx LSR absx EOR longx
+RTS imp  ADC dpindx PER rell ADC sr  STZ dp  ADC dp  ROR dp  ADC dpindl  PLA imp  ADC immm ROR acc RTL imp JMP absind ADC abs ROR abs ADC long
+BVS rel  ADC dpindy ADC dpind ADC sriy STZ dpx ADC dpx ROR dpx ADC dpindly SEI imp ADC absy PLY imp TDC imp JMP absindx ADC absx ROR absx ADC longx
+BRA rel  STA dpindx BRL rell STA sr  STY dp  STA dp  STX dp  STA dpindl  DEY imp  BIT immm TXA imp PHB imp STY abs STA abs STX abs STA long
+BCC rel  STA dpindy STA dpind STA sriy STY dpx STA dpx STX dpy STA dpindly TYA imp STA absy TXS imp TXY imp STZ abs STA absx STZ absx STA longx
+LDY immx LDA dpindx LDX immx LDA sr  LDY dp  LDA dp  LDX dp  LDA dpindl  TAY imp  LDA immm TAX imp PLB imp LDY abs LDA abs LDX abs LDA long
+BCS rel  LDA dpindy LDA dpind LDA sriy LDY dpx LDA dpx LDX dpy LDA dpindly CLV imp LDA absy TSX imp TYX imp LDY absx LDA absx LDX absy LDA longx
+CPY immx CMP dpindx REP imm  CMP sr  CPY dp  CMP dp  DEC dp  CMP dpindl  INY imp  CMP immm DEX imp WAI imp CPY abs CMP abs DEC abs CMP long
+BNE rel  CMP dpindy CMP dpind CMP sriy PEI dpind CMP dpx DEC dpx CMP dpindly CLD imp CMP absy PHX imp STP imp JML absindl CMP absx DEC absx CMP longx
+CPX immx SBC dpindx SEP imm  SBC sr  CPX dp  SBC dp  INC dp  SBC dpindl  INX imp  SBC immm NOP imp XBA imp CPX abs SBC abs INC abs SBC long
+BEQ rel  SBC dpindy SBC dpind SBC sriy PEA abs SBC dpx INC dpx SBC dpindly SED imp SBC absy PLX imp XCE imp JSR absindx SBC absx INC absx SBC longx
+"""
+
+
+def _flow(mnemonic, mode):
+    if mnemonic in _BRANCH:
+        return FLOW_BRANCH
+    if mnemonic in ("BRA", "BRL"):
+        return FLOW_JUMP
+    if mnemonic in ("JMP", "JML"):
+        return FLOW_JUMP if mode in ("abs", "long") else FLOW_INDIRECT
+    if mnemonic in ("JSR", "JSL"):
+        return FLOW_CALL
+    if mnemonic in ("RTS", "RTL", "RTI"):
+        return FLOW_RETURN
+    if mnemonic in ("BRK", "STP", "COP"):
+        return FLOW_STOP
+    return FLOW_NEXT
+
+
+# How decode() finds a static target for an opcode (0 = none)
+_T_REL, _T_RELL, _T_ABS, _T_LONG, _T_PTR, _T_PTRL = 1, 2, 3, 4, 5, 6
+
+
+def _target_kind(mnemonic, mode):
+    if mode == "rel" and mnemonic != "PER":
+        return _T_REL
+    if mode == "rell" and mnemonic != "PER":
+        return _T_RELL
+    flow = _flow(mnemonic, mode)
+    if flow in (FLOW_JUMP, FLOW_CALL):
+        return {"abs": _T_ABS, "long": _T_LONG}.get(mode, 0)
+    if flow == FLOW_INDIRECT:
+        return {"absind": _T_PTR, "absindl": _T_PTRL}.get(mode, 0)
+    return 0
+
+
+class OpcodeTable:
+    # 256-entry tables: mnemonic, mode, flow, and length per (m8, x8)
+    def __init__(self, entries):
+        self.mnemonic = [e[0] for e in entries]
+        self.mode = [e[1] for e in entries]
+        self.flow = [_flow(*e) if e[0] else FLOW_STOP for e in entries]
+        self.target_kind = [_target_kind(*e) if e[0] else 0 for e in entries]
+        self.lengths = {}
+        for m8 in (True, False):
+            for x8 in (True, False):
+                table = bytearray(256)
+                for op, (mnemonic, mode) in enumerate(entries):
+                    if not mnemonic:
+                        table[op] = 1
+                        continue
+                    size = MODES[mode][0]
+                    if size == -1:
+                        size = 1 if m8 else 2
+                    elif size == -2:
+                        size = 1 if x8 else 2
+                    table[op] = 1 + size
+                self.lengths[(m8, x8)] = bytes(table)
+
+
+def _build_6502():
+    entries = [(None, None)] * 256
+    for mnemonic, modes in _OPS_6502.items():
+        for mode, op in modes.items():
+            entries[op] = (mnemonic, mode)
+    # BRK skips a signature byte on return, so treat it as 2 bytes long
+    entries[0x00] = ("BRK", "imm")
+    return OpcodeTable(entries)
+
+
+def _build_65816():
+    words = _OPS_65816.split()
+    entries = [(words[i], words[i + 1]) for i in range(0, len(words), 2)]
+    assert len(entries) == 256
+    return OpcodeTable(entries)
+
+
+TABLE_6502 = _build_6502()
+TABLE_65816 = _build_65816()
+TABLES = {"6502": TABLE_6502, "65816": TABLE_65816}
+
+Instruction = namedtuple("Instruction", "address offset opcode length mnemonic mode operand target flow m8 x8")
+
+
+def format_instruction(ins):
+    fmt = MODES[ins.mode][1] if ins.mode else ""
+    if not ins.mnemonic:
+        return ".db $%02X" % ins.opcode
+    if ins.mode == "blk":
+        text = fmt % (ins.operand & 0xFF, ins.operand >> 8)
+    elif ins.mode in ("immm", "immx"):
+        text = fmt % ((ins.length - 1) * 2, ins.operand)
+    elif ins.mode in ("rel", "rell"):
+        bits = 8 * (ins.length - 1)
+        disp = ins.operand - (1 << bits) if ins.operand >> (bits - 1) else ins.operand
+        text = fmt % ((ins.address + ins.length + disp) & 0xFFFF)
+    elif fmt and "%" in fmt:
+        text = fmt % ins.operand
+    else:
+        text = fmt
+    return (ins.mnemonic + " " + text).rstrip()
+
+
+# --- Disassembler ---
+REPORT_EVERY = 4096
+
+
+def _merge_spans(spans):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(s, e) for s, e in merged]
+
+
+class Disassembler:
+    def __init__(self, data, cpu, to_offset):
+        # Any buffer (bytes, mmap, numpy memmap); indexing must give ints
+        self.data = memoryview(data).cast("B")
+        self.cpu = cpu
+        self.table = TABLES[cpu]
+        self.to_offset = to_offset
+        self.instructions = {}     # (address, m8, x8) -> Instruction
+        self.by_address = {}       # address -> first Instruction decoded there
+        self.entry_points = []
+        self.problems = []         # (address, message) for suspicious decodes
+        self.traces = 0            # worklist entries taken so far (for progress estimates)
+        self._fresh = []           # (start, end) offsets not yet handed out by take_new_ranges()
+
+    def read_word(self, address):
+        off = self.to_offset(address)
+        if off < 0 or off + 1 >= len(self.data):
+            return None
+        return self.data[off] | (self.data[off + 1] << 8)
+
+    def decode(self, address, m8=True, x8=True):
+        key = (address, m8, x8)
+        ins = self.instructions.get(key)
+        if ins is not None:
+            return ins
+        off = self.to_offset(address)
+        if off < 0:
+            return None
+        data = self.data
+        table = self.table
+        opcode = data[off]
+        length = table.lengths[(m8, x8)][opcode]
+        if off + length > len(data):
+            return None
+        operand = int.from_bytes(data[off + 1:off + length], "little")
+        kind = table.target_kind[opcode]
+        target = None
+        if kind:
+            bank = address & 0xFF0000
+            if kind == _T_REL:
+                target = bank | ((address + 2 + (operand - 256 if operand & 0x80 else operand)) & 0xFFFF)
+            elif kind == _T_RELL:
+                target = bank | ((address + 3 + (operand - 65536 if operand & 0x8000 else operand)) & 0xFFFF)
+            elif kind == _T_ABS:
+                target = bank | operand
+            elif kind == _T_LONG:
+                target = operand
+            elif kind == _T_PTR:
+                # Pointer lives in bank 0; follow it when that is ROM
+                pointer = self.read_word(operand)
+                if pointer is not None:
+                    target = bank | pointer
+            else:
+                pointer = self.read_word(operand)
+                high = self.read_word(operand + 2)
+                if pointer is not None and high is not None:
+                    target = ((high & 0xFF) << 16) | pointer
+        ins = Instruction(address, off, opcode, length, table.mnemonic[opcode], table.mode[opcode],
+                          operand, target, table.flow[opcode], m8, x8)
+        self.instructions[key] = ins
+        self.by_address.setdefault(address, ins)
+        return ins
+
+    def run(self, entries, report=None):
+        # entries: iterable of (address, m8, x8, emulation).  report(self, pending)
+        # is called every REPORT_EVERY instructions (pending = worklist length)
+        work = [tuple(e) for e in entries]
+        self.entry_points.extend(e[0] for e in work)
+        seen = set()
+        decode = self.decode
+        fresh = self._fresh
+        is_65816 = self.cpu == "65816"
+        countdown = REPORT_EVERY
+        while work:
+            address, m8, x8, emu = work.pop()
+            self.traces += 1
+            carry = None   # Known carry state (for CLC/SEC + XCE), None = unknown
+            while True:
+                key = (address, m8, x8)
+                if key in seen:
+                    break
+                seen.add(key)
+                ins = decode(address, m8, x8)
+                if ins is None:
+                    break
+                if ins.mnemonic is None:
+                    self.problems.append((address, "invalid opcode $%02X" % ins.opcode))
+                    break
+                fresh.append((ins.offset, ins.offset + ins.length))
+                countdown -= 1
+                if not countdown and report is not None:
+                    countdown = REPORT_EVERY
+                    report(self, len(work))
+                flow = ins.flow
+                if is_65816:
+                    mnemonic = ins.mnemonic
+                    if mnemonic == "REP" and not emu:
+                        m8 = m8 and not ins.operand & 0x20
+                        x8 = x8 and not ins.operand & 0x10
+                    elif mnemonic == "SEP":
+                        m8 = m8 or bool(ins.operand & 0x20)
+                        x8 = x8 or bool(ins.operand & 0x10)
+                    elif mnemonic == "CLC":
+                        carry = False
+                    elif mnemonic == "SEC":
+                        carry = True
+                    elif mnemonic == "XCE":
+                        if carry is not None:
+                            emu, carry = carry, emu
+                        if emu:
+                            m8 = x8 = True
+                if ins.target is not None and flow in (FLOW_BRANCH, FLOW_JUMP, FLOW_CALL, FLOW_INDIRECT):
+                    work.append((ins.target, m8, x8, emu))
+                if flow in (FLOW_NEXT, FLOW_BRANCH, FLOW_CALL):
+                    address = (address & 0xFF0000) | ((address + ins.length) & 0xFFFF)
+                    continue
+                break
+        return self
+
+    # --- Results ---
+    def code_ranges(self):
+        # Merged [start, end) file-offset ranges covered by decoded instructions
+        return _merge_spans({(ins.offset, ins.offset + ins.length) for ins in self.instructions.values()})
+
+    def take_new_ranges(self):
+        # Code ranges decoded since the last call (for streaming partial results)
+        spans, self._fresh[:] = set(self._fresh), []
+        return _merge_spans(spans)
+
+    def routines(self):
+        # Addresses reached by a call (JSR / JSL), sorted
+        return sorted({ins.target for ins in self.instructions.values()
+                       if ins.flow == FLOW_CALL and ins.target is not None})
+
+    def listing(self):
+        # Instructions sorted by address, one per address
+        return [self.by_address[a] for a in sorted(self.by_address)]
+
+
+def prepare(path):
+    # Opens the ROM, picks the CPU tables and entry vectors; returns
+    # (disassembler, entry points) ready for run().  Offsets are file offsets.
+    image = open_rom(path)
+    if image.cpu not in TABLES:
+        raise ValueError("No disassembler for %s ROMs" % image.system)
+    dis = Disassembler(image.data, image.cpu, image.to_offset)
+    vectors = image.vectors
+    entries = []
+    if image.cpu == "65816":
+        # Reset starts in emulation mode; native NMI / IRQ / BRK / COP keep
+        # whatever M/X the interrupted code had, so assume 8-bit
+        if "reset" in vectors:
+            entries.append((vectors["reset"], True, True, True))
+        for name in ("nmi", "irq", "brk", "cop"):
+            if vectors.get(name, 0) >= 0x8000:
+                entries.append((vectors[name], True, True, False))
+    else:
+        for name in ("reset", "nmi", "irq"):
+            if vectors.get(name, 0) >= 0x8000:
+                entries.append((vectors[name], True, True, True))
+    return dis, entries
+
+
+def disassemble_rom(path, report=None):
+    dis, entries = prepare(path)
+    return dis.run(entries, report)
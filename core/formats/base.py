@@ -0,0 +1,184 @@
+# --- ROM container base: one mmap, memoryview slices, page-table mapping ---
+# A RomImage maps the file once.  Everything else handed out (the payload
+# past a copier header, individual banks, ranges read by CPU address) is a
+# memoryview slice of that mapping, so nothing is copied.  Banks are sliced
+# on first use, not up front.
+#
+# CPU addresses are translated through a PageMap: the address space is
+# split into fixed-size pages and two small precomputed tables give each
+# page's payload offset (or -1) and how many of its bytes exist.  One
+# address costs a shift, a mask and two list lookups; translate_many()
+# does the same for a whole NumPy array of addresses at once, and
+# address_many() goes the other way.
+import mmap
+import os
+
+import numpy as np
+
+
+class PageMap:
+    def __init__(self, address_bits, page_bits):
+        self.page_bits = page_bits
+        self.page_size = 1 << page_bits
+        self.mask = self.page_size - 1
+        pages = 1 << (address_bits - page_bits)
+        self.base = np.full(pages, -1, dtype=np.int64)
+        self.limit = np.zeros(pages, dtype=np.int64)
+        self._base = None
+        self._limit = None
+        self._reverse = None
+
+    def map(self, page, offset, data_size):
+        # Page -> payload offset; pages past the end of the data stay unmapped
+        if 0 <= offset < data_size:
+            self.base[page] = offset
+            self.limit[page] = min(self.page_size, data_size - offset)
+        self._base = None
+        self._reverse = None
+
+    def _lists(self):
+        # Plain-list copies: indexing them is faster than NumPy for one address
+        self._base = self.base.tolist()
+        self._limit = self.limit.tolist()
+
+    def translate(self, address):
+        # Payload offset of one CPU address, or -1 when it is not ROM
+        if self._base is None:
+            self._lists()
+        base, limit = self._base, self._limit
+        page = address >> self.page_bits
+        if page >= len(base):
+            return -1
+        low = address & self.mask
+        if low >= limit[page]:
+            return -1
+        return base[page] + low
+
+    def translate_many(self, addresses):
+        # Vectorized translate(); -1 where unmapped
+        addresses = np.asarray(addresses, dtype=np.int64)
+        pages = addresses >> self.page_bits
+        inside = (pages >= 0) & (pages < len(self.base))
+        pages = np.where(inside, pages, 0)
+        low = addresses & self.mask
+        offsets = self.base[pages] + low
+        valid = inside & (self.base[pages] >= 0) & (low < self.limit[pages])
+        return np.where(valid, offsets, -1)
+
+    def address_many(self, offsets):
+        # Vectorized payload offset -> CPU address, the highest mirror when
+        # several map it (-1 where none does).  Pages map page-aligned offsets.
+        if self._reverse is None:
+            pages = np.flatnonzero(self.base >= 0)
+            slots = self.base[pages] >> self.page_bits
+            self._reverse = np.full(int(slots.max()) + 1 if len(slots) else 0, -1, dtype=np.int64)
+            np.maximum.at(self._reverse, slots, pages)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        slots = offsets >> self.page_bits
+        inside = (offsets >= 0) & (slots < len(self._reverse))
+        pages = self._reverse[np.where(inside, slots, 0)] if len(self._reverse) else np.full(len(offsets), -1)
+        valid = inside & (pages >= 0)
+        return np.where(valid, (pages << self.page_bits) | (offsets & self.mask), -1)
+
+
+class RomImage:
+    system = None
+    cpu = None            # Main CPU, as core.disasm names it
+    bank_size = 0x8000
+
+    def __init__(self, path, mm, info, header_size=0, payload=None):
+        self.path = path
+        self.info = info
+        self._mm = mm
+        self.data = memoryview(mm) if mm is not None else memoryview(b"")
+        self.size = len(self.data)
+        self.header_size = header_size
+        # Payload: the cartridge contents without any copier header (a view, or
+        # a decoded buffer for formats that store the data scrambled)
+        self.rom = payload if payload is not None else self.data[header_size:]
+        self._banks = {}
+        self.pages = self._build_pages()
+        self._translate = self.pages.translate
+        self.vectors = self._read_vectors()
+
+    # --- Per-system hooks ---
+    def _build_pages(self):
+        raise NotImplementedError
+
+    def _read_vectors(self):
+        # name -> CPU address of the entry points the hardware jumps to
+        return {}
+
+    def rom_to_file(self, offset):
+        # Payload offset -> file offset
+        return self.header_size + offset if offset >= 0 else -1
+
+    def file_ranges(self, start, end):
+        # Payload range -> the file ranges that hold it
+        return [(self.header_size + start, self.header_size + end)] if start < end else []
+
+    # --- Banks ---
+    @property
+    def bank_count(self):
+        return (len(self.rom) + self.bank_size - 1) // self.bank_size
+
+    def bank(self, index):
+        view = self._banks.get(index)
+        if view is None:
+            if not 0 <= index < self.bank_count:
+                raise IndexError("bank %d out of range" % index)
+            view = self._banks[index] = self.rom[index * self.bank_size:(index + 1) * self.bank_size]
+        return view
+
+    def banks(self):
+        return [self.bank(i) for i in range(self.bank_count)]
+
+    # --- CPU addresses ---
+    def rom_offset(self, address):
+        return self._translate(address)
+
+    def to_offset(self, address):
+        # File offset of a CPU address, or -1
+        return self.rom_to_file(self._translate(address))
+
+    def read(self, address, length):
+        # View of length bytes at address (cut short at the end of its page)
+        offset = self._translate(address)
+        if offset < 0:
+            return memoryview(b"")
+        page_end = offset - (address & self.pages.mask) + self.pages.limit[address >> self.pages.page_bits]
+        return self.rom[offset:min(offset + length, page_end)]
+
+    def read_word(self, address):
+        offset = self._translate(address)
+        if offset < 0 or offset + 1 >= len(self.rom):
+            return None
+        return self.rom[offset] | (self.rom[offset + 1] << 8)
+
+    # --- Lifetime ---
+    def close(self):
+        for view in self._banks.values():
+            view.release()
+        self._banks.clear()
+        if self._mm is not None:
+            self.rom.release()
+            self.data.release()
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # Someone still holds a view; the map goes with the last one
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def map_file(path):
+    # Read-only mmap of a file (None for empty files, which mmap rejects)
+    if os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
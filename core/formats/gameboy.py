@@ -0,0 +1,50 @@
+# --- Game Boy / Game Boy Color and Game Boy Advance ---
+# GB: 16 KB banks; $0000-$3FFF is bank 0 and $4000-$7FFF shows bank 1 until
+# the MBC switches it.  GBA: the cartridge is linear at $08000000 with wait
+# state mirrors at $0A000000 and $0C000000, mapped here in 16 MB pages.
+from core.formats.base import PageMap, RomImage
+
+
+class GameBoyImage(RomImage):
+    system = "GB"
+    cpu = "LR35902"
+    bank_size = 0x4000
+
+    def __init__(self, path, mm, info):
+        self.system = info.get("system") or "GB"
+        super().__init__(path, mm, info)
+
+    def _build_pages(self):
+        pages = PageMap(16, 14)
+        pages.map(0, 0, len(self.rom))
+        pages.map(1, 0x4000, len(self.rom))
+        return pages
+
+    def _read_vectors(self):
+        # Execution starts at $0100; the interrupt handlers sit at fixed RST addresses
+        return {"entry": 0x0100, "vblank": 0x0040, "lcd": 0x0048, "timer": 0x0050,
+                "serial": 0x0058, "joypad": 0x0060}
+
+
+class GbaImage(RomImage):
+    system = "GBA"
+    cpu = "ARM7TDMI"
+    bank_size = 0x10000
+
+    def _build_pages(self):
+        pages = PageMap(32, 24)
+        size = len(self.rom)
+        for mirror in (0x08, 0x0A, 0x0C):
+            pages.map(mirror, 0, size)
+            pages.map(mirror + 1, 0x1000000, size)
+        return pages
+
+    def _read_vectors(self):
+        # The header starts with an ARM branch to the real entry point
+        word = int.from_bytes(self.rom[0:4], "little") if len(self.rom) >= 4 else 0
+        if word >> 24 != 0xEA:
+            return {}
+        displacement = word & 0xFFFFFF
+        if displacement & 0x800000:
+            displacement -= 0x1000000
+        return {"entry": 0x08000000 + 8 + displacement * 4}
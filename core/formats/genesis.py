@@ -0,0 +1,72 @@
+# --- Sega Genesis / Mega Drive (.gen / .md / .bin, and SMD copier dumps) ---
+# Plain dumps are the 68000's view of the cartridge: linear from $000000,
+# mapped here in 64 KB pages.  SMD dumps carry a 512-byte header and store
+# every 16 KB block as its odd bytes followed by its even bytes; that can't
+# be viewed in place, so those are decoded once into a buffer (the only
+# format here that copies) and rom_to_file() undoes the shuffle.
+from core.formats.base import PageMap, RomImage
+
+SMD_BLOCK = 0x4000
+
+
+def deinterleave(data, header_size=512):
+    blocks = bytearray(len(data) - header_size)
+    for start in range(0, len(blocks), SMD_BLOCK):
+        block = data[header_size + start:header_size + start + SMD_BLOCK]
+        n = len(block) // 2
+        blocks[start + 1:start + 2 * n:2] = block[:n]
+        blocks[start:start + 2 * n:2] = block[n:2 * n]
+    return blocks
+
+
+class GenesisImage(RomImage):
+    system = "Genesis"
+    cpu = "68000"
+    bank_size = 0x80000   # The unit of the larger carts' bank switching
+
+    def __init__(self, path, mm, info):
+        self.interleaved = bool(info.get("interleaved"))
+        if self.interleaved:
+            super().__init__(path, mm, info, 512, memoryview(deinterleave(memoryview(mm))))
+        else:
+            super().__init__(path, mm, info)
+
+    def rom_to_file(self, offset):
+        if offset < 0 or not self.interleaved:
+            return super().rom_to_file(offset)
+        block, pos = divmod(offset, SMD_BLOCK)
+        half = SMD_BLOCK // 2
+        inner = pos // 2 if pos & 1 else half + pos // 2
+        return self.header_size + block * SMD_BLOCK + inner
+
+    def file_ranges(self, start, end):
+        if not self.interleaved:
+            return super().file_ranges(start, end)
+        # Per SMD block: the odd bytes and the even bytes are each one run in the file
+        ranges = []
+        half = SMD_BLOCK // 2
+        while start < end:
+            block = start // SMD_BLOCK
+            base = self.header_size + block * SMD_BLOCK
+            stop = min(end, (block + 1) * SMD_BLOCK)
+            lo, hi = start - block * SMD_BLOCK, stop - block * SMD_BLOCK
+            odd = (lo // 2, hi // 2)
+            even = ((lo + 1) // 2, (hi + 1) // 2)
+            if odd[0] < odd[1]:
+                ranges.append((base + odd[0], base + odd[1]))
+            if even[0] < even[1]:
+                ranges.append((base + half + even[0], base + half + even[1]))
+            start = stop
+        return ranges
+
+    def _build_pages(self):
+        pages = PageMap(24, 16)
+        for page in range(0x400000 >> 16):
+            pages.map(page, page << 16, len(self.rom))
+        return pages
+
+    def _read_vectors(self):
+        # 68000 vector table: initial SSP, then the reset PC (big-endian longs)
+        if len(self.rom) < 8:
+            return {}
+        return {"reset": int.from_bytes(self.rom[4:8], "big") & 0xFFFFFF}
@@ -0,0 +1,31 @@
+# --- Open a ROM file as the matching RomImage ---
+import os
+
+from core.formats.base import map_file
+from core.formats.gameboy import GameBoyImage, GbaImage
+from core.formats.genesis import GenesisImage
+from core.formats.nes import NesImage
+from core.formats.snes import SnesImage
+from core.rom_ident import parse_header
+
+IMAGE_TYPES = {
+    "SNES": SnesImage,
+    "NES": NesImage,
+    "Genesis": GenesisImage,
+    "GB": GameBoyImage,
+    "GBC": GameBoyImage,
+    "GBA": GbaImage,
+}
+
+
+def open_rom(path):
+    # Raises ValueError for files that are not a ROM we know
+    mm = map_file(path)
+    if mm is None:
+        raise ValueError("%s is empty" % path)
+    info = parse_header(mm, len(mm), os.path.splitext(path)[1].lower())
+    image_type = IMAGE_TYPES.get(info["system"])
+    if image_type is None:
+        mm.close()
+        raise ValueError("Unrecognized ROM format: %s" % os.path.basename(path))
+    return image_type(path, mm, info)
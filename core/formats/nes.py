@@ -0,0 +1,45 @@
+# --- NES (iNES / NES 2.0) ---
+# The 16-byte header (plus a 512-byte trainer when flagged) precedes the PRG
+# ROM, then CHR ROM.  CPU $8000-$FFFF is mapped to the last 32 KB of PRG (a
+# 16 KB PRG is mirrored into both halves), which is what the fixed bank of
+# most mappers holds at power-on; switchable windows are left to analyzers.
+from core.formats.base import PageMap, RomImage
+
+PAGE_BITS = 13
+
+
+class NesImage(RomImage):
+    system = "NES"
+    cpu = "6502"
+    bank_size = 0x4000
+
+    def __init__(self, path, mm, info):
+        header_size = 16 + (512 if mm[6] & 0x04 else 0)   # Trainer
+        self.prg_size = info.get("prg_size") or 0
+        self.chr_size = info.get("chr_size") or 0
+        # Payload = PRG; CHR is its own view right after it
+        prg_end = header_size + self.prg_size
+        super().__init__(path, mm, info, header_size, memoryview(mm)[header_size:prg_end])
+        self.chr = self.data[prg_end:prg_end + self.chr_size]
+
+    def _build_pages(self):
+        pages = PageMap(16, PAGE_BITS)
+        size = len(self.rom)
+        window = min(size, 0x8000)
+        if window:
+            base = size - window
+            for i in range(4):
+                pages.map(4 + i, base + (i * 0x2000) % window, size)
+        return pages
+
+    def _read_vectors(self):
+        vectors = {}
+        for name, address in (("nmi", 0xFFFA), ("reset", 0xFFFC), ("irq", 0xFFFE)):
+            target = self.read_word(address)
+            if target is not None:
+                vectors[name] = target
+        return vectors
+
+    def close(self):
+        self.chr.release()
+        super().close()
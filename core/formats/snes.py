@@ -0,0 +1,55 @@
+# --- SNES (LoROM / HiROM / ExHiROM, optional 512-byte copier header) ---
+# The header fields (and which of the three internal-header locations wins)
+# come from core.rom_ident; this adds the 65816 memory map as a page table
+# of 32 KB pages over the 24-bit address space.
+from core.formats.base import PageMap, RomImage
+
+PAGE_BITS = 15
+
+
+class SnesImage(RomImage):
+    system = "SNES"
+    cpu = "65816"
+    bank_size = 0x8000
+
+    def __init__(self, path, mm, info):
+        header_size = 512 if info.get("copier_header") else 0
+        self.mapper = info.get("mapper") or "LoROM"
+        super().__init__(path, mm, info, header_size)
+
+    @property
+    def hirom(self):
+        return self.mapper.startswith("HiROM") or self.mapper == "ExHiROM"
+
+    def _build_pages(self):
+        pages = PageMap(24, PAGE_BITS)
+        size = len(self.rom)
+        exhirom = self.mapper == "ExHiROM"
+        hirom = self.hirom
+        if hirom:
+            self.bank_size = 0x10000
+        for page in range(1 << (24 - PAGE_BITS)):
+            bank, upper = page >> 1, page & 1
+            if bank in (0x7E, 0x7F):
+                continue  # WRAM
+            if hirom:
+                if (bank & 0x7F) < 0x40 and not upper:
+                    continue  # System area / SRAM
+                offset = ((bank & 0x3F) << 16) | (upper << 15)
+                if exhirom and bank < 0x80:
+                    offset += 0x400000
+            else:
+                if not upper and not 0x40 <= (bank & 0x7F) < 0x70:
+                    continue
+                offset = (bank & 0x7F) << 15
+            pages.map(page, offset, size)
+        return pages
+
+    def _read_vectors(self):
+        vectors = {}
+        for name, address in (("reset", 0xFFFC), ("nmi", 0xFFEA), ("irq", 0xFFEE),
+                              ("brk", 0xFFE6), ("cop", 0xFFE4), ("emu_nmi", 0xFFFA), ("emu_irq", 0xFFFE)):
+            target = self.read_word(address)
+            if target is not None:
+                vectors[name] = target
+        return vectors
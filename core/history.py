@@ -0,0 +1,182 @@
+# --- Undo / redo for classification edits ---
+# Every change to the ClassificationMap is recorded as a range delta: the
+# span plus its old and new values.  Spans that hold a single value (the
+# common case for assign()) keep just that value instead of an array, so a
+# 1 MB fill costs a few bytes of history.
+#
+# Edits that touch or overlap the previous one within COALESCE_MS are
+# merged into that delta (one drag / one analyzer pass = one undo step),
+# and transaction() groups arbitrary edits into a single step.  The stacks
+# are capped by memory: once over max_bytes the oldest steps are dropped.
+# Undo / redo rewrite only the recorded spans, so their cost follows the
+# edit size, never the ROM size.
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+MAX_BYTES = 16 << 20
+COALESCE_MS = 500
+
+
+def _pack(values):
+    # A single value stays a scalar (np.uint8), anything else an array copy
+    first = values[0]
+    if (values == first).all():
+        return np.uint8(first)
+    return np.array(values, dtype=np.uint8, copy=True)
+
+
+def _nbytes(values):
+    return values.nbytes if isinstance(values, np.ndarray) else 1
+
+
+def _expand(values, length):
+    if isinstance(values, np.ndarray):
+        return values
+    return np.full(length, values, dtype=np.uint8)
+
+
+def _touches(delta, start, end):
+    return start <= delta.end and end >= delta.start
+
+
+class RangeDelta:
+    __slots__ = ("start", "end", "old", "new")
+
+    def __init__(self, start, end, old, new):
+        self.start = start
+        self.end = end
+        self.old = old
+        self.new = new
+
+    @property
+    def nbytes(self):
+        return 64 + _nbytes(self.old) + _nbytes(self.new)
+
+
+class History:
+    def __init__(self, classification, max_bytes=MAX_BYTES, coalesce_ms=COALESCE_MS):
+        self.classification = classification
+        self.max_bytes = max_bytes
+        self.coalesce_ms = coalesce_ms
+        self._undo = deque()       # steps (lists of RangeDelta), oldest first
+        self._redo = []
+        self._bytes = 0
+        self._group = None         # open transaction step, if any
+        self._last_time = 0.0
+        self._applying = False
+        self._suspended = 0
+        classification.listeners.append(self._on_change)
+
+    # --- Recording ---
+    def _on_change(self, start, end, old):
+        if self._applying or self._suspended or end <= start:
+            return
+        now = time.monotonic()
+        if self._group is not None:
+            step = self._group
+        elif (self._undo and (now - self._last_time) * 1000 < self.coalesce_ms
+              and _touches(self._undo[-1][-1], start, end)):
+            step = self._undo[-1]
+        else:
+            step = []
+            self._undo.append(step)
+        self._last_time = now
+        self._redo.clear()
+
+        if step and _touches(step[-1], start, end):
+            delta = step[-1]
+            self._bytes -= delta.nbytes
+            self._merge(delta, start, end, old)
+        else:
+            delta = RangeDelta(start, end, _pack(old), _pack(self.classification.state[start:end]))
+            step.append(delta)
+        self._bytes += delta.nbytes
+        self._evict()
+
+    def _merge(self, delta, start, end, old):
+        # Grow delta to cover [start, end): its own old values win where the
+        # spans overlap (they are older); the new values come from the map
+        lo, hi = min(start, delta.start), max(end, delta.end)
+        merged_old = np.empty(hi - lo, dtype=np.uint8)
+        merged_old[start - lo:end - lo] = old
+        merged_old[delta.start - lo:delta.end - lo] = _expand(delta.old, delta.end - delta.start)
+        delta.start, delta.end = lo, hi
+        delta.old = _pack(merged_old)
+        delta.new = _pack(self.classification.state[lo:hi])
+
+    def _evict(self):
+        # Oldest steps go first; the newest step always stays
+        while self._bytes > self.max_bytes and len(self._undo) > 1:
+            step = self._undo.popleft()
+            self._bytes -= sum(d.nbytes for d in step)
+
+    @contextmanager
+    def transaction(self):
+        # Everything inside becomes one undo step
+        if self._group is not None:
+            yield
+            return
+        self._group = []
+        try:
+            yield
+        finally:
+            step, self._group = self._group, None
+            if step:
+                self._undo.append(step)
+                self._evict()
+
+    @contextmanager
+    def suspended(self):
+        # Edits inside are not recorded (e.g. analyzer results streaming in)
+        self._suspended += 1
+        try:
+            yield
+        finally:
+            self._suspended -= 1
+
+    # --- Undo / redo ---
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def _write(self, step, attr):
+        self._applying = True
+        try:
+            for delta in (reversed(step) if attr == "old" else step):
+                length = delta.end - delta.start
+                self.classification.assign_values(delta.start, _expand(getattr(delta, attr), length))
+        finally:
+            self._applying = False
+
+    def undo(self):
+        if not self._undo:
+            return False
+        step = self._undo.pop()
+        self._bytes -= sum(d.nbytes for d in step)
+        self._write(step, "old")
+        self._redo.append(step)
+        self._last_time = 0.0   # Never coalesce into a step that was just undone
+        return True
+
+    def redo(self):
+        if not self._redo:
+            return False
+        step = self._redo.pop()
+        self._write(step, "new")
+        self._undo.append(step)
+        self._bytes += sum(d.nbytes for d in step)
+        self._last_time = 0.0
+        self._evict()
+        return True
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
@@ -0,0 +1,296 @@
+# --- Background analysis jobs ---
+# Runs ROM analysis (hashing, disassembly, and later pointer / graphics
+# scans) off the UI thread.  CPU-bound pure-Python jobs go to a process
+# pool; jobs that spend their time in hashlib / zlib / NumPy (which release
+# the GIL) can run on a thread pool instead and skip the pickling.
+#
+# Workers never hand results back through their futures alone: they post
+# messages (progress, partial results, notices, done / error) to one shared
+# queue, and the UI drains that queue once per frame with drain().  A screen
+# shown on top of the dashboard can drain just its own jobs (only=...); the
+# other messages are held for the dashboard's next drain.  cancel()
+# stops every job submitted so far: queued ones never start and running ones
+# stop at their next check().
+#
+# Job functions are plain module-level callables fn(ctx, *args) so they can
+# be pickled; ctx is a JobContext.  Nothing here imports pygame.
+import atexit
+import itertools
+import mmap
+import multiprocessing
+import os
+import queue
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from core.compression.probe import SYSTEM_CODECS, find_streams
+from core.coverage import map_rom
+from core.disasm import prepare
+from core.formats.loader import open_rom
+from core.pointers import scan_image, table_file_ranges
+from core.palettes import find_palettes
+from core.rom_ident import hash_mapped
+from core.search import open_index
+
+# Message kinds
+PROGRESS = "progress"   # payload: (done, total); total None when unknown
+RESULT = "result"       # payload: job-specific partial result
+NOTICE = "notice"       # payload: text for the notices list
+DONE = "done"           # payload: the job function's return value
+ERROR = "error"         # payload: error text
+CANCELLED = "cancelled"
+
+Message = namedtuple("Message", "job_id name kind payload")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    # Handed to job functions; valid in the worker process / thread
+    def __init__(self, job_id, name, messages, cancel_below):
+        self.job_id = job_id
+        self.name = name
+        self._messages = messages
+        self._cancel_below = cancel_below
+        self._last_progress = None
+
+    def post(self, kind, payload=None):
+        self._messages.put(Message(self.job_id, self.name, kind, payload))
+
+    def result(self, payload):
+        self.post(RESULT, payload)
+
+    def notice(self, text):
+        self.post(NOTICE, text)
+
+    def progress(self, done, total=None):
+        # Only whole-percent changes are posted, so tight loops can call this freely
+        step = int(done * 100 // total) if total else None
+        if step != self._last_progress or total is None:
+            self._last_progress = step
+            self.post(PROGRESS, (done, total))
+        self.check()
+
+    def cancelled(self):
+        return self.job_id < self._cancel_below.value
+
+    def check(self):
+        if self.cancelled():
+            raise JobCancelled()
+
+
+# --- Worker-side plumbing ---
+_worker_messages = None
+_worker_cancel = None
+
+
+def _init_worker(messages, cancel_below):
+    global _worker_messages, _worker_cancel
+    _worker_messages = messages
+    _worker_cancel = cancel_below
+
+
+def _run_job(job_id, name, fn, args, messages=None, cancel_below=None):
+    ctx = JobContext(job_id, name, messages or _worker_messages, cancel_below or _worker_cancel)
+    try:
+        ctx.check()
+        ctx.post(DONE, fn(ctx, *args))
+    except JobCancelled:
+        ctx.post(CANCELLED)
+    except Exception as e:
+        ctx.post(ERROR, "%s: %s" % (type(e).__name__, e))
+
+
+# --- UI-side scheduler ---
+class JobState:
+    def __init__(self, job_id, name):
+        self.job_id = job_id
+        self.name = name
+        self.done = 0
+        self.total = None
+        self.finished = False
+        self.error = None
+
+    @property
+    def fraction(self):
+        if self.finished:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(1.0, self.done / self.total)
+
+
+class AnalysisScheduler:
+    def __init__(self, workers=None, threads=2):
+        self.workers = workers
+        self.threads = threads
+        self._mp = multiprocessing.get_context()
+        self._messages = self._mp.Queue()
+        self._cancel_below = self._mp.Value("l", 0)
+        self._ids = itertools.count(1)
+        self._procs = None
+        self._thread_pool = None
+        self._futures = {}      # job_id -> future
+        self._held = []         # other jobs' messages read by a drain(only=...)
+        self.jobs = {}          # job_id -> JobState (current batch only)
+
+    def _process_pool(self):
+        if self._procs is None:
+            self._procs = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=self._mp,
+                initializer=_init_worker, initargs=(self._messages, self._cancel_below))
+        return self._procs
+
+    def submit(self, name, fn, *args, thread=False):
+        # Queue fn(ctx, *args); returns the job id used in its messages
+        job_id = next(self._ids)
+        self.jobs[job_id] = JobState(job_id, name)
+        if thread:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="analysis")
+            future = self._thread_pool.submit(_run_job, job_id, name, fn, args,
+                                              self._messages, self._cancel_below)
+        else:
+            future = self._process_pool().submit(_run_job, job_id, name, fn, args)
+        self._futures[job_id] = future
+        return job_id
+
+    def drain(self, limit=256, only=None):
+        # Pending messages (at most limit per call so one frame stays short);
+        # only: job ids to return, the rest wait for a drain without it
+        out = []
+        if only is None and self._held:
+            out, self._held = self._held[:limit], self._held[limit:]
+        read = len(out)
+        while read < limit:
+            try:
+                msg = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            read += 1
+            state = self.jobs.get(msg.job_id)
+            if state is None:
+                continue  # From a cancelled batch
+            if msg.kind == PROGRESS:
+                state.done, state.total = msg.payload
+            elif msg.kind in (DONE, ERROR, CANCELLED):
+                state.finished = True
+                state.error = msg.payload if msg.kind == ERROR else None
+                self._futures.pop(msg.job_id, None)
+            if only is not None and msg.job_id not in only:
+                self._held.append(msg)
+            else:
+                out.append(msg)
+        return out
+
+    @property
+    def busy(self):
+        return any(not state.finished for state in self.jobs.values())
+
+    def progress(self):
+        # Mean completion of the current batch, 0..1 (1 when idle)
+        if not self.jobs:
+            return 1.0
+        return sum(state.fraction for state in self.jobs.values()) / len(self.jobs)
+
+    def cancel(self):
+        # Stop everything submitted so far (e.g. the ROM was closed)
+        with self._cancel_below.get_lock():
+            self._cancel_below.value = next(self._ids)
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self.jobs.clear()
+        self._held.clear()
+
+    def shutdown(self):
+        self.cancel()
+        for pool in (self._procs, self._thread_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._procs = self._thread_pool = None
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    # Shared so the worker processes survive between ROMs
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AnalysisScheduler()
+        atexit.register(_scheduler.shutdown)
+    return _scheduler
+
+
+# --- Standard jobs ---
+def hash_rom(ctx, path):
+    # CRC32 + SHA-1; hashlib / zlib release the GIL, so this suits a thread
+    size = os.path.getsize(path)
+    if not size:
+        crc32, sha1 = hash_mapped(None, 0)
+    else:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            crc32, sha1 = hash_mapped(mm, size, ctx.progress)
+    return {"crc32": crc32, "sha1": sha1}
+
+
+def disassemble(ctx, path):
+    # Streams code ranges as RESULT messages while the worklist runs
+    dis, entries = prepare(path)
+    shown = [0.0]
+
+    def report(dis, pending):
+        # The total is unknown up front: estimate it from the worklist left at
+        # the instructions per trace so far; the bar never moves backwards
+        ctx.result(dis.take_new_ranges())
+        done = len(dis.instructions)
+        estimate = done / (done + pending * done / max(1, dis.traces))
+        shown[0] = max(shown[0], min(0.99, estimate))
+        ctx.progress(int(shown[0] * 1000), 1000)
+
+    dis.run(entries, report)
+    ctx.result(dis.take_new_ranges())
+    for address, message in dis.problems[:20]:
+        ctx.notice("Code at $%06X: %s." % (address, message))
+    return {"instructions": len(dis.instructions), "entry_points": len(dis.entry_points),
+            "routines": dis.routines()}
+
+
+def scan_pointers(ctx, path):
+    # Candidate pointer tables, sent as one RESULT of file ranges
+    with open_rom(path) as image:
+        tables = scan_image(image, ctx.progress)
+        ranges = table_file_ranges(image, tables)
+    ctx.result(ranges)
+    return {"tables": len(tables), "bytes": sum(end - start for start, end in ranges)}
+
+
+def find_compressed(ctx, path):
+    # Compressed streams of the codecs the system uses: file ranges as one
+    # RESULT, the streams themselves (at file offsets) as the return value
+    with open_rom(path) as image:
+        streams = find_streams(image.rom, SYSTEM_CODECS.get(image.system, ()), progress=ctx.progress)
+        ranges = [r for s in streams for r in image.file_ranges(s.offset, s.end)]
+        # These systems store the payload in one piece, so offsets just shift
+        streams = [s._replace(offset=image.rom_to_file(s.offset), end=image.rom_to_file(s.offset) + s.end - s.offset)
+                   for s in streams]
+    ctx.result(ranges)
+    return streams
+
+
+def search_palettes(ctx, path, fmt, size):
+    # Palette candidates of one size (NumPy throughout, so a thread suits it)
+    return find_palettes(map_rom(path), fmt, size, progress=ctx.progress)
+
+
+def index_rom(ctx, path, sha1):
+    # Makes sure the byte-search index is cached (the sort runs in NumPy, so a
+    # thread suits it) and returns the SHA-1 it is cached under; the UI maps
+    # it with SearchIndex.load instead of getting the arrays pickled back
+    ctx.progress(0, 1)
+    open_index(path, sha1)
+    ctx.progress(1, 1)
+    return sha1
@@ -0,0 +1,147 @@
+# --- Persistent ROM library index ---
+# Walks the configured ROM roots recursively with os.scandir (one pass per
+# directory, all extensions at once) and keeps path / size / mtime for every
+# ROM in an on-disk JSON index.  On later refreshes only directories whose
+# mtime changed are listed again; unchanged directories are taken from the
+# index as-is.
+#
+# Roots come from SUBPIXEL_ROM_ROOTS (os.pathsep separated) and default to
+# the current working directory, which is where the picker used to glob.
+import json
+import os
+import threading
+from collections import namedtuple
+
+ROM_EXTENSIONS = (".smc", ".sfc", ".nes", ".gen", ".md", ".gb", ".gba")
+INDEX_VERSION = 1
+
+RomEntry = namedtuple("RomEntry", "path name size mtime")
+
+
+def default_roots():
+    env = os.environ.get("SUBPIXEL_ROM_ROOTS")
+    if env:
+        return [p for p in env.split(os.pathsep) if p]
+    return [os.getcwd()]
+
+
+def default_index_path():
+    return os.path.join(os.path.expanduser("~"), ".subpixeldepths", "rom_index.json")
+
+
+class RomLibrary:
+    def __init__(self, roots=None, index_path=None):
+        self.roots = [os.path.abspath(r) for r in (roots or default_roots())]
+        self.index_path = index_path or default_index_path()
+        self.version = 0          # bumps whenever the entry list changes
+        self._dirs = {}           # dir -> {"mtime", "files": {name: [size, mtime]}, "subdirs"}
+        self._entries = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.loaded = self._load()
+
+    # --- On-disk index ---
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("roots") != self.roots:
+            return False
+        self._dirs = data.get("dirs", {})
+        self.version += 1
+        return True
+
+    def _save(self, dirs):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "roots": self.roots, "dirs": dirs}, f)
+        os.replace(tmp, self.index_path)
+
+    # --- Scanning ---
+    def _scan_dir(self, path, mtime):
+        files = {}
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            subdirs.append(entry.name)
+                    elif entry.name.lower().endswith(ROM_EXTENSIONS):
+                        st = entry.stat()
+                        files[entry.name] = [st.st_size, st.st_mtime_ns]
+                except OSError:
+                    continue  # Vanished or unreadable while listing
+        return {"mtime": mtime, "files": files, "subdirs": subdirs}
+
+    def refresh(self):
+        # Returns True when anything changed
+        old = self._dirs
+        dirs = {}
+        changed = False
+        stack = list(self.roots)
+        while stack:
+            path = stack.pop()
+            if path in dirs:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = old.get(path)
+            if cached is None or cached["mtime"] != mtime:
+                try:
+                    cached = self._scan_dir(path, mtime)
+                except OSError:
+                    continue
+                changed = True
+            dirs[path] = cached
+            stack.extend(os.path.join(path, name) for name in cached["subdirs"])
+        if dirs.keys() != old.keys():
+            changed = True
+
+        if changed:
+            with self._lock:
+                self._dirs = dirs
+                self._entries = None
+                self.version += 1
+            try:
+                self._save(dirs)
+            except OSError:
+                pass  # Index is only a cache
+        return changed
+
+    def refresh_async(self):
+        # Background refresh; watch .version (or .refreshing) to pick up results
+        if self.refreshing:
+            return
+        self._thread = threading.Thread(target=self.refresh, name="rom-library-refresh", daemon=True)
+        self._thread.start()
+
+    @property
+    def refreshing(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Queries ---
+    def _display_name(self, path):
+        for root in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                rel = os.path.relpath(path, root)
+                return rel if len(self.roots) == 1 else os.path.join(os.path.basename(root), rel)
+        return path
+
+    def entries(self):
+        # Sorted list of RomEntry (by display name)
+        with self._lock:
+            if self._entries is None:
+                out = []
+                for path, info in self._dirs.items():
+                    for name, (size, mtime) in info["files"].items():
+                        full = os.path.join(path, name)
+                        out.append(RomEntry(full, self._display_name(full), size, mtime))
+                out.sort(key=lambda e: e.name.lower())
+                self._entries = out
+            return self._entries
@@ -0,0 +1,107 @@
+# --- Type-ahead index over ROM names ---
+# Case-insensitive filtering for the ROM picker without rescanning the whole
+# list on every keystroke:
+#   * 1-2 character queries match the start of any word in the name, looked
+#     up by bisecting a sorted word-prefix table;
+#   * 3+ character queries match anywhere in the name, starting from the
+#     rarest trigram's posting list and verifying only those candidates;
+#   * a query that extends the previous one only re-checks the previous
+#     results.
+# Results are lists of positions into the original names list, in order.
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+
+
+class NameIndex:
+    def __init__(self, names):
+        self.names = names
+        self._lower = [name.lower() for name in names]
+        self._grams = None
+        self._words = None
+        self._word_ids = None
+        self._last_query = ""
+        self._last_result = None
+        self._build_lock = threading.Lock()
+
+    # --- Lazy builds (only pay for the kind of query actually typed) ---
+    def _build_grams(self):
+        with self._build_lock:
+            if self._grams is None:
+                self._grams = self._collect_grams()
+
+    def _collect_grams(self):
+        grams = {}
+        for i, name in enumerate(self._lower):
+            for gram in {name[j:j+3] for j in range(len(name) - 2)}:
+                postings = grams.get(gram)
+                if postings is None:
+                    postings = grams[gram] = array("I")
+                postings.append(i)
+        return grams
+
+    def _build_words(self):
+        with self._build_lock:
+            if self._words is None:
+                self._collect_words()
+
+    def _collect_words(self):
+        pairs = []
+        for i, name in enumerate(self._lower):
+            for word in set(_WORD_RE.findall(name)):
+                pairs.append((word, i))
+        pairs.sort()
+        self._word_ids = array("I", (i for _, i in pairs))
+        self._words = [word for word, _ in pairs]
+
+    def warm_async(self):
+        # Build both tables off the UI thread so the first keystroke is instant
+        def warm():
+            self._build_words()
+            self._build_grams()
+        threading.Thread(target=warm, name="name-index-warm", daemon=True).start()
+
+    # --- Queries ---
+    def _prefix_search(self, query):
+        if self._words is None:
+            self._build_words()
+        hits = set()
+        pos = bisect_left(self._words, query)
+        words = self._words
+        while pos < len(words) and words[pos].startswith(query):
+            hits.add(self._word_ids[pos])
+            pos += 1
+        return sorted(hits)
+
+    def _substring_search(self, query):
+        if self._grams is None:
+            self._build_grams()
+        best = None
+        for j in range(len(query) - 2):
+            postings = self._grams.get(query[j:j+3])
+            if postings is None:
+                return []
+            if best is None or len(postings) < len(best):
+                best = postings
+        lower = self._lower
+        return [i for i in best if query in lower[i]]
+
+    def search(self, query):
+        query = query.lower()
+        if not query:
+            result = list(range(len(self.names)))
+        elif (self._last_result is not None and len(self._last_query) >= 3
+              and query.startswith(self._last_query)):
+            # Narrowing: only the previous hits can still match
+            lower = self._lower
+            result = [i for i in self._last_result if query in lower[i]]
+        elif len(query) < 3:
+            result = self._prefix_search(query)
+        else:
+            result = self._substring_search(query)
+        self._last_query = query
+        self._last_result = result
+        return result
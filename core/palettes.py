@@ -0,0 +1,184 @@
+# --- Palettes: color formats, ROM palette search, converted-palette cache ---
+# Converts stored colors to RGB a whole range at a time: SNES / GBA BGR555
+# words, Genesis CRAM words (3 bits per channel) and NES palette bytes
+# (indices into the PPU's fixed master palette) all go through one
+# vectorized expression or table lookup.
+#
+# find_palettes() scores every even offset (every offset for NES) as the
+# start of a palette of `size` entries, again with whole-array operations:
+# all entries must be well-formed colors (spare bits clear), the colors
+# should change gently from entry to entry (palettes are mostly ramps),
+# most should not be black, and an entry 0 of black (the usual transparent
+# color) earns a bonus.  Running sums give every window's totals at once.
+#
+# Converted palettes are cached as tuples of RGB tuples, hashable so tile
+# and sprite caches can key on them.  Nothing here imports pygame.
+import bisect
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+# name -> bytes per stored color
+COLOR_FORMATS = {"bgr555": 2, "genesis": 2, "nes": 1}
+
+SYSTEM_COLOR_FORMATS = {
+    "SNES": "bgr555",
+    "GBA": "bgr555",
+    "GBC": "bgr555",
+    "Genesis": "genesis",
+    "NES": "nes",
+}
+
+# The 2C02 master palette as FCEUX ships it (indices 0x00-0x3F)
+NES_MASTER = np.array([
+    (0x74, 0x74, 0x74), (0x24, 0x18, 0x8C), (0x00, 0x00, 0xA8), (0x44, 0x00, 0x9C),
+    (0x8C, 0x00, 0x74), (0xA8, 0x00, 0x10), (0xA4, 0x00, 0x00), (0x7C, 0x08, 0x00),
+    (0x40, 0x2C, 0x00), (0x00, 0x44, 0x00), (0x00, 0x50, 0x00), (0x00, 0x3C, 0x14),
+    (0x18, 0x3C, 0x5C), (0x00, 0x00, 0x00), (0x00, 0x00, 0x00), (0x00, 0x00, 0x00),
+    (0xBC, 0xBC, 0xBC), (0x00, 0x70, 0xEC), (0x20, 0x38, 0xEC), (0x80, 0x00, 0xF0),
+    (0xBC, 0x00, 0xBC), (0xE4, 0x00, 0x58), (0xD8, 0x28, 0x00), (0xC8, 0x4C, 0x0C),
+    (0x88, 0x70, 0x00), (0x00, 0x94, 0x00), (0x00, 0xA8, 0x00), (0x00, 0x90, 0x38),
+    (0x00, 0x80, 0x88), (0x00, 0x00, 0x00), (0x00, 0x00, 0x00), (0x00, 0x00, 0x00),
+    (0xFC, 0xFC, 0xFC), (0x3C, 0xBC, 0xFC), (0x5C, 0x94, 0xFC), (0xCC, 0x88, 0xFC),
+    (0xF4, 0x78, 0xFC), (0xFC, 0x74, 0xB4), (0xFC, 0x74, 0x60), (0xFC, 0x98, 0x38),
+    (0xF0, 0xBC, 0x3C), (0x80, 0xD0, 0x10), (0x4C, 0xDC, 0x48), (0x58, 0xF8, 0x98),
+    (0x00, 0xE8, 0xD8), (0x78, 0x78, 0x78), (0x00, 0x00, 0x00), (0x00, 0x00, 0x00),
+    (0xFC, 0xFC, 0xFC), (0xA8, 0xE4, 0xFC), (0xC4, 0xD4, 0xFC), (0xD4, 0xC8, 0xFC),
+    (0xFC, 0xC4, 0xFC), (0xFC, 0xC4, 0xD8), (0xFC, 0xBC, 0xB0), (0xFC, 0xD8, 0xA8),
+    (0xFC, 0xE4, 0xA0), (0xE0, 0xFC, 0xA0), (0xA8, 0xF0, 0xBC), (0xB0, 0xFC, 0xCC),
+    (0x9C, 0xFC, 0xF0), (0xC4, 0xC4, 0xC4), (0x00, 0x00, 0x00), (0x00, 0x00, 0x00),
+], dtype=np.uint8)
+
+_EXPAND5 = ((np.arange(32) << 3) | (np.arange(32) >> 2)).astype(np.uint8)
+_EXPAND3 = (np.arange(8) * 255 // 7).astype(np.uint8)
+
+SCAN_BLOCK = 1 << 20
+MIN_SCORE = 0.5
+MAX_STEP = 3 * 255     # Largest possible color distance
+
+PaletteCandidate = namedtuple("PaletteCandidate", "offset score")
+
+
+# --- Conversion ---
+def _words(data, fmt):
+    # Stored colors of a byte range as integers, plus which are well-formed
+    data = np.asarray(data, dtype=np.uint8)
+    if fmt == "nes":
+        return data.astype(np.uint16), data < 0x40
+    data = data[:len(data) // 2 * 2]
+    if fmt == "bgr555":
+        words = data[0::2].astype(np.uint16) | (data[1::2].astype(np.uint16) << 8)
+        return words, (words & 0x8000) == 0
+    words = (data[0::2].astype(np.uint16) << 8) | data[1::2]
+    return words, (words & 0xF111) == 0
+
+
+def words_to_rgb(words, fmt):
+    # (n, 3) uint8 from stored color values
+    if fmt == "nes":
+        return NES_MASTER[words & 0x3F]
+    if fmt == "bgr555":
+        return np.stack((_EXPAND5[words & 0x1F], _EXPAND5[(words >> 5) & 0x1F], _EXPAND5[(words >> 10) & 0x1F]), axis=-1)
+    return np.stack((_EXPAND3[(words >> 1) & 7], _EXPAND3[(words >> 5) & 7], _EXPAND3[(words >> 9) & 7]), axis=-1)
+
+
+def to_rgb(data, offset, count, fmt):
+    # count colors stored at offset, as an (n, 3) uint8 array (short at the end of data)
+    raw = data[offset:offset + count * COLOR_FORMATS[fmt]]
+    return words_to_rgb(_words(raw, fmt)[0], fmt)
+
+
+# --- Search ---
+def _window_sums(values, size):
+    # Sum of every run of `size` consecutive values
+    sums = np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+    return sums[size:] - sums[:-size]
+
+
+def _score_block(data, fmt, size):
+    words, valid = _words(data, fmt)
+    n = len(words) - size + 1
+    if n <= 0:
+        return np.zeros(0)
+    rgb = words_to_rgb(words, fmt).astype(np.int16)
+    steps = np.abs(np.diff(rgb, axis=0)).sum(axis=1)
+    steps = np.append(steps, 0)
+    lit = (rgb.sum(axis=1) > 0)
+    ok = _window_sums(~valid, size)[:n] == 0
+    # Entry 0 is usually transparent: judge smoothness / brightness on the rest
+    smooth = 1.0 - _window_sums(steps[1:], size - 2)[:n] / (MAX_STEP * (size - 2))
+    bright = _window_sums(lit[1:], size - 1)[:n] / (size - 1)
+    distinct = _window_sums(steps[1:] > 0, size - 2)[:n] >= (size - 2) // 2
+    score = smooth * bright + 0.1 * (~lit[:n])
+    return np.where(ok & distinct, score, 0.0)
+
+
+def find_palettes(data, fmt, size=16, limit=64, progress=None):
+    # Best-scoring, non-overlapping palette candidates in data, best first
+    data = np.asarray(data, dtype=np.uint8)
+    width = COLOR_FORMATS[fmt]
+    span = size * width
+    found = []
+    phases = range(width)   # Word formats: even and odd starts
+    total = len(phases) * len(data)
+    done = 0
+    for phase in phases:
+        for block in range(phase, len(data), SCAN_BLOCK):
+            chunk = data[block:min(len(data), block + SCAN_BLOCK + span)]
+            scores = _score_block(chunk, fmt, size)[:SCAN_BLOCK // width]
+            hits = np.flatnonzero(scores >= MIN_SCORE)
+            found.extend(zip(scores[hits].tolist(), (block + hits * width).tolist()))
+            done += SCAN_BLOCK
+            if progress is not None:
+                progress(min(done, total), total)
+    found.sort(reverse=True)
+    starts = []
+    chosen = []
+    for score, offset in found:
+        i = bisect.bisect(starts, offset)
+        if (i and starts[i - 1] + span > offset) or (i < len(starts) and starts[i] < offset + span):
+            continue
+        starts.insert(i, offset)
+        chosen.append(PaletteCandidate(offset, score))
+        if len(chosen) >= limit:
+            break
+    return chosen
+
+
+# --- Converted-palette cache ---
+MAX_PALETTES = 256
+
+_palettes = OrderedDict()
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+
+def get_palette(source, data, offset, fmt, size):
+    # Palette at offset as a tuple of RGB tuples (cached)
+    key = (source, offset, fmt, size)
+    palette = _palettes.get(key)
+    if palette is not None:
+        _palettes.move_to_end(key)
+        _stats["hits"] += 1
+        return palette
+    _stats["misses"] += 1
+    palette = tuple(map(tuple, to_rgb(data, offset, size, fmt).tolist()))
+    _palettes[key] = palette
+    if len(_palettes) > MAX_PALETTES:
+        _palettes.popitem(last=False)
+        _stats["evictions"] += 1
+    return palette
+
+
+def clear():
+    _palettes.clear()
+
+
+def stats():
+    out = dict(_stats)
+    out["palettes_cached"] = len(_palettes)
+    return out
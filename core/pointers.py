@@ -0,0 +1,117 @@
+# --- Pointer-table detection ---
+# Reads the ROM as words of every pointer width the system uses, at every
+# alignment, as NumPy strided views (one column per byte), and maps every
+# word through the image's page table in one call.  Two neighbouring words
+# are "linked" when both land in ROM, differ, and point within MAX_STEP of
+# each other (table entries point at nearby data); a run of at least
+# MIN_ENTRIES linked words is a candidate pointer table.  Random 16-bit
+# words link by chance far more often than wider ones, hence the longer
+# minimum there.
+#
+# 16-bit pointers on the SNES are bank-relative, so their bank comes from
+# where the table itself sits (address_many()).  Genesis pointers are
+# big-endian longs, the rest little-endian.
+#
+# The payload is scanned CHUNK_WORDS words at a time, carrying open runs
+# across chunk edges, so memory stays bounded on 32 MB images.  Nothing
+# here imports pygame: scans run in worker processes.
+from collections import namedtuple
+
+import numpy as np
+
+from core.disasm import _merge_spans
+
+CHUNK_WORDS = 1 << 20
+
+# system -> [(width, byte order, bank-relative)]
+POINTER_FORMATS = {
+    "SNES": [(2, "little", True), (3, "little", False)],
+    "NES": [(2, "little", False)],
+    "GB": [(2, "little", False)],
+    "GBC": [(2, "little", False)],
+    "GBA": [(4, "little", False)],
+    "Genesis": [(4, "big", False)],
+}
+MAX_STEP = {2: 0x1000, 3: 0x4000, 4: 0x10000}
+MIN_ENTRIES = {2: 8, 3: 4, 4: 4}
+
+PointerTable = namedtuple("PointerTable", "start end width entries")
+# start / end: payload offsets of the table; entries: number of pointers
+
+
+def _words(data, start, count, width, order):
+    # count words of width bytes from data[start:], combined column by column
+    view = data[start:start + count * width].reshape(count, width)
+    shifts = range(width) if order == "little" else range(width - 1, -1, -1)
+    words = np.zeros(count, dtype=np.int64)
+    for column, shift in zip(range(width), shifts):
+        words |= view[:, column].astype(np.int64) << (8 * shift)
+    return words
+
+
+def _targets(image, words, positions, banked):
+    # Payload offset each word points at, -1 when it is not ROM
+    if banked:
+        home = image.pages.address_many(positions)
+        words = np.where(home >= 0, (home & ~0xFFFF) | words, -1)
+    return image.pages.translate_many(words)
+
+
+def scan_width(image, width, order="little", banked=False, phase=0, progress=None):
+    # Candidate tables of one pointer width at one alignment
+    data = np.frombuffer(image.rom, dtype=np.uint8)
+    count = (len(data) - phase) // width
+    step = MAX_STEP[width]
+    min_entries = MIN_ENTRIES[width]
+    tables = []
+    open_start = None   # First word of a run still going at the end of the last chunk
+    for c0 in range(0, count, CHUNK_WORDS):
+        c1 = min(count, c0 + CHUNK_WORDS + 1)   # One extra word links to the next chunk
+        positions = phase + np.arange(c0, c1, dtype=np.int64) * width
+        targets = _targets(image, _words(data, phase + c0 * width, c1 - c0, width, order), positions, banked)
+        gap = np.abs(np.diff(targets))
+        links = (targets[:-1] >= 0) & (targets[1:] >= 0) & (gap > 0) & (gap <= step)
+        # Runs of links as [start, end) link indices; link i joins words i and i + 1
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], links.view(np.int8), [0]))))
+        starts = edges[0::2] + c0
+        ends = edges[1::2] + c0
+        if open_start is not None:
+            if len(starts) and starts[0] == c0:
+                starts[0] = open_start
+            else:
+                starts = np.concatenate(([open_start], starts))
+                ends = np.concatenate(([c0], ends))
+            open_start = None
+        if len(ends) and ends[-1] == c0 + len(links) and c1 < count:
+            open_start = int(starts[-1])
+            starts, ends = starts[:-1], ends[:-1]
+        entries = ends - starts + 1
+        keep = entries >= min_entries
+        tables.extend(PointerTable(phase + s * width, phase + (e + 1) * width, width, n)
+                      for s, e, n in zip(starts[keep].tolist(), ends[keep].tolist(), entries[keep].tolist()))
+        if progress is not None:
+            progress(c1)
+    return tables
+
+
+def scan_image(image, progress=None):
+    # Every candidate table, all widths and alignments, by start offset
+    passes = [(w, order, banked, phase) for w, order, banked in POINTER_FORMATS.get(image.system, ())
+              for phase in range(w)]
+    total = sum(max(0, (len(image.rom) - phase) // w) for w, _, _, phase in passes)
+    tables = []
+    done = 0
+    for width, order, banked, phase in passes:
+        report = None
+        if progress is not None:
+            report = lambda n, base=done: progress(base + n, total)
+        tables.extend(scan_width(image, width, order, banked, phase, report))
+        done += max(0, (len(image.rom) - phase) // width)
+    tables.sort()
+    return tables
+
+
+def table_file_ranges(image, tables):
+    # Merged file ranges covered by the tables (what classification wants)
+    ranges = [r for t in tables for r in image.file_ranges(t.start, t.end)]
+    return _merge_spans(ranges)
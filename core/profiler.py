@@ -0,0 +1,200 @@
+# --- Frame profiler ---
+# Named timing scopes around the phases of the render loops (events,
+# assets, text, slicing, present...).  Per frame the scopes add up into a
+# phase -> time table; the last HISTORY frames feed the on-screen HUD
+# (ui.profiler_hud).  While a trace is recording, every scope also becomes
+# a Chrome trace event ("X", complete event), so spikes can be inspected in
+# chrome://tracing or Perfetto.
+#
+# Disabled (the default), scope() hands back one shared no-op context and
+# begin() / end() / the timed() wrappers return after a single flag test,
+# so the instrumented code pays a function call and nothing else.
+# SUBPIXEL_PROFILE=1 enables timing from the start; SUBPIXEL_TRACE=path
+# records a trace from the start and writes it there on exit.
+#
+# A scope re-entered under the same name (a slice helper drawing through
+# another one) is only counted once, by the outermost level.  Nothing here
+# imports pygame.
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+HISTORY = 60
+MAX_TRACE_EVENTS = 200000
+
+enabled = False
+tracing = False
+
+_frame = {}                         # phase -> seconds in the current frame
+_frame_start = None
+_history = deque(maxlen=HISTORY)    # (frame seconds, {phase: seconds})
+_open = {}                          # phase -> begin() time
+_depth = {}                         # phase -> nesting level
+_trace = deque(maxlen=MAX_TRACE_EVENTS)
+_origin = time.perf_counter()
+
+
+def _record(name, start, end):
+    _frame[name] = _frame.get(name, 0.0) + (end - start)
+    if tracing:
+        _trace.append({"name": name, "cat": "frame", "ph": "X", "pid": os.getpid(),
+                       "tid": threading.get_ident(), "ts": (start - _origin) * 1e6,
+                       "dur": (end - start) * 1e6})
+
+
+class _NullScope:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullScope()
+
+
+class _Scope:
+    __slots__ = ("name", "start", "outer")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        depth = _depth.get(self.name, 0)
+        _depth[self.name] = depth + 1
+        self.outer = depth == 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        _depth[self.name] -= 1
+        if self.outer:
+            _record(self.name, self.start, end)
+        return False
+
+
+# --- Instrumentation ---
+def scope(name):
+    # with scope("text"): ...
+    return _Scope(name) if enabled else _NULL
+
+
+def begin(name):
+    # For phases that span a long stretch of a loop body; pair with end()
+    if enabled:
+        _open[name] = time.perf_counter()
+
+
+def end(name):
+    if enabled:
+        start = _open.pop(name, None)
+        if start is not None:
+            _record(name, start, time.perf_counter())
+
+
+def timed(name):
+    # Decorator: the whole call is one scope
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with _Scope(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return wrap
+
+
+def frame_begin():
+    # Right after the loop stops waiting for input
+    global _frame_start
+    if enabled:
+        _frame_start = time.perf_counter()
+
+
+def frame_end():
+    # After the frame is presented; closes its phase table
+    global _frame_start
+    if not enabled or _frame_start is None:
+        return
+    now = time.perf_counter()
+    if tracing:
+        _trace.append({"name": "frame", "cat": "frame", "ph": "X", "pid": os.getpid(),
+                       "tid": threading.get_ident(), "ts": (_frame_start - _origin) * 1e6,
+                       "dur": (now - _frame_start) * 1e6})
+    _history.append((now - _frame_start, dict(_frame)))
+    _frame.clear()
+    _frame_start = None
+
+
+# --- Switches ---
+def set_enabled(on):
+    global enabled
+    enabled = bool(on) or tracing
+    if not enabled:
+        _frame.clear()
+        _open.clear()
+        _history.clear()
+
+
+def start_trace():
+    global tracing
+    tracing = True
+    set_enabled(True)
+
+
+def stop_trace():
+    global tracing
+    tracing = False
+
+
+def default_trace_path():
+    env = os.environ.get("SUBPIXEL_TRACE")
+    if env:
+        return env
+    name = time.strftime("trace-%Y%m%d-%H%M%S.json")
+    return os.path.join(os.path.expanduser("~"), ".subpixeldepths", "traces", name)
+
+
+def dump_trace(path=None):
+    # Writes the recorded events as Chrome trace JSON; returns the path
+    path = path or default_trace_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": list(_trace), "displayTimeUnit": "ms"}, f)
+    os.replace(tmp, path)
+    return path
+
+
+def clear_trace():
+    _trace.clear()
+
+
+# --- Queries ---
+def summary():
+    # (mean frame ms, max frame ms, [(phase, mean ms per frame)]) over the history
+    if not _history:
+        return 0.0, 0.0, []
+    frames = [total for total, _ in _history]
+    names = {}
+    for _, phases in _history:
+        for name in phases:
+            names[name] = names.get(name, 0.0) + phases[name]
+    n = len(_history)
+    return (sum(frames) / n * 1000, max(frames) * 1000,
+            [(name, total / n * 1000) for name, total in names.items()])
+
+
+if os.environ.get("SUBPIXEL_PROFILE"):
+    set_enabled(True)
+if os.environ.get("SUBPIXEL_TRACE"):
+    start_trace()
+    atexit.register(dump_trace)
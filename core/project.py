@@ -0,0 +1,403 @@
+# --- Project files: mmapped annotation arrays + append-only journal ---
+# A project is one binary file holding
+#   * a fixed header (magic, version, generation, section offsets),
+#   * the per-byte classification array (page aligned, so reopening a
+#     project maps it copy-on-write instead of parsing anything),
+#   * the label / comment table,
+#   * a small JSON metadata block (ROM path, hashes, timestamps).
+#
+# Edits are not written into that file.  They are recorded as journal
+# records (fills, raw byte runs, label / comment changes, metadata) and
+# save() only appends the new records to "<project>.journal-<generation>"
+# and fsyncs it, so a save costs the same on a 64 KB ROM and on a 64 MB one.
+# Until then they stay in memory, spilling to an anonymous temp file past
+# FLUSH_BYTES; nothing reaches the journal without a save, so quitting
+# without saving really discards the session.
+#
+# Only the user's layer is persisted: bytes without the CONFIRMED bit are
+# analyzer guesses, redone on every open, so they go to disk as UNKNOWN
+# (in journal records and in the base file alike) and a newer analysis is
+# free to guess differently.  suspended() skips journaling guesses at all.
+#
+# The first save, and every save once the journal grows past a threshold,
+# runs compact(): it snapshots the current state, starts the next
+# generation's journal, and writes the project file on a background
+# thread, so no save rewrites the whole array on the UI thread.  Opening a project replays every journal
+# whose generation is at least the project file's; older ones are stale
+# leftovers of a finished compaction and are deleted.
+import glob
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+from core.coverage import CONFIRMED, UNKNOWN
+
+MAGIC = b"SDPJ"
+FORMAT_VERSION = 1
+PAGE = 4096
+
+# magic, version, generation, rom size, then (offset, length) of the
+# state array, the label table and the metadata
+_HEADER = struct.Struct("<4sHxxIQ QQ QQ QQ")
+
+# Journal record: op, start, length, crc32 of the payload; then the payload
+_RECORD = struct.Struct("<BxxxQQI")
+OP_FILL = 1      # state[start:start+length] = payload[0]
+OP_BYTES = 2     # state[start:start+length] = payload
+OP_LABEL = 3     # labels[start] = payload (utf-8; empty removes)
+OP_COMMENT = 4   # comments[start] = payload (utf-8; empty removes)
+OP_META = 5      # metadata.update(json payload)
+
+# Label table entry: offset, kind (0 label / 1 comment), text length
+_LABEL = struct.Struct("<QBxH")
+
+COMPACT_BYTES = 4 << 20      # journal size that triggers compaction
+FLUSH_BYTES = 1 << 20        # pending records kept in memory before spilling to a temp file
+
+
+def default_project_dir():
+    return os.path.join(os.path.expanduser("~"), ".subpixeldepths", "projects")
+
+
+def project_path_for(rom_path, project_dir=None):
+    rom_path = os.path.abspath(rom_path)
+    digest = hashlib.sha1(rom_path.encode("utf-8")).hexdigest()[:12]
+    name = "%s-%s.sdproj" % (os.path.splitext(os.path.basename(rom_path))[0], digest)
+    return os.path.join(project_dir or default_project_dir(), name)
+
+
+def _align(n):
+    return (n + PAGE - 1) // PAGE * PAGE
+
+
+# --- Whole-file read / write ---
+def _pack_labels(labels, comments):
+    out = [struct.pack("<I", len(labels) + len(comments))]
+    for kind, table in ((0, labels), (1, comments)):
+        for offset in sorted(table):
+            text = table[offset].encode("utf-8")[:0xFFFF]
+            out.append(_LABEL.pack(offset, kind, len(text)))
+            out.append(text)
+    return b"".join(out)
+
+
+def _unpack_labels(raw):
+    labels, comments = {}, {}
+    if len(raw) < 4:
+        return labels, comments
+    (count,) = struct.unpack_from("<I", raw, 0)
+    pos = 4
+    for _ in range(count):
+        offset, kind, length = _LABEL.unpack_from(raw, pos)
+        pos += _LABEL.size
+        text = bytes(raw[pos:pos + length]).decode("utf-8", errors="replace")
+        pos += length
+        (comments if kind else labels)[offset] = text
+    return labels, comments
+
+
+def write_project_file(path, generation, state, labels, comments, meta):
+    # Writes to a temp file and swaps it in, so a crash never leaves half a project
+    labels_raw = _pack_labels(labels, comments)
+    meta_raw = json.dumps(meta).encode("utf-8")
+    state_off = PAGE
+    labels_off = _align(state_off + len(state))
+    meta_off = labels_off + len(labels_raw)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, generation, len(state),
+                          state_off, len(state), labels_off, len(labels_raw), meta_off, len(meta_raw))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.seek(state_off)
+        f.write(memoryview(state))
+        f.seek(labels_off)
+        f.write(labels_raw)
+        f.write(meta_raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_project_file(path):
+    # (generation, state memmap (copy-on-write), labels, comments, meta)
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            raise ValueError("Truncated project header")
+        (magic, version, generation, rom_size, state_off, state_len,
+         labels_off, labels_len, meta_off, meta_len) = _HEADER.unpack(raw)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a project file (or an unsupported version)")
+        f.seek(labels_off)
+        labels, comments = _unpack_labels(f.read(labels_len))
+        f.seek(meta_off)
+        meta = json.loads(f.read(meta_len).decode("utf-8") or "{}")
+    if state_len:
+        state = np.memmap(path, dtype=np.uint8, mode="c", offset=state_off, shape=(state_len,))
+    else:
+        state = np.zeros(0, dtype=np.uint8)
+    return generation, state, labels, comments, meta
+
+
+def _user_layer(values):
+    # Confirmed bytes as they are, analyzer guesses as UNKNOWN
+    return np.where(values & CONFIRMED, values, np.uint8(UNKNOWN))
+
+
+# --- Project ---
+class Project:
+    def __init__(self, path, rom_path, generation, state, labels, comments, meta):
+        self.path = path
+        self.rom_path = rom_path
+        self.generation = generation
+        self.state = state
+        self.labels = labels
+        self.comments = comments
+        self.meta = meta
+        self._pending = []          # encoded journal records not yet on disk
+        self._pending_bytes = 0
+        self._spill = None          # temp file with older unsaved records (never replayed)
+        self._spill_bytes = 0
+        self._suspended = 0
+        self._journal = None
+        self._journal_size = 0
+        self._compactor = None
+        self._replaying = False
+
+    # --- Open / create ---
+    @classmethod
+    def open_for_rom(cls, rom_path, project_dir=None):
+        # Existing project for this ROM, or a fresh one (nothing written until save)
+        path = project_path_for(rom_path, project_dir)
+        rom_size = os.path.getsize(rom_path)
+        try:
+            generation, state, labels, comments, meta = read_project_file(path)
+        except (OSError, ValueError):
+            generation, state, labels, comments, meta = None, None, {}, {}, {}
+        if state is None or len(state) != rom_size:
+            generation = 0
+            state = np.zeros(rom_size, dtype=np.uint8)
+            labels, comments = {}, {}
+            meta = {"rom_path": os.path.abspath(rom_path), "created": time.time()}
+            for stale in cls._journal_files(path):
+                os.remove(stale[1])
+        project = cls(path, rom_path, generation, state, labels, comments, meta)
+        project._replay()
+        return project
+
+    @staticmethod
+    def _journal_files(path):
+        # [(generation, file)] sorted by generation
+        out = []
+        for name in glob.glob(glob.escape(path) + ".journal-*"):
+            try:
+                out.append((int(name.rsplit("-", 1)[1]), name))
+            except ValueError:
+                continue
+        return sorted(out)
+
+    def _journal_path(self, generation=None):
+        return "%s.journal-%d" % (self.path, self.generation if generation is None else generation)
+
+    def _replay(self):
+        self._replaying = True
+        try:
+            for generation, name in self._journal_files(self.path):
+                if generation < self.generation:
+                    try:
+                        os.remove(name)  # Already folded into the project file
+                    except OSError:
+                        pass
+                    continue
+                with open(name, "rb") as f:
+                    data = f.read()
+                valid = self._apply_records(data)
+                if valid < len(data):
+                    # Torn tail from a crash mid-append: drop it
+                    with open(name, "r+b") as f:
+                        f.truncate(valid)
+                if generation > self.generation:
+                    self.generation = generation
+        finally:
+            self._replaying = False
+
+    def _apply_records(self, data):
+        # Applies well-formed records; returns how many bytes were valid
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            op, start, length, crc = _RECORD.unpack_from(data, pos)
+            body = pos + _RECORD.size
+            payload_len = {OP_FILL: 1, OP_BYTES: length}.get(op, length)
+            payload = data[body:body + payload_len]
+            if len(payload) < payload_len or zlib.crc32(payload) != crc:
+                break
+            if op == OP_FILL:
+                self.state[start:start + length] = payload[0]
+            elif op == OP_BYTES:
+                self.state[start:start + length] = np.frombuffer(payload, dtype=np.uint8)
+            elif op in (OP_LABEL, OP_COMMENT):
+                table = self.labels if op == OP_LABEL else self.comments
+                text = payload.decode("utf-8", errors="replace")
+                if text:
+                    table[start] = text
+                else:
+                    table.pop(start, None)
+            elif op == OP_META:
+                self.meta.update(json.loads(payload.decode("utf-8")))
+            pos = body + payload_len
+        return pos
+
+    # --- Recording edits ---
+    def _record(self, op, start, length, payload):
+        if self._replaying:
+            return
+        self._pending.append(_RECORD.pack(op, start, length, zlib.crc32(payload)) + payload)
+        self._pending_bytes += _RECORD.size + len(payload)
+        if self._pending_bytes >= FLUSH_BYTES:
+            self._spill_pending()
+
+    def _spill_pending(self):
+        # Moves the in-memory records to the temp file; save() copies it into the journal
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix="sdproj-")
+        self._spill.write(b"".join(self._pending))
+        self._spill_bytes += self._pending_bytes
+        self._pending = []
+        self._pending_bytes = 0
+
+    def _drop_spill(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._spill_bytes = 0
+
+    def attach(self, classification):
+        # Journal every change the classification map makes from now on
+        classification.listeners.append(self.record_state)
+
+    @contextmanager
+    def suspended(self):
+        # Changes inside are not journaled (analyzer guesses, redone on every open)
+        self._suspended += 1
+        try:
+            yield
+        finally:
+            self._suspended -= 1
+
+    def record_state(self, start, end, old=None):
+        if self._suspended:
+            return
+        values = _user_layer(self.state[start:end])
+        if not len(values):
+            return
+        first = values[0]
+        if (values == first).all():
+            self._record(OP_FILL, start, end - start, bytes((int(first),)))
+        else:
+            self._record(OP_BYTES, start, end - start, values.tobytes())
+
+    def set_label(self, offset, text):
+        self._set_text(self.labels, OP_LABEL, offset, text)
+
+    def set_comment(self, offset, text):
+        self._set_text(self.comments, OP_COMMENT, offset, text)
+
+    def _set_text(self, table, op, offset, text):
+        if text:
+            table[offset] = text
+        else:
+            table.pop(offset, None)
+        payload = (text or "").encode("utf-8")[:0xFFFF]
+        self._record(op, offset, len(payload), payload)
+
+    def update_meta(self, **fields):
+        self.meta.update(fields)
+        payload = json.dumps(fields).encode("utf-8")
+        self._record(OP_META, 0, len(payload), payload)
+
+    @property
+    def dirty(self):
+        return bool(self._pending) or self._spill_bytes > 0
+
+    # --- Saving ---
+    def _append_pending(self):
+        # Only called while saving: spilled records first, then the in-memory ones
+        if not self.dirty:
+            return
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._journal = open(self._journal_path(), "ab")
+            self._journal_size = self._journal.tell()
+        if self._spill is not None:
+            self._spill.seek(0)
+            shutil.copyfileobj(self._spill, self._journal)
+            self._journal_size += self._spill_bytes
+            self._drop_spill()
+        data = b"".join(self._pending)
+        self._journal.write(data)
+        self._journal_size += len(data)
+        self._pending = []
+        self._pending_bytes = 0
+
+    def save(self):
+        # Appends the edits since the last save and syncs; cost is independent of ROM size
+        if not os.path.exists(self.path) and self._compactor is None:
+            self.compact()   # First save: the base file is written in the background
+            return
+        self._append_pending()
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        if self._journal_size >= max(COMPACT_BYTES, len(self.state) // 2):
+            self.compact()
+
+    def compact(self, background=True):
+        # Folds the journal into a fresh project file (next generation)
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._append_pending()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        old_generation = self.generation
+        self.generation += 1
+        new_generation = self.generation
+        self._journal_size = 0
+        state = np.array(self.state, copy=True)   # Guesses are dropped on the worker thread
+        tables = (dict(self.labels), dict(self.comments), dict(self.meta, saved=time.time()))
+
+        def work():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_project_file(self.path, new_generation, _user_layer(state), *tables)
+            for generation, name in self._journal_files(self.path):
+                if generation <= old_generation:
+                    try:
+                        os.remove(name)
+                    except OSError:
+                        pass
+
+        if background:
+            self._compactor = threading.Thread(target=work, name="project-compact", daemon=True)
+            self._compactor.start()
+        else:
+            work()
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._pending = []
+        self._pending_bytes = 0
+        self._drop_spill()
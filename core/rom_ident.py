@@ -0,0 +1,328 @@
+# --- ROM identification ---
+# Hashes ROMs (CRC32 + SHA-1) by streaming them through mmap in chunks and
+# reads the cartridge header to tell what they are: system, internal title,
+# region, mapper / LoROM-HiROM and whether an SMC/SMD copier header is
+# present.  IdentService runs identify() in a process pool and caches the
+# results on disk keyed by (path, size, mtime), so a file is only hashed
+# again after it changes.
+#
+# Nothing here imports pygame: identify() runs in worker processes.
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 1 << 20
+CACHE_VERSION = 1
+
+SNES_REGIONS = {
+    0x00: "Japan", 0x01: "USA", 0x02: "Europe", 0x03: "Sweden", 0x04: "Finland",
+    0x05: "Denmark", 0x06: "France", 0x07: "Netherlands", 0x08: "Spain",
+    0x09: "Germany", 0x0A: "Italy", 0x0B: "China", 0x0D: "Korea",
+    0x0F: "Canada", 0x10: "Brazil", 0x11: "Australia",
+}
+SNES_MAPS = {0x20: "LoROM", 0x21: "HiROM", 0x22: "LoROM (SA-1)", 0x23: "LoROM (S-DD1)", 0x25: "ExHiROM"}
+
+GB_CART_TYPES = {
+    0x00: "ROM", 0x01: "MBC1", 0x02: "MBC1+RAM", 0x03: "MBC1+RAM+BATTERY",
+    0x05: "MBC2", 0x06: "MBC2+BATTERY", 0x0F: "MBC3+TIMER+BATTERY",
+    0x10: "MBC3+TIMER+RAM+BATTERY", 0x11: "MBC3", 0x12: "MBC3+RAM",
+    0x13: "MBC3+RAM+BATTERY", 0x19: "MBC5", 0x1A: "MBC5+RAM",
+    0x1B: "MBC5+RAM+BATTERY", 0x1C: "MBC5+RUMBLE", 0x1D: "MBC5+RUMBLE+RAM",
+    0x1E: "MBC5+RUMBLE+RAM+BATTERY", 0x20: "MBC6", 0x22: "MBC7",
+    0xFC: "POCKET CAMERA", 0xFE: "HuC3", 0xFF: "HuC1+RAM+BATTERY",
+}
+GBA_REGIONS = {"J": "Japan", "E": "USA", "P": "Europe", "D": "Germany", "F": "France",
+               "I": "Italy", "S": "Spain", "K": "Korea", "C": "China"}
+GENESIS_REGIONS = {"J": "Japan", "U": "USA", "E": "Europe"}
+
+NINTENDO_LOGO_START = b"\xce\xed\x66\x66"   # First bytes of the GB boot logo at 0x104
+
+
+# --- Header parsing (header = first bytes of the file as a bytes-like) ---
+def _ascii(raw):
+    text = bytes(raw).split(b"\x00")[0].decode("ascii", errors="replace")
+    return " ".join(text.split())
+
+
+def _parse_nes(mm, info):
+    h = mm[:16]
+    mapper = (h[6] >> 4) | (h[7] & 0xF0)
+    nes2 = (h[7] & 0x0C) == 0x08
+    if nes2:
+        mapper |= (h[8] & 0x0F) << 8
+    info.update(system="NES", format="NES 2.0" if nes2 else "iNES", mapper=mapper,
+                prg_size=h[4] * 16384, chr_size=h[5] * 8192)
+
+
+def _snes_header_score(mm, base, offset):
+    # Higher is more likely; see the usual internal-header heuristics
+    pos = base + offset
+    if pos + 0x40 > len(mm):
+        return -1
+    score = 0
+    map_mode = mm[pos + 0x15] & 0xEF   # Ignore the FastROM bit
+    checksum = mm[pos + 0x1E] | (mm[pos + 0x1F] << 8)
+    complement = mm[pos + 0x1C] | (mm[pos + 0x1D] << 8)
+    if checksum ^ complement == 0xFFFF:
+        score += 4
+    if (offset == 0x7FC0 and map_mode in (0x20, 0x22, 0x23)) or \
+       (offset == 0xFFC0 and map_mode == 0x21) or \
+       (offset == 0x40FFC0 and map_mode == 0x25):
+        score += 3
+    reset = mm[pos + 0x3C] | (mm[pos + 0x3D] << 8)
+    if reset >= 0x8000:
+        score += 2
+    if all(0x20 <= c < 0x7F for c in mm[pos:pos + 21]):
+        score += 1
+    return score
+
+
+def _parse_snes(mm, info, size):
+    base = 512 if size % 1024 == 512 else 0
+    best = max((0x7FC0, 0xFFC0, 0x40FFC0), key=lambda off: _snes_header_score(mm, base, off))
+    pos = base + best
+    if _snes_header_score(mm, base, best) < 0:
+        info.update(system="SNES", copier_header=bool(base))
+        return
+    map_mode = mm[pos + 0x15]
+    info.update(
+        system="SNES",
+        title=_ascii(mm[pos:pos + 21]),
+        region=SNES_REGIONS.get(mm[pos + 0x19], "Unknown"),
+        mapper=SNES_MAPS.get(map_mode & 0xEF, {0x7FC0: "LoROM", 0xFFC0: "HiROM"}.get(best, "ExHiROM")),
+        fastrom=bool(map_mode & 0x10),
+        copier_header=bool(base),
+        header_offset=pos,
+    )
+
+
+def _smd_block(mm, block_start):
+    # SMD copier dumps store each 16 KB block as 8 KB odd bytes + 8 KB even bytes
+    block = mm[block_start:block_start + 16384]
+    half = len(block) // 2
+    out = bytearray(half * 2)
+    out[1::2] = block[:half]
+    out[0::2] = block[half:half * 2]
+    return bytes(out)
+
+
+def _parse_genesis(mm, info, size):
+    smd = size % 16384 == 512 and len(mm) > 10 and mm[8] == 0xAA and mm[9] == 0xBB
+    head = _smd_block(mm, 512) if smd else mm[:0x200]
+    region_codes = _ascii(head[0x1F0:0x1F3])
+    info.update(
+        system="Genesis",
+        title=_ascii(head[0x150:0x180]) or _ascii(head[0x120:0x150]),
+        region=", ".join(GENESIS_REGIONS[c] for c in region_codes if c in GENESIS_REGIONS) or "Unknown",
+        copier_header=smd,
+        interleaved=smd,
+    )
+
+
+def _parse_gb(mm, info):
+    cgb = mm[0x143]
+    title_len = 11 if cgb in (0x80, 0xC0) else 16
+    info.update(
+        system="GBC" if cgb in (0x80, 0xC0) else "GB",
+        title=_ascii(mm[0x134:0x134 + title_len]),
+        region="Japan" if mm[0x14A] == 0 else "Overseas",
+        mapper=GB_CART_TYPES.get(mm[0x147], "0x%02X" % mm[0x147]),
+    )
+
+
+def _parse_gba(mm, info):
+    code = _ascii(mm[0xAC:0xB0])
+    info.update(
+        system="GBA",
+        title=_ascii(mm[0xA0:0xAC]),
+        game_code=code,
+        region=GBA_REGIONS.get(code[3:4], "Unknown"),
+    )
+
+
+def _parse_header(mm, info, size, ext):
+    if size >= 16 and mm[:4] == b"NES\x1a":
+        _parse_nes(mm, info)
+    elif size >= 0xC0 and mm[0xB2] == 0x96 and ext == ".gba":
+        _parse_gba(mm, info)
+    elif size >= 0x150 and mm[0x104:0x108] == NINTENDO_LOGO_START:
+        _parse_gb(mm, info)
+    elif ext in (".gen", ".md") or (size >= 0x104 and mm[0x100:0x104] == b"SEGA"):
+        _parse_genesis(mm, info, size)
+    elif ext in (".smc", ".sfc"):
+        _parse_snes(mm, info, size)
+
+
+def hash_mapped(mm, size, progress=None):
+    # (crc32 hex, sha1 hex) of a mapped file, a chunk at a time;
+    # progress(done, total) is called after each chunk
+    crc = 0
+    sha1 = hashlib.sha1()
+    if size:
+        view = memoryview(mm)
+        try:
+            for start in range(0, size, CHUNK_SIZE):
+                chunk = view[start:start + CHUNK_SIZE]
+                crc = zlib.crc32(chunk, crc)
+                sha1.update(chunk)
+                chunk.release()
+                if progress is not None:
+                    progress(min(size, start + CHUNK_SIZE), size)
+        finally:
+            view.release()
+    return "%08x" % crc, sha1.hexdigest()
+
+
+def identify(path):
+    # Runs in a worker process: hashes the file and reads its header
+    st = os.stat(path)
+    info = {
+        "path": path, "size": st.st_size, "mtime": st.st_mtime_ns,
+        "system": None, "title": None, "region": None, "mapper": None,
+        "copier_header": False,
+    }
+    info["crc32"], info["sha1"] = hash_mapped(None, 0)
+    if st.st_size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            info["crc32"], info["sha1"] = hash_mapped(mm, st.st_size)
+            _parse_header(mm, info, st.st_size, os.path.splitext(path)[1].lower())
+    return info
+
+
+def parse_header(mm, size, ext):
+    # Header fields of an already mapped file (ext: lower-case, with the dot)
+    info = {"system": None, "title": None, "region": None, "mapper": None, "copier_header": False}
+    if size:
+        _parse_header(mm, info, size, ext)
+    return info
+
+
+def read_header(path):
+    # Header fields only (no hashing), for analyzers that just need the layout
+    size = os.path.getsize(path)
+    ext = os.path.splitext(path)[1].lower()
+    if not size:
+        info = parse_header(None, 0, ext)
+    else:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            info = parse_header(mm, size, ext)
+    info.update(path=path, size=size)
+    return info
+
+
+# --- Persistent cache + process pool ---
+def default_cache_path():
+    return os.path.join(os.path.expanduser("~"), ".subpixeldepths", "rom_ident.json")
+
+
+class IdentService:
+    def __init__(self, cache_path=None, workers=None):
+        self.cache_path = cache_path or default_cache_path()
+        self.workers = workers
+        self.version = 0          # bumps whenever new results arrive
+        self._results = {}        # path -> info
+        self._pending = {}        # path -> (future, (size, mtime) when queued)
+        self._failed = {}         # path -> (size, mtime) of a file identify() failed on
+        self._pool = None
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION:
+            self._results = data.get("entries", {})
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self._results}, f)
+        os.replace(tmp, self.cache_path)
+        self._dirty = False
+
+    def lookup(self, path, size, mtime):
+        # Cached info if it still matches the file, else None
+        info = self._results.get(path)
+        if info is not None and info["size"] == size and info["mtime"] == mtime:
+            return info
+        return None
+
+    def request(self, path, size, mtime):
+        # Returns cached info now, or queues the file and returns None.
+        # size / mtime come from the caller's listing, which can be stale
+        # (the library only re-lists directories whose mtime changed), so on
+        # a mismatch the file is stat'ed again before it is hashed again.
+        info = self.lookup(path, size, mtime)
+        if info is not None or path in self._pending:
+            return info
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_size, st.st_mtime_ns)
+        info = self.lookup(path, *key)
+        if info is not None or self._failed.get(path) == key:
+            return info
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._pending[path] = (self._pool.submit(identify, path), key)
+        return None
+
+    @property
+    def busy(self):
+        return bool(self._pending)
+
+    def poll(self):
+        # Collect finished jobs; returns True when new results arrived
+        done = [path for path, (future, _) in self._pending.items() if future.done()]
+        for path in done:
+            future, key = self._pending.pop(path)
+            try:
+                self._results[path] = future.result()
+            except Exception:
+                self._failed[path] = key  # Unreadable file: leave it unidentified until it changes
+                continue
+            self._failed.pop(path, None)
+            self._dirty = True
+        if done:
+            self.version += 1
+            if not self._pending:
+                try:
+                    self.save()
+                except OSError:
+                    pass
+        return bool(done)
+
+    def shutdown(self):
+        for future, _ in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        try:
+            self.save()
+        except OSError:
+            pass
+
+
+_service = None
+
+
+def get_service():
+    # Shared across picker opens so the pool and results stay warm
+    global _service
+    if _service is None:
+        _service = IdentService()
+        atexit.register(_service.shutdown)
+    return _service
@@ -0,0 +1,200 @@
+# --- Incremental validation rules (feeds the Notices panel) ---
+# Project entities (routines, objects, abilities, animations, button
+# bindings) live in an EntityStore keyed by (kind, id).  A rule is checked
+# once per entity of its subject kind; while it runs, every entity it reads
+# through the RuleContext, and every "who references X" query it makes, is
+# recorded as a dependency.  The engine keeps the reverse index
+# (dependency -> rule evaluations), so an edit only re-runs the evaluations
+# that actually looked at what changed.  Nothing is ever re-validated
+# wholesale, which keeps the badge and popup instant on big projects.
+#
+# Entity fields that hold another entity's key (a (kind, id) tuple), or a
+# list of keys, count as references; the store indexes them both ways.
+from collections import namedtuple
+
+Rule = namedtuple("Rule", "name subject check")
+# check(ctx, key, entity) -> notice text, or None when the entity is fine
+
+
+def _refs(fields):
+    out = set()
+    for value in fields.values():
+        if isinstance(value, tuple) and len(value) == 2:
+            out.add(value)
+        elif isinstance(value, list):
+            out.update(v for v in value if isinstance(v, tuple) and len(v) == 2)
+    return out
+
+
+class EntityStore:
+    def __init__(self):
+        self._entities = {}     # key -> fields dict
+        self._by_kind = {}      # kind -> set of keys
+        self._referrers = {}    # key -> set of keys whose fields point at it
+        self.listeners = []     # fn(dependency) for everything an edit touched
+
+    def get(self, key):
+        return self._entities.get(key)
+
+    def keys(self, kind):
+        return self._by_kind.get(kind, ())
+
+    def referrers(self, key):
+        return self._referrers.get(key, ())
+
+    def put(self, key, fields):
+        # Insert or replace an entity
+        old = self._entities.get(key)
+        old_refs = _refs(old) if old is not None else set()
+        new_refs = _refs(fields)
+        self._entities[key] = fields
+        self._by_kind.setdefault(key[0], set()).add(key)
+        touched = [key]
+        if old is None:
+            touched.append(("kind", key[0]))
+        for target in old_refs - new_refs:
+            self._referrers[target].discard(key)
+            touched.append(("refs", target))
+        for target in new_refs - old_refs:
+            self._referrers.setdefault(target, set()).add(key)
+            touched.append(("refs", target))
+        self._notify(touched)
+
+    def update(self, key, **fields):
+        entity = dict(self._entities.get(key) or {})
+        entity.update(fields)
+        self.put(key, entity)
+
+    def remove(self, key):
+        old = self._entities.pop(key, None)
+        if old is None:
+            return
+        self._by_kind[key[0]].discard(key)
+        touched = [key, ("kind", key[0])]
+        for target in _refs(old):
+            self._referrers[target].discard(key)
+            touched.append(("refs", target))
+        self._notify(touched)
+
+    def _notify(self, touched):
+        for listener in self.listeners:
+            listener(touched)
+
+
+class RuleContext:
+    # What a rule sees of the store; records each read as a dependency
+    def __init__(self, store):
+        self.store = store
+        self.deps = set()
+
+    def get(self, key):
+        self.deps.add(key)
+        return self.store.get(key)
+
+    def referrers(self, key, kind=None):
+        self.deps.add(("refs", key))
+        found = [k for k in self.store.referrers(key) if kind is None or k[0] == kind]
+        self.deps.update(found)
+        return found
+
+    def keys(self, kind):
+        self.deps.add(("kind", kind))
+        return list(self.store.keys(kind))
+
+
+class RuleEngine:
+    def __init__(self, store, rules):
+        self.store = store
+        self.rules = list(rules)
+        self.version = 0                 # bumps whenever the notice list changes
+        self._results = {}               # (rule index, key) -> notice text
+        self._deps = {}                  # (rule index, key) -> set of dependencies
+        self._dependents = {}            # dependency -> set of (rule index, key)
+        self._dirty = set()
+        self._sorted = None
+        self._by_subject = {}
+        for i, rule in enumerate(self.rules):
+            self._by_subject.setdefault(rule.subject, []).append(i)
+            self._dirty.update((i, key) for key in store.keys(rule.subject))
+        store.listeners.append(self._on_change)
+
+    def _on_change(self, touched):
+        for dep in touched:
+            self._dirty.update(self._dependents.get(dep, ()))
+            if dep[0] not in ("kind", "refs"):
+                # A new / replaced entity is also a subject for its kind's rules
+                self._dirty.update((i, dep) for i in self._by_subject.get(dep[0], ()))
+
+    @property
+    def pending(self):
+        return bool(self._dirty)
+
+    def update(self):
+        # Re-evaluates only what the edits since the last call touched; True if notices changed
+        changed = False
+        dirty, self._dirty = self._dirty, set()
+        for unit in dirty:
+            i, key = unit
+            for dep in self._deps.pop(unit, ()):
+                dependents = self._dependents.get(dep)
+                if dependents is not None:
+                    dependents.discard(unit)
+            entity = self.store.get(key)
+            text = None
+            if entity is not None:
+                ctx = RuleContext(self.store)
+                ctx.deps.add(key)
+                text = self.rules[i].check(ctx, key, entity)
+                self._deps[unit] = ctx.deps
+                for dep in ctx.deps:
+                    self._dependents.setdefault(dep, set()).add(unit)
+            if text != self._results.get(unit):
+                changed = True
+                if text is None:
+                    del self._results[unit]
+                else:
+                    self._results[unit] = text
+        if changed:
+            self._sorted = None
+            self.version += 1
+        return changed
+
+    def notices(self):
+        # Notice texts, grouped by rule in declaration order
+        if self._sorted is None:
+            self._sorted = [self._results[unit] for unit in sorted(self._results, key=lambda u: (u[0], str(u[1])))]
+        return self._sorted
+
+
+# --- Built-in rules ---
+def _name(entity, key):
+    return entity.get("name") or "%s %s" % key
+
+
+def _routine_shared_by_enemies(ctx, key, routine):
+    enemies = [k for k in ctx.referrers(key, "object") if (ctx.get(k) or {}).get("category") == "enemy"]
+    if len(enemies) > 1:
+        count = "twice" if len(enemies) == 2 else "%d times" % len(enemies)
+        return "Routine '%s' assigned %s to enemy objects." % (_name(routine, key), count)
+    return None
+
+
+def _object_missing_frames(ctx, key, obj):
+    for anim_key in obj.get("animations", ()):
+        anim = ctx.get(anim_key)
+        if anim is None or not anim.get("frames"):
+            return "Object '%s' is missing animation frames." % _name(obj, key)
+    return None
+
+
+def _ability_unbound(ctx, key, ability):
+    if not ctx.referrers(key, "binding"):
+        return "Ability '%s' has no assigned button." % _name(ability, key)
+    return None
+
+
+DEFAULT_RULES = (
+    Rule("shared-enemy-routine", "routine", _routine_shared_by_enemies),
+    Rule("missing-frames", "object", _object_missing_frames),
+    Rule("unbound-ability", "ability", _ability_unbound),
+)
@@ -0,0 +1,211 @@
+# --- Indexed byte-pattern search ---
+# Each ROM gets a bigram index: every file offset, sorted by the two bytes
+# that start there (a stable radix sort, so offsets stay ascending within
+# a bigram), plus a 65537-entry table of where each bigram's run begins.
+# A query anchors on its rarest fully-known byte pair, takes that pair's
+# offsets straight from the index and checks the remaining bytes for all
+# candidates at once with NumPy, so even a 32 MB ROM answers in
+# milliseconds.  Patterns without a known pair fall back to a vectorized
+# scan on one byte.
+#
+# Indexes are cached under ~/.subpixeldepths/search keyed by the ROM's
+# SHA-1 and memory-mapped on load, so a ROM is only indexed once.
+#
+# Patterns are bytes plus an optional mask (0xFF = must match, 0x00 =
+# wildcard, anything else = only those bits); parse_pattern() reads the
+# text form, e.g. 'A9 ?? 8D 1? 21 "TITLE"'.
+#
+# Nothing here imports pygame: indexes are built in worker processes.
+import hashlib
+import os
+
+import numpy as np
+
+from core.coverage import map_rom
+
+CACHE_VERSION = 1
+BIGRAMS = 1 << 16
+
+
+def default_cache_dir():
+    return os.path.join(os.path.expanduser("~"), ".subpixeldepths", "search")
+
+
+def index_paths(sha1, cache_dir=None):
+    base = os.path.join(cache_dir or default_cache_dir(), "%s.v%d" % (sha1, CACHE_VERSION))
+    return base + ".pos.npy", base + ".ofs.npy"
+
+
+# --- Patterns ---
+def parse_pattern(text):
+    # Hex pairs ("?" = unknown nibble) and "quoted" ASCII -> (pattern, mask)
+    pattern = bytearray()
+    mask = bytearray()
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif c == '"':
+            end = text.find('"', i + 1)
+            if end < 0:
+                raise ValueError("unterminated string in pattern")
+            chunk = text[i + 1:end].encode("ascii")
+            pattern += chunk
+            mask += b"\xff" * len(chunk)
+            i = end + 1
+        else:
+            pair = text[i:i + 2]
+            if len(pair) < 2 or any(ch not in "0123456789abcdefABCDEF?" for ch in pair):
+                raise ValueError("bad byte %r in pattern" % pair)
+            value = m = 0
+            for ch in pair:
+                value <<= 4
+                m <<= 4
+                if ch != "?":
+                    value |= int(ch, 16)
+                    m |= 0xF
+            pattern.append(value)
+            mask.append(m)
+            i += 2
+    return bytes(pattern), bytes(mask)
+
+
+def _normalize(pattern, mask):
+    pattern = np.frombuffer(bytes(pattern), dtype=np.uint8)
+    if mask is None:
+        mask = np.full(len(pattern), 0xFF, dtype=np.uint8)
+    else:
+        mask = np.frombuffer(bytes(mask), dtype=np.uint8)
+        if len(mask) != len(pattern):
+            raise ValueError("pattern and mask lengths differ")
+    return pattern & mask, mask
+
+
+# --- Index ---
+class SearchIndex:
+    def __init__(self, data, positions=None, offsets=None):
+        self.data = data                # uint8 array of the whole file
+        self.size = len(data)
+        self.positions = positions      # None = unindexed, queries scan
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, data):
+        data = np.asarray(data, dtype=np.uint8)
+        if len(data) < 2:
+            return cls(data, np.zeros(0, dtype=np.uint32), np.zeros(BIGRAMS + 1, dtype=np.int64))
+        keys = (data[:-1].astype(np.uint16) << 8) | data[1:]
+        positions = np.argsort(keys, kind="stable").astype(np.uint32)
+        offsets = np.zeros(BIGRAMS + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=BIGRAMS), out=offsets[1:])
+        return cls(data, positions, offsets)
+
+    def save(self, sha1, cache_dir=None):
+        pos_path, ofs_path = index_paths(sha1, cache_dir)
+        os.makedirs(os.path.dirname(pos_path), exist_ok=True)
+        # Offsets are written last: a cache entry without them is ignored
+        for path, array in ((pos_path, self.positions), (ofs_path, self.offsets)):
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+        return pos_path
+
+    @classmethod
+    def load(cls, data, sha1, cache_dir=None):
+        # Cached index for this ROM, or None
+        pos_path, ofs_path = index_paths(sha1, cache_dir)
+        try:
+            offsets = np.load(ofs_path)
+            positions = np.load(pos_path, mmap_mode="r") if offsets[-1] else np.zeros(0, dtype=np.uint32)
+        except (OSError, ValueError):
+            return None
+        if len(offsets) != BIGRAMS + 1 or len(positions) != max(0, len(data) - 1):
+            return None
+        return cls(data, positions, offsets)
+
+    # --- Queries ---
+    def _count(self, key):
+        return int(self.offsets[key + 1] - self.offsets[key])
+
+    def _candidates(self, pattern, mask):
+        # Start offsets worth checking, ascending, and the pattern bytes they already satisfy
+        n = len(pattern)
+        last = self.size - n      # last possible start
+        anchor = None
+        if self.positions is not None:
+            pairs = [(self._count((int(pattern[j]) << 8) | int(pattern[j + 1])), j)
+                     for j in range(n - 1) if mask[j] == 0xFF and mask[j + 1] == 0xFF]
+            if pairs:
+                anchor = min(pairs)[1]
+        if anchor is not None:
+            key = (int(pattern[anchor]) << 8) | int(pattern[anchor + 1])
+            hits = self.positions[self.offsets[key]:self.offsets[key + 1]].astype(np.int64) - anchor
+            hits = hits[(hits >= 0) & (hits <= last)]
+            return hits, (anchor, anchor + 1)
+        known = [j for j in range(n) if mask[j]]
+        if not known:
+            return np.arange(last + 1, dtype=np.int64), ()
+        j = max(known, key=lambda j: bin(int(mask[j])).count("1"))
+        window = self.data[j:j + last + 1]
+        if mask[j] == 0xFF:
+            hits = np.flatnonzero(window == pattern[j])
+        else:
+            hits = np.flatnonzero((window & mask[j]) == pattern[j])
+        return hits.astype(np.int64), (j,)
+
+    def find(self, pattern, mask=None, start=0, limit=None):
+        # Every offset >= start where pattern matches, ascending
+        pattern, mask = _normalize(pattern, mask)
+        if not len(pattern) or len(pattern) > self.size:
+            return np.zeros(0, dtype=np.int64)
+        hits, checked = self._candidates(pattern, mask)
+        if start:
+            hits = hits[hits >= start]
+        for j in range(len(pattern)):
+            if not len(hits):
+                break
+            if j in checked or not mask[j]:
+                continue
+            values = self.data[hits + j]
+            if mask[j] != 0xFF:
+                values = values & mask[j]
+            hits = hits[values == pattern[j]]
+        return hits[:limit] if limit is not None else hits
+
+    def find_next(self, pattern, mask=None, start=0, wrap=True):
+        # First match at or after start (wrapping to the top), or -1
+        hits = self.find(pattern, mask, start, limit=1)
+        if not len(hits) and wrap and start:
+            hits = self.find(pattern, mask, 0, limit=1)
+        return int(hits[0]) if len(hits) else -1
+
+    def find_all(self, patterns):
+        # Multi-pattern query: [(offset, pattern index)] sorted by offset.
+        # patterns are bytes or (pattern, mask) pairs
+        found = []
+        for i, p in enumerate(patterns):
+            pattern, mask = p if isinstance(p, tuple) else (p, None)
+            found.extend((int(offset), i) for offset in self.find(pattern, mask))
+        found.sort()
+        return found
+
+
+def rom_sha1(data):
+    return hashlib.sha1(memoryview(data)).hexdigest()
+
+
+def open_index(rom_path, sha1=None, cache_dir=None, data=None):
+    # Index for a ROM: from the cache when possible, else built and cached
+    if data is None:
+        data = map_rom(rom_path)
+    if sha1 is None:
+        sha1 = rom_sha1(data)
+    index = SearchIndex.load(data, sha1, cache_dir)
+    if index is None:
+        index = SearchIndex.build(data)
+        try:
+            index.save(sha1, cache_dir)
+        except OSError:
+            pass  # Read-only home: still usable, just not cached
+    return index
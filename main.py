@@ -4,10 +4,31 @@ from core.assets import (
     FONT_REGULAR_FILE, FONT_REGULAR_MAP,
     BTN_IMAGE, LOGO_IMAGE
 )
-from ui.elements import (
-    draw_text, draw_9slice, draw_9slice_button, draw_3slice_h,
-    draw_3slice_button, draw_3slice_v, get_text_width
+from ui.elements import draw_9slice_button
+from ui.panel_cache import (
+    draw_9slice, draw_3slice_h, draw_3slice_button, draw_3slice_v,
+    draw_9slice_flat
 )
+from ui.text_cache import draw_text, get_text_width
+from core.asset_cache import get_image, get_sound, invalidate as invalidate_assets
+from ui.compositor import Compositor
+from ui.frame_scheduler import FrameScheduler
+from ui import profiler_hud
+from core import profiler
+from core.library import RomLibrary
+from core.name_index import NameIndex
+from core.rom_ident import get_service as get_ident_service, read_header
+from core.coverage import ClassificationMap, CODE, DATA
+from core.project import Project
+from core.history import History
+from core.rules import EntityStore, RuleEngine, DEFAULT_RULES
+from screens.hex_view import hex_view_screen
+from screens.tile_view import tile_view_screen
+from core.disasm import SYSTEMS as DISASM_SYSTEMS
+from core.pointers import POINTER_FORMATS
+from core.compression.probe import SYSTEM_CODECS
+from core.search import SearchIndex
+from core.jobs import get_scheduler as get_analysis, hash_rom, disassemble, index_rom, scan_pointers, find_compressed, RESULT, NOTICE, DONE, ERROR
 import pygame
 import json
 import os
@@ -37,28 +58,40 @@ BTN_SPACING = 22     # 1x, adjust to taste
 MARGIN_X = 30
 MARGIN_Y = 48
 
-import glob
-
 def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regular_cmap):
     # --- Load popup assets ---
-    popup_img = pygame.image.load(asset_path("popup_main_9slice.png")).convert_alpha()
-    header_img = pygame.image.load(asset_path("panel_headerspecial_3slice.png")).convert_alpha()
-    close_btn_img = pygame.image.load(asset_path("button_closepopup_3state.png")).convert_alpha()
-    std_btn_img = pygame.image.load(asset_path("button_standard_3state.png")).convert_alpha()
-    scroll_bar_img = pygame.image.load(asset_path("button_scroll_bar.png")).convert_alpha()
-    scroll_pos_img = pygame.image.load(asset_path("button_scroll_position.png")).convert_alpha()
-    divider_img = pygame.image.load(asset_path("divider.png")).convert_alpha()
-
-    # --- ROM list logic ---
-    exts = ["*.smc", "*.sfc", "*.nes", "*.gen", "*.md", "*.gb", "*.gba"]
-    rom_files = []
-    for ext in exts:
-        rom_files.extend(glob.glob(ext))
-    rom_files = sorted(rom_files)
+    popup_img = get_image("popup_main_9slice.png")
+    header_img = get_image("panel_headerspecial_3slice.png")
+    close_btn_img = get_image("button_closepopup_3state.png")
+    std_btn_img = get_image("button_standard_3state.png")
+    scroll_bar_img = get_image("button_scroll_bar.png")
+    scroll_pos_img = get_image("button_scroll_position.png")
+    divider_img = get_image("divider.png")
+
+    # --- ROM list logic (persistent library index, refreshed in the background) ---
+    library = RomLibrary()
+    if library.loaded and library.entries():
+        library.refresh_async()
+    else:
+        library.refresh()  # Nothing cached to show yet (first run or empty index)
+    library_version = library.version
+    rom_entries = library.entries()
+    rom_files = [entry.name for entry in rom_entries]
+
+    # --- Header identification (hashed in a process pool, cached on disk) ---
+    ident = get_ident_service()
+
+    # --- Type-ahead filter: view holds positions into rom_files ---
+    query = ""
+    name_index = NameIndex(rom_files)
+    name_index.warm_async()
+    view = name_index.search(query)
 
     if not rom_files:
         # Simple dialog for no files, reusing the modal graphics
-        show_modal_message(screen, popup_img, header_img, font_img, font_cmap, "No ROM files found.\nPlace your ROMs next to main.py and try again.")
+        show_modal_message(screen, popup_img, header_img, font_img, font_cmap,
+                           "No ROM files found.\nPlace your ROMs in the current folder, or set\n"
+                           "SUBPIXEL_ROM_ROOTS to your ROM folders,\nand try again.")
         return None
 
     # Popup geometry (native: 320x172, scaled up by current SCALE)
@@ -92,7 +125,6 @@ def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regu
     cancel_btn_x = modal_w // 2 + btn_pad//2
     btn_y = modal_h - btn_h - 18
 
-    scrollable = len(rom_files) > max_visible
     scroll_idx = 0
     selected = None
     hover_idx = None
@@ -103,8 +135,37 @@ def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regu
     dragging = False
     drag_offset = 0
 
-    clock = pygame.time.Clock()
+    # Dim whatever is behind the modal once, instead of stacking overlays every frame
+    backdrop = screen.copy()
+    overlay = pygame.Surface((screen.get_width(), screen.get_height()), pygame.SRCALPHA)
+    overlay.fill((0,0,0, 140))
+    backdrop.blit(overlay, (0,0))
+
+    scheduler = FrameScheduler()
     while running:
+        events = scheduler.poll()
+        profiler.frame_begin()
+
+        # -- Pick up background library refreshes --
+        if library.version != library_version:
+            library_version = library.version
+            selected_path = rom_entries[view[selected]].path if selected is not None else None
+            rom_entries = library.entries()
+            rom_files = [entry.name for entry in rom_entries]
+            name_index = NameIndex(rom_files)
+            name_index.warm_async()
+            view = name_index.search(query)
+            selected = next((i for i, pos in enumerate(view) if rom_entries[pos].path == selected_path), None)
+            scheduler.request_redraw()
+        if library.refreshing:
+            scheduler.wake_in(250)
+        if ident.poll():
+            scheduler.request_redraw()  # New titles/systems to show
+        if ident.busy:
+            scheduler.wake_in(100)
+        scrollable = len(view) > max_visible
+        scroll_idx = max(0, min(scroll_idx, len(view) - max_visible)) if scrollable else 0
+
         mx, my = pygame.mouse.get_pos()
         mx = mx // SCALE - x
         my = my // SCALE - y
@@ -113,7 +174,7 @@ def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regu
         hover_idx = None
         if list_x <= mx <= list_x + list_w and list_y <= my < list_y + max_visible * row_h:
             idx = (my - list_y) // row_h + scroll_idx
-            if 0 <= idx < len(rom_files):
+            if 0 <= idx < len(view):
                 hover_idx = idx
 
         # -- Hover for OK/Cancel --
@@ -133,123 +194,158 @@ def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regu
 
         sb_rect = pygame.Rect(sb_x, sb_y, sb_w, sb_h)
 
-        # Scroll thumb logic (unchanged except for width)
-        thumb_h = max(16, int(scroll_h * max_visible / len(rom_files))) if scrollable else 0
-        max_scroll = len(rom_files) - max_visible if scrollable else 0
+        # Scroll thumb logic (works on the filtered view)
+        thumb_h = max(16, int(scroll_h * max_visible / len(view))) if scrollable else 0
+        max_scroll = len(view) - max_visible if scrollable else 0
         thumb_y = sb_y + int(scroll_idx / max(1, max_scroll) * (sb_h - thumb_h)) if scrollable else sb_y
         thumb_rect = pygame.Rect(sb_x, thumb_y, sb_w, thumb_h)
 
-        # --- Draw modal ---
-        # 1. Dim the background
-        overlay = pygame.Surface((screen.get_width(), screen.get_height()), pygame.SRCALPHA)
-        overlay.fill((0,0,0, 140))
-        screen.blit(overlay, (0,0))
-
-        # 2. Popup window
-        modal_surface = pygame.Surface((modal_w, modal_h), pygame.SRCALPHA)
-        draw_9slice(modal_surface, 0, 0, modal_w, modal_h, popup_img)
-        # 3. Header
-        draw_3slice_h(modal_surface, 0, 0, modal_w, header_img, 8, 8)
-        # Centered header in modal
-        header_label = "Select a ROM file"
+        if scheduler.should_draw():
+            # --- Draw modal (only when something changed) ---
+            profiler.begin("draw")
+            # 1. Dimmed background
+            screen.blit(backdrop, (0,0))
+
+            # 2. Popup window
+            modal_surface = pygame.Surface((modal_w, modal_h), pygame.SRCALPHA)
+            draw_9slice(modal_surface, 0, 0, modal_w, modal_h, popup_img)
+            # 3. Header
+            draw_3slice_h(modal_surface, 0, 0, modal_w, header_img, 8, 8)
+            # Centered header in modal
+            header_label = "Select a ROM file"
         
-        text_w = get_text_width(header_label, font_img, font_cmap, 1)
-        text_x = (modal_w - text_w) // 2
-        draw_text(modal_surface, "Select a ROM file", 105, 0, font_img, font_cmap, color=(255,224,128), scale=1)
-        # 4. Close button
-        close_state = 1 if close_hover else 0
-        modal_surface.blit(close_btn_img.subsurface((close_state*12,0,12,12)), (modal_w-20,4))
-
-        # 5. File list + highlight + selection
-        for i in range(max_visible):
-            idx = i + scroll_idx
-            if idx >= len(rom_files): break
-            yrow = list_y + i * row_h
-            highlight_x = 16
-            highlight_w = modal_w - 32
-            highlight_y = yrow - 1
-            highlight_h = row_h - 2
-            if idx == selected:
-                pygame.draw.rect(modal_surface, (40,70,140), (highlight_x, highlight_y, highlight_w, highlight_h), border_radius=5)
-            elif idx == hover_idx:
-                pygame.draw.rect(modal_surface, (32,40,80), (highlight_x, highlight_y, highlight_w, highlight_h), border_radius=5)
-
-            draw_text(modal_surface, rom_files[idx], highlight_x + 6, yrow, font_regular_img, font_regular_cmap, color=(255,255,255), scale=1)
-        # 6. Scroll bar (if needed)
-        if scrollable:
-            # Draw scroll bar background, edge to edge
-            draw_3slice_v(modal_surface, sb_x, sb_y, sb_h, scroll_bar_img, tsize=8, bsize=8)
-            # Draw scroll handle/position with correct height and position
-            draw_3slice_v(modal_surface, thumb_rect.x, thumb_rect.y, thumb_rect.height, scroll_pos_img, tsize=8, bsize=8)
-        # 7. Divider
-        divider_y = list_y + max_visible * row_h + 2
-        modal_surface.blit(pygame.transform.scale(divider_img, (modal_w-32, 2)), (16, divider_y))
-        # --- Calculate button widths and positions based on "Cancel" text ---
-        ok_text = "OK"
-        cancel_text = "Cancel"
-        font_scale = 1
-        btn_padding = 12
-
-        # Measure "Cancel" text for button width
-        cancel_text_w = get_text_width(cancel_text, font_img, font_cmap, font_scale)
-        btn_w = cancel_text_w + btn_padding*2
-        gap = 16  # space between buttons
-
-        # Center both buttons at the bottom
-        total_w = btn_w * 2 + gap
-        ok_btn_x = (modal_w - total_w) // 2
-        cancel_btn_x = ok_btn_x + btn_w + gap
+            text_w = get_text_width(header_label, font_img, font_cmap, 1)
+            text_x = (modal_w - text_w) // 2
+            if query:
+                # Type-ahead query replaces the title while filtering
+                find_label = "Find: " + query + "_"
+                find_x = (modal_w - get_text_width(find_label, font_img, font_cmap, 1)) // 2
+                draw_text(modal_surface, find_label, find_x, 0, font_img, font_cmap, color=(255,224,128), scale=1)
+            else:
+                draw_text(modal_surface, "Select a ROM file", 105, 0, font_img, font_cmap, color=(255,224,128), scale=1)
+            # 4. Close button
+            close_state = 1 if close_hover else 0
+            modal_surface.blit(close_btn_img.subsurface((close_state*12,0,12,12)), (modal_w-20,4))
+
+            # 5. File list + highlight + selection (only the visible window of the view)
+            if not view:
+                draw_text(modal_surface, "No matching ROMs", 22, list_y, font_regular_img, font_regular_cmap, color=(160,160,160), scale=1)
+            for i in range(max_visible):
+                idx = i + scroll_idx
+                if idx >= len(view): break
+                yrow = list_y + i * row_h
+                highlight_x = 16
+                highlight_w = modal_w - 32
+                highlight_y = yrow - 1
+                highlight_h = row_h - 2
+                if idx == selected:
+                    pygame.draw.rect(modal_surface, (40,70,140), (highlight_x, highlight_y, highlight_w, highlight_h), border_radius=5)
+                elif idx == hover_idx:
+                    pygame.draw.rect(modal_surface, (32,40,80), (highlight_x, highlight_y, highlight_w, highlight_h), border_radius=5)
+
+                draw_text(modal_surface, rom_files[view[idx]], highlight_x + 6, yrow, font_regular_img, font_regular_cmap, color=(255,255,255), scale=1)
+
+                # Identified title + system, right-aligned (system only if the title doesn't fit)
+                entry = rom_entries[view[idx]]
+                info = ident.request(entry.path, entry.size, entry.mtime)
+                if info and info.get("system"):
+                    tag_right = highlight_x + highlight_w - 6
+                    name_right = highlight_x + 6 + get_text_width(rom_files[view[idx]], font_regular_img, font_regular_cmap, 1) + 8
+                    tag = info["system"]
+                    if info.get("title"):
+                        full_tag = info["title"] + "  " + tag
+                        if tag_right - get_text_width(full_tag, font_regular_img, font_regular_cmap, 1) >= name_right:
+                            tag = full_tag
+                    tag_w = get_text_width(tag, font_regular_img, font_regular_cmap, 1)
+                    if tag_right - tag_w >= name_right:
+                        draw_text(modal_surface, tag, tag_right - tag_w, yrow, font_regular_img, font_regular_cmap, color=(128,192,255), scale=1)
+            # Queue identification for the next page too, so scrolling finds it ready
+            for idx in range(scroll_idx + max_visible, min(len(view), scroll_idx + 2 * max_visible)):
+                entry = rom_entries[view[idx]]
+                ident.request(entry.path, entry.size, entry.mtime)
+            # 6. Scroll bar (if needed)
+            if scrollable:
+                # Draw scroll bar background, edge to edge
+                draw_3slice_v(modal_surface, sb_x, sb_y, sb_h, scroll_bar_img, tsize=8, bsize=8)
+                # Draw scroll handle/position with correct height and position
+                draw_3slice_v(modal_surface, thumb_rect.x, thumb_rect.y, thumb_rect.height, scroll_pos_img, tsize=8, bsize=8)
+            # 7. Divider
+            divider_y = list_y + max_visible * row_h + 2
+            modal_surface.blit(pygame.transform.scale(divider_img, (modal_w-32, 2)), (16, divider_y))
+            # --- Calculate button widths and positions based on "Cancel" text ---
+            ok_text = "OK"
+            cancel_text = "Cancel"
+            font_scale = 1
+            btn_padding = 12
+
+            # Measure "Cancel" text for button width
+            cancel_text_w = get_text_width(cancel_text, font_img, font_cmap, font_scale)
+            btn_w = cancel_text_w + btn_padding*2
+            gap = 16  # space between buttons
+
+            # Center both buttons at the bottom
+            total_w = btn_w * 2 + gap
+            ok_btn_x = (modal_w - total_w) // 2
+            cancel_btn_x = ok_btn_x + btn_w + gap
         
-        # Place buttons a fixed margin above the bottom of the modal window
-        btn_margin_bottom = 24  # (or whatever margin you want)
-        btn_y = divider_y + divider_gap
-
-        # Calculate vertical centering for button text
-        btn_text_y = btn_y + (16 - font_img.get_height() * font_scale) // 2
-
-        # 8. OK and Cancel buttons
-        ok_state = 2 if ok_hover and selected is not None else 0
-        ok_disabled = (selected is None)
-        if ok_disabled:
-            draw_3slice_button(modal_surface, ok_btn_x, btn_y, btn_w, std_btn_img, 0)  # always use idle state when grayed
-            overlay = pygame.Surface((btn_w, 16), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 0))  # transparent background
-            pygame.draw.rect(overlay, (100, 100, 100, 140), overlay.get_rect(), border_radius=2)
-            modal_surface.blit(overlay, (ok_btn_x, btn_y))
-        else:
-            draw_3slice_button(modal_surface, ok_btn_x, btn_y, btn_w, std_btn_img, ok_state)
+            # Place buttons a fixed margin above the bottom of the modal window
+            btn_margin_bottom = 24  # (or whatever margin you want)
+            btn_y = divider_y + divider_gap
+
+            # Calculate vertical centering for button text
+            btn_text_y = btn_y + (16 - font_img.get_height() * font_scale) // 2
+
+            # 8. OK and Cancel buttons
+            ok_state = 2 if ok_hover and selected is not None else 0
+            ok_disabled = (selected is None)
+            if ok_disabled:
+                draw_3slice_button(modal_surface, ok_btn_x, btn_y, btn_w, std_btn_img, 0)  # always use idle state when grayed
+                overlay = pygame.Surface((btn_w, 16), pygame.SRCALPHA)
+                overlay.fill((0, 0, 0, 0))  # transparent background
+                pygame.draw.rect(overlay, (100, 100, 100, 140), overlay.get_rect(), border_radius=2)
+                modal_surface.blit(overlay, (ok_btn_x, btn_y))
+            else:
+                draw_3slice_button(modal_surface, ok_btn_x, btn_y, btn_w, std_btn_img, ok_state)
 
-        draw_text(
-            modal_surface, ok_text,
-            ok_btn_x + (btn_w - get_text_width(ok_text, font_img, font_cmap, font_scale)) // 2,
-            btn_text_y,
-            font_img, font_cmap,
-            color=(180,180,180) if ok_disabled else (255,255,255), scale=font_scale
-        )
+            draw_text(
+                modal_surface, ok_text,
+                ok_btn_x + (btn_w - get_text_width(ok_text, font_img, font_cmap, font_scale)) // 2,
+                btn_text_y,
+                font_img, font_cmap,
+                color=(180,180,180) if ok_disabled else (255,255,255), scale=font_scale
+            )
 
-        # --- Cancel Button ---
-        cancel_state = 2 if cancel_hover else 0
-        draw_3slice_button(modal_surface, cancel_btn_x, btn_y, btn_w, std_btn_img, cancel_state)
+            # --- Cancel Button ---
+            cancel_state = 2 if cancel_hover else 0
+            draw_3slice_button(modal_surface, cancel_btn_x, btn_y, btn_w, std_btn_img, cancel_state)
 
-        # Center and draw Cancel text on button
-        draw_text(
-            modal_surface, cancel_text,
-            cancel_btn_x + (btn_w - get_text_width(cancel_text, font_img, font_cmap, font_scale)) // 2,
-            btn_text_y,
-            font_img, font_cmap,
-            color=(255,255,255), scale=font_scale
-        )
+            # Center and draw Cancel text on button
+            draw_text(
+                modal_surface, cancel_text,
+                cancel_btn_x + (btn_w - get_text_width(cancel_text, font_img, font_cmap, font_scale)) // 2,
+                btn_text_y,
+                font_img, font_cmap,
+                color=(255,255,255), scale=font_scale
+            )
         
-        # 9. Blit modal to screen
-        real_w, real_h = screen.get_size()
-        upscale_modal = pygame.transform.scale(modal_surface, (modal_w * SCALE, modal_h * SCALE))
-        real_x = x * SCALE
-        real_y = y * SCALE
-        screen.blit(upscale_modal, (real_x, real_y))
-        pygame.display.flip()
+            profiler.end("draw")
+
+            # 9. Blit modal to screen
+            with profiler.scope("present"):
+                real_w, real_h = screen.get_size()
+                upscale_modal = pygame.transform.scale(modal_surface, (modal_w * SCALE, modal_h * SCALE))
+                real_x = x * SCALE
+                real_y = y * SCALE
+                screen.blit(upscale_modal, (real_x, real_y))
+                if profiler_hud.visible:
+                    profiler_hud.draw_hud(screen, 0, 0, font_regular_img, font_regular_cmap, SCALE)
+                pygame.display.flip()
+            profiler.frame_end()
+            scheduler.frame_done()
         
         # --- Event handling ---
-        for event in pygame.event.get():
+        profiler.begin("events")
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -264,7 +360,7 @@ def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regu
                 if close_btn_rect.collidepoint(mx, my):
                     return None
                 if ok_btn_rect.collidepoint(mx, my) and selected is not None:
-                    return rom_files[selected]
+                    return rom_entries[view[selected]].path
                 if cancel_btn_rect.collidepoint(mx, my):
                     return None
                 # Scroll thumb drag
@@ -275,7 +371,7 @@ def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regu
                 if hover_idx is not None:
                     if event.button == 1:
                         if selected == hover_idx:
-                            return rom_files[selected]  # Double click (second click)
+                            return rom_entries[view[selected]].path  # Double click (second click)
                         selected = hover_idx
             elif event.type == pygame.MOUSEBUTTONUP:
                 dragging = False
@@ -285,18 +381,35 @@ def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regu
                 my = max(sb_y + thumb_h//2, min(sb_y + sb_h - thumb_h//2, my))
                 rel = (my - sb_y - thumb_h//2) / (sb_h - thumb_h)
                 scroll_idx = int(round(rel * max_scroll))
+            elif event.type == pygame.TEXTINPUT:
+                # Type-ahead: narrow the view on every keystroke
+                query += event.text
+                view = name_index.search(query)
+                scroll_idx = 0
+                selected = 0 if view else None
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
-                    return None
-                elif event.key == pygame.K_DOWN:
+                    if query:
+                        query = ""
+                        view = name_index.search(query)
+                        scroll_idx = 0
+                        selected = None
+                    else:
+                        return None
+                elif event.key == pygame.K_BACKSPACE and query:
+                    query = query[:-1]
+                    view = name_index.search(query)
+                    scroll_idx = 0
+                    selected = 0 if view else None
+                elif event.key == pygame.K_DOWN and view:
                     if selected is None:
                         selected = scroll_idx
-                    elif selected < len(rom_files) - 1:
+                    elif selected < len(view) - 1:
                         selected += 1
                         if selected >= scroll_idx + max_visible:
                             scroll_idx = min(scroll_idx+1, max_scroll)
                     hover_idx = selected
-                elif event.key == pygame.K_UP:
+                elif event.key == pygame.K_UP and view:
                     if selected is None:
                         selected = scroll_idx
                     elif selected > 0:
@@ -306,23 +419,28 @@ def pick_rom_file_modal(screen, font_img, font_cmap, font_regular_img, font_regu
                     hover_idx = selected
                 elif event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER:
                     if selected is not None:
-                        return rom_files[selected]
+                        return rom_entries[view[selected]].path
                 elif event.key == pygame.K_PAGEUP and scrollable:
                     scroll_idx = max(scroll_idx-max_visible, 0)
                 elif event.key == pygame.K_PAGEDOWN and scrollable:
                     scroll_idx = min(scroll_idx+max_visible, max_scroll)
+                elif event.key in (pygame.K_F3, pygame.K_F4):
+                    profiler_hud.handle_key(event)
             elif event.type == pygame.MOUSEWHEEL and scrollable:
                 if event.y < 0 and scroll_idx < max_scroll:
                     scroll_idx = min(scroll_idx+1, max_scroll)
                 elif event.y > 0 and scroll_idx > 0:
                     scroll_idx = max(scroll_idx-1, 0)
+        profiler.end("events")
         if dragging and scrollable:
             mx, my = pygame.mouse.get_pos()
             my = my // SCALE - y
             rel = (my - sb_y - thumb_h//2) / (sb_h - thumb_h)
             scroll_idx = int(round(rel * max_scroll))
             scroll_idx = max(0, min(scroll_idx, max_scroll))
-        clock.tick(60)
+        if events:
+            # State may have changed after this frame was drawn
+            scheduler.request_redraw()
 
 def show_modal_message(screen, popup_img, header_img, font_img, font_cmap, message):
     # Simple message-only modal (for no ROM files)
@@ -340,10 +458,11 @@ def show_modal_message(screen, popup_img, header_img, font_img, font_cmap, messa
     screen.blit(overlay, (0,0))
     screen.blit(pygame.transform.scale(modal_surface, (modal_w*scale, modal_h*scale)), (x*scale, y*scale))
     pygame.display.flip()
-    # Wait for ESC or click
+    # Wait for ESC or click (blocks in event.wait instead of polling)
+    scheduler = FrameScheduler()
     waiting = True
     while waiting:
-        for event in pygame.event.get():
+        for event in scheduler.poll():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -351,7 +470,10 @@ def show_modal_message(screen, popup_img, header_img, font_img, font_cmap, messa
                 waiting = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 waiting = False
-        pygame.time.wait(20)
+            elif event.type == pygame.VIDEOEXPOSE:
+                screen.blit(pygame.transform.scale(modal_surface, (modal_w*scale, modal_h*scale)), (x*scale, y*scale))
+                pygame.display.flip()
+        scheduler.redraw = False  # Drawn once above; nothing animates here
 
 # --- Main ---
 import os
@@ -363,7 +485,14 @@ from screens.title import title_screen
 # Suppress pygame community message
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
 
-def main():
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--batch" in argv:
+        # Headless: no window; the dummy driver keeps anything that touches SDL happy
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        from core.batch import run
+        return run([arg for arg in argv if arg != "--batch"])
+
     pygame.init()
     real_screen = update_window_size()
     pygame.display.set_caption("SubpixelDepths - ROM Analyzer")
@@ -375,7 +504,7 @@ def main():
         pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
 def get_best_scale(native_w, native_h):
     info = pygame.display.Info()
@@ -388,7 +517,7 @@ def get_best_scale(native_w, native_h):
 
 def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_img, font_regular_cmap, rom_filename):
     global SCALE
-    clock = pygame.time.Clock()
+    scheduler = FrameScheduler()
     dashboard_running = True
 
     # --- Maximization state ---
@@ -400,63 +529,56 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
     screen = pygame.Surface((SCREEN_W, SCREEN_H))  # 1x pixel buffer
 
     btn_clicked = None
-    # --- Notices Popup Assets ---
-    popup_main_img = pygame.image.load(asset_path("popup_main_9slice.png")).convert_alpha()
-    close_popup_btn_img = pygame.image.load(asset_path("button_closepopup_3state.png")).convert_alpha()
-        
-    # --- Notices Popup Assets ---
-    popup_main_img = pygame.image.load(asset_path("popup_main_9slice.png")).convert_alpha()
-    close_popup_btn_img = pygame.image.load(asset_path("button_closepopup_3state.png")).convert_alpha()
-
-    # --- Notices Popup Assets ---
-    popup_main_img = pygame.image.load(asset_path("popup_main_9slice.png")).convert_alpha()
-    close_popup_btn_img = pygame.image.load(asset_path("button_closepopup_3state.png")).convert_alpha()
-    # --- Notices Popup State ---
-    notices_popup_open = False
-    notices = [
-        "Routine 'Jump' assigned twice to enemy objects.",
-        "Object 'Magic Key' is missing animation frames.",
-        "Ability 'Wall Slide' has no assigned button."
+    # --- Tray icons (6 total, spaced out to fit the tray width) ---
+    tray_icons = [
+        ("icon_system_main_undo.png",    "sfx_main_undo.wav"),
+        ("icon_system_main_redo.png",    "sfx_main_redo.wav"),
+        ("icon_system_main_save.png",    "sfx_main_save.wav"),
+        ("icon_system_main_backtodashboard.png", "sfx_main_back.wav"),
+        ("icon_system_main_preferences.png", "sfx_main_preferences.wav"),
+        ("icon_system_main_help.png",    "sfx_main_help.wav"),
     ]
-    notices_selected = None
-    notices_hovered = None
-    
-    # Asset loads ...
-    header_img = pygame.image.load(asset_path("shell_header_3slice.png")).convert_alpha()
-    shell_main_img = pygame.image.load(asset_path("shell_main_9slice.png")).convert_alpha()
-    header_icon = pygame.image.load(asset_path("icon_header_dashboard.png")).convert_alpha()
-    shade_side = pygame.image.load(asset_path("shell_headershadesides.png")).convert_alpha()
-    panel_tray = pygame.image.load(asset_path("panel_traymenu_3slice.png")).convert_alpha()
-    box_embed = pygame.image.load(asset_path("box_embeddedtext_3slice.png")).convert_alpha()
-    pb_bar = pygame.image.load(asset_path("system_progressbar_bar_3slice.png")).convert_alpha()
-    btn_win_min = pygame.image.load(asset_path("button_shell_minimize_3state.png")).convert_alpha()
-    btn_win_max = pygame.image.load(asset_path("button_shell_maximize_3state.png")).convert_alpha()
-    btn_win_windowed = pygame.image.load(asset_path("button_shell_windowed_3state.png")).convert_alpha()
-    btn_win_exit = pygame.image.load(asset_path("button_shell_exit_3state.png")).convert_alpha()
-    tooltip_img = pygame.image.load(asset_path("popup_tooltips_9slice.png")).convert_alpha()
-
-    # --- Notices Popup State ---
-    notices_popup_open = False
-    notices = [
-        "Routine 'Jump' assigned twice to enemy objects.",
-        "Object 'Magic Key' is missing animation frames.",
-        "Ability 'Wall Slide' has no assigned button."
-    ]
-    notices_selected = None
-    notices_hovered = None
+    assets_stale = True  # (re)fetch shared surfaces on entry and after a display mode change
 
-    # --- Notices Popup Assets ---
-    popup_main_img = pygame.image.load(asset_path("popup_main_9slice.png")).convert_alpha()
-    close_popup_btn_img = pygame.image.load(asset_path("button_closepopup_3state.png")).convert_alpha()
     # --- Notices Popup State ---
     notices_popup_open = False
-    notices = [
-        "Routine 'Jump' assigned twice to enemy objects.",
-        "Object 'Magic Key' is missing animation frames.",
-        "Ability 'Wall Slide' has no assigned button."
-    ]
+    # Validation rules over the project's entities (re-checked incrementally)
+    # plus whatever the analysis jobs report
+    entities = EntityStore()
+    rule_engine = RuleEngine(entities, DEFAULT_RULES)
+    analysis_notices = []
+    notices = []
+    notices_stale = True
     notices_selected = None
     notices_hovered = None
+    NOTICE_ROWS = 4  # What fits in the popup; the rest are counted in its title bar
+
+    # --- Per-byte classification of the ROM (drives the coverage numbers) ---
+    # Backed by the ROM's project file (mapped, plus any journaled edits)
+    project = Project.open_for_rom(rom_filename)
+    classification = ClassificationMap(rom_filename, state=project.state)
+    project.attach(classification)
+    history = History(classification)
+
+    # --- Background analysis (results drained once per frame) ---
+    analysis = get_analysis()
+    analysis.submit("hash", hash_rom, rom_filename, thread=True)
+    search_index = None   # Byte-search index, built once the hash is known
+    compressed_streams = []
+    rom_system = read_header(rom_filename)["system"]
+
+    def submit_data_scans():
+        # Run after the code guesses, so data guesses never claim decoded code
+        if rom_system in POINTER_FORMATS:
+            analysis.submit("pointer scan", scan_pointers, rom_filename)
+        if rom_system in SYSTEM_CODECS:
+            analysis.submit("compression", find_compressed, rom_filename)
+
+    if rom_system in DISASM_SYSTEMS:
+        # Code reachable from the vectors becomes an (unconfirmed) code guess
+        analysis.submit("disassembly", disassemble, rom_filename)
+    else:
+        submit_data_scans()
 
     # --- Tooltip state ---
     tray_tooltip_labels = [
@@ -473,62 +595,15 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
     tooltip_mouse_pos = (0, 0)
     TOOLTIP_DELAY = 380  # ms
     TOOLTIP_DIST = 60    # px (cancel if mouse leaves this area)
-        
-    while dashboard_running:
-        btn_clicked = None  # Reset every frame
 
-        mouse_up = False
-        mouse_down = False
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                dashboard_running = False  # Exit dashboard
-            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                mouse_down = True
-            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
-                mouse_up = True
-                if win_exit_rect.collidepoint(virt_x, virt_y):
-                    btn_clicked = "exit"
-                elif win_min_rect.collidepoint(virt_x, virt_y):
-                    btn_clicked = "min"
-                elif win_max_rect.collidepoint(virt_x, virt_y):
-                    btn_clicked = "max"
-            # --- Notices Button ---
-            if pygame.Rect(notices_btn_x, notices_btn_y, NOTICES_BTN_W, NOTICES_BTN_H).collidepoint(virt_x, virt_y):
-                notices_popup_open = True
-                notices_selected = None
+    # --- Notices button geometry (also used for hit-testing) ---
+    NOTICES_BTN_W = 53
+    NOTICES_BTN_H = 16
+    notices_btn_x = SCREEN_W - 130  # Position from right
+    notices_btn_y = 12
 
-            # --- NEW: Notices Popup Interactivity ---
-            if notices_popup_open:
-                # Mouse position in popup coordinates
-                POPUP_W, POPUP_H = 240, 110
-                POPUP_X = (SCREEN_W - POPUP_W) // 2
-                POPUP_Y = (SCREEN_H - POPUP_H) // 2
-                CLOSE_BTN_W, CLOSE_BTN_H = 16, 16
-                CLOSE_BTN_X = POPUP_X + POPUP_W - CLOSE_BTN_W - 4
-                CLOSE_BTN_Y = POPUP_Y + 4
-                notice_gap = 18
-
-                mx, my = virt_x, virt_y
-                # Close button
-                if event.type == pygame.MOUSEBUTTONDOWN and pygame.Rect(CLOSE_BTN_X, CLOSE_BTN_Y, CLOSE_BTN_W, CLOSE_BTN_H).collidepoint(mx, my):
-                    notices_popup_open = False
-                # Click or hover notices
-                for i in range(len(notices)):
-                    msg_rect = pygame.Rect(POPUP_X + 16, POPUP_Y + 32 + i * notice_gap, POPUP_W - 32, 16)
-                    if msg_rect.collidepoint(mx, my):
-                        if event.type == pygame.MOUSEBUTTONDOWN:
-                            notices_selected = i
-                        elif event.type == pygame.MOUSEMOTION:
-                            notices_hovered = i
-                # Dismiss on ESC
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                    notices_popup_open = False
-
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    dashboard_running = False  # Allow escape key to close
-
-        # 1x graphics draw
+    # --- Static chrome: drawn once into the compositor background ---
+    def draw_chrome(screen):
         screen.fill((24,24,32))
 
         # Stretch the shell window all the way to the screen edges (behind everything)
@@ -594,30 +669,198 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
 
         # File name (white, regular, 3x)
         draw_text(
-            screen, rom_filename,
+            screen, os.path.basename(rom_filename),
             text_x - 6, text_y + 4,
             font_regular_img, font_regular_cmap,
             color=(255,255,255), scale=1
         )
 
         # --- Notices button ---
-        notices_btn_img = pygame.image.load(asset_path("button_standard_3state.png")).convert_alpha()
-        notice_icon = pygame.image.load(asset_path("icon_system_warning.png")).convert_alpha()
-        NOTICES_BTN_W = 53
-        NOTICES_BTN_H = 16
-        notices_btn_x = SCREEN_W - 130  # Position from right
-        notices_btn_y = 12
         draw_3slice_button(screen, notices_btn_x, notices_btn_y, NOTICES_BTN_W, notices_btn_img, state=0)
         # Icon
         icon_size = notice_icon.get_height()
         screen.blit(notice_icon, (notices_btn_x + 7, notices_btn_y + (NOTICES_BTN_H - icon_size)//2 + 1))
-        # Number
-        draw_text(
-            screen, "(x1)",
-            notices_btn_x + 7 + icon_size + 5, notices_btn_y + (NOTICES_BTN_H - font_regular_img.get_height()) // 2 +2,
-            font_regular_img, font_regular_cmap,
-            color=(255,224,128), scale=1
-        )
+        # (The count is live; drawn each frame over the chrome)
+
+        # Embedded info bar (bottom) Stretch the bottom info bar (3-slice, horizontal) across the full width of the screen
+        embed_bar_height = box_embed.get_height()
+        embed_y = SCREEN_H - embed_bar_height
+        draw_3slice_h(screen, 0, embed_y, SCREEN_W, box_embed)
+
+        # Tray menu - Stretch across the left edge (3-slice horizontal)
+        tray_height = panel_tray.get_height()
+        tray_width = 133  # Or however wide you want the tray menu (try matching the mockup visually)
+        tray_y = SCREEN_H - tray_height
+        draw_3slice_h(screen, 0, tray_y, tray_width, panel_tray)
+
+        # Progress Bar (bottom right, over tray, use 3-slice)
+        pb_bar_w = 106
+        pb_bar_h = pb_bar.get_height()
+        pb_x = 374
+        pb_y = SCREEN_H - 1 - pb_bar_h
+        draw_3slice_h(screen, pb_x, pb_y, pb_bar_w, pb_bar)
+
+    compositor = Compositor((SCREEN_W, SCREEN_H))
+
+    while dashboard_running:
+        btn_clicked = None  # Reset every frame
+
+        if assets_stale:
+            assets_stale = False
+            # --- Notices Popup Assets ---
+            popup_main_img = get_image("popup_main_9slice.png")
+            close_popup_btn_img = get_image("button_closepopup_3state.png")
+
+            # Asset loads (shared, decoded once by core.asset_cache)
+            header_img = get_image("shell_header_3slice.png")
+            shell_main_img = get_image("shell_main_9slice.png")
+            header_icon = get_image("icon_header_dashboard.png")
+            shade_side = get_image("shell_headershadesides.png")
+            panel_tray = get_image("panel_traymenu_3slice.png")
+            box_embed = get_image("box_embeddedtext_3slice.png")
+            pb_bar = get_image("system_progressbar_bar_3slice.png")
+            btn_win_min = get_image("button_shell_minimize_3state.png")
+            btn_win_max = get_image("button_shell_maximize_3state.png")
+            btn_win_windowed = get_image("button_shell_windowed_3state.png")
+            btn_win_exit = get_image("button_shell_exit_3state.png")
+            tooltip_img = get_image("popup_tooltips_9slice.png")
+            notices_btn_img = get_image("button_standard_3state.png")
+            notice_icon = get_image("icon_system_warning.png")
+            pb_fill_img = get_image("system_progressbar_fills.png")
+            tray_icon_imgs = [get_image(fname) for fname, _ in tray_icons]
+            compositor.reset()
+
+        mouse_up = False
+        mouse_down = False
+        open_hex_view = False
+        open_tile_view = False
+        events = scheduler.poll()
+        profiler.frame_begin()
+        profiler.begin("events")
+        if scheduler.became_visible:
+            compositor.invalidate()
+        for event in events:
+            if event.type == pygame.QUIT:
+                dashboard_running = False  # Exit dashboard
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                mouse_down = True
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                mouse_up = True
+                if win_exit_rect.collidepoint(virt_x, virt_y):
+                    btn_clicked = "exit"
+                elif win_min_rect.collidepoint(virt_x, virt_y):
+                    btn_clicked = "min"
+                elif win_max_rect.collidepoint(virt_x, virt_y):
+                    btn_clicked = "max"
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+                compositor.invalidate()  # Window contents lost/resized: push a full frame
+            # --- Notices Button ---
+            if pygame.Rect(notices_btn_x, notices_btn_y, NOTICES_BTN_W, NOTICES_BTN_H).collidepoint(virt_x, virt_y):
+                notices_popup_open = True
+                notices_selected = None
+
+            # --- NEW: Notices Popup Interactivity ---
+            if notices_popup_open:
+                # Mouse position in popup coordinates
+                POPUP_W, POPUP_H = 240, 110
+                POPUP_X = (SCREEN_W - POPUP_W) // 2
+                POPUP_Y = (SCREEN_H - POPUP_H) // 2
+                CLOSE_BTN_W, CLOSE_BTN_H = 16, 16
+                CLOSE_BTN_X = POPUP_X + POPUP_W - CLOSE_BTN_W - 4
+                CLOSE_BTN_Y = POPUP_Y + 4
+                notice_gap = 18
+
+                mx, my = virt_x, virt_y
+                # Close button
+                if event.type == pygame.MOUSEBUTTONDOWN and pygame.Rect(CLOSE_BTN_X, CLOSE_BTN_Y, CLOSE_BTN_W, CLOSE_BTN_H).collidepoint(mx, my):
+                    notices_popup_open = False
+                # Click or hover notices
+                for i in range(min(len(notices), NOTICE_ROWS)):
+                    msg_rect = pygame.Rect(POPUP_X + 16, POPUP_Y + 32 + i * notice_gap, POPUP_W - 32, 16)
+                    if msg_rect.collidepoint(mx, my):
+                        if event.type == pygame.MOUSEBUTTONDOWN:
+                            notices_selected = i
+                        elif event.type == pygame.MOUSEMOTION:
+                            notices_hovered = i
+                # Dismiss on ESC
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    notices_popup_open = False
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    dashboard_running = False  # Allow escape key to close
+                elif event.key == pygame.K_h:
+                    open_hex_view = True
+                elif event.key == pygame.K_t:
+                    open_tile_view = True
+                elif event.key in (pygame.K_F3, pygame.K_F4):
+                    profiler_hud.handle_key(event)
+
+        if open_hex_view:
+            hex_view_screen(real_screen, SCALE, font_regular_img, font_regular_cmap,
+                            font_bold_img, font_bold_cmap, classification, search=search_index)
+            compositor.invalidate()  # The hex view drew over the whole window
+            scheduler.request_redraw()
+        if open_tile_view:
+            tile_view_screen(real_screen, SCALE, font_regular_img, font_regular_cmap,
+                             font_bold_img, font_bold_cmap, classification, system=rom_system,
+                             streams=compressed_streams, rom_key=project.meta.get("sha1"))
+            compositor.invalidate()
+            scheduler.request_redraw()
+
+        # --- Drain analysis results (partial results stream in while jobs run) ---
+        for msg in analysis.drain():
+            if msg.kind == RESULT and msg.name == "disassembly":
+                # Analyzer guesses are not user edits: no undo steps, not journaled
+                with history.suspended(), project.suspended():
+                    for start, end in msg.payload:
+                        classification.suggest(start, end, CODE)
+            elif msg.kind == RESULT and msg.name in ("pointer scan", "compression"):
+                with history.suspended(), project.suspended():
+                    for start, end in msg.payload:
+                        classification.suggest(start, end, DATA)
+            elif msg.kind == DONE and msg.name == "disassembly":
+                for address in msg.payload["routines"]:
+                    entities.put(("routine", address), {"name": "sub_%06X" % address, "address": address})
+                submit_data_scans()
+            elif msg.kind == DONE and msg.name == "compression":
+                compressed_streams = msg.payload
+            elif msg.kind == NOTICE:
+                analysis_notices.append(msg.payload)
+                notices_stale = True
+            elif msg.kind == ERROR:
+                analysis_notices.append("Analysis '%s' failed: %s" % (msg.name, msg.payload))
+                notices_stale = True
+                if msg.name == "disassembly":
+                    submit_data_scans()
+            elif msg.kind == DONE and msg.name == "hash":
+                if msg.payload != {k: project.meta.get(k) for k in msg.payload}:
+                    project.update_meta(**msg.payload)
+                analysis.submit("search index", index_rom, rom_filename, msg.payload["sha1"], thread=True)
+            elif msg.kind == DONE and msg.name == "search index":
+                # Map the cached index here; uncached (read-only home) queries just scan
+                search_index = SearchIndex.load(classification.rom, msg.payload) or SearchIndex(classification.rom)
+            scheduler.request_redraw()
+        if analysis.busy:
+            scheduler.wake_in(50)  # Keep draining while nothing else wakes us
+        hud_notices = profiler_hud.take_notices()
+        if hud_notices:
+            analysis_notices.extend(hud_notices)
+            notices_stale = True
+        if rule_engine.update() or notices_stale:
+            notices = rule_engine.notices() + analysis_notices
+            notices_stale = False
+            scheduler.request_redraw()
+
+        profiler.end("events")
+        if not scheduler.should_draw():
+            continue  # Idle or minimized: nothing to redraw
+
+        # 1x graphics draw: restore the cached chrome, then the live widgets
+        profiler.begin("draw")
+        compositor.background_for(rom_filename, draw_chrome)
+        compositor.begin(screen)
+
         # --- Notices Popup (drawn above everything) ---
         if notices_popup_open:
             POPUP_W, POPUP_H = 240, 110  # You can adjust size as needed
@@ -657,7 +900,11 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
             # Draw notice list with highlight
             notice_y = POPUP_Y + 32
             notice_gap = 18
-            for i, msg in enumerate(notices):
+            if len(notices) > NOTICE_ROWS:
+                more = "(+%d more)" % (len(notices) - NOTICE_ROWS)
+                draw_text(screen, more, CLOSE_BTN_X - 6 - get_text_width(more, font_regular_img, font_regular_cmap, 1), POPUP_Y + 10,
+                          font_regular_img, font_regular_cmap, color=(255,224,128), scale=1)
+            for i, msg in enumerate(notices[:NOTICE_ROWS]):
                 msg_rect = pygame.Rect(POPUP_X + 16, notice_y + i*notice_gap, POPUP_W-32, 16)
                 is_hover = msg_rect.collidepoint(*mouse_pos_virt)
                 if is_hover:
@@ -666,20 +913,11 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
                     pygame.draw.rect(screen, (40,70,130), msg_rect, border_radius=4)
                 draw_text(screen, msg, msg_rect.x+4, msg_rect.y+2, font_regular_img, font_regular_cmap, color=(255,255,255), scale=1)
 
-            # Draw Notices Title
-            draw_text(screen, "Notices", POPUP_X + 12, POPUP_Y + 8, font_bold_img, font_bold_cmap, color=(128,192,255), scale=1)
-
-            # Draw notice list with highlight
-            notice_y = POPUP_Y + 32
-            notice_gap = 18
-            for i, msg in enumerate(notices):
-                msg_rect = pygame.Rect(POPUP_X + 16, notice_y + i*notice_gap, POPUP_W-32, 16)
-                is_hover = msg_rect.collidepoint(*mouse_pos_virt)
-                if is_hover:
-                    pygame.draw.rect(screen, (60,90,160), msg_rect, border_radius=4)
-                if notices_selected == i:
-                    pygame.draw.rect(screen, (40,70,130), msg_rect, border_radius=4)
-                draw_text(screen, msg, msg_rect.x+4, msg_rect.y+2, font_regular_img, font_regular_cmap, color=(255,255,255), scale=1)
+            compositor.track("notices_popup", (POPUP_X, POPUP_Y, POPUP_W, POPUP_H),
+                             (close_state, notices_selected, tuple(
+                                 pygame.Rect(POPUP_X + 16, notice_y + i*notice_gap, POPUP_W-32, 16).collidepoint(*mouse_pos_virt)
+                                 for i in range(min(len(notices), NOTICE_ROWS))),
+                              tuple(notices[:NOTICE_ROWS]), len(notices)))
 
         # --- Top-right window buttons (idle/hover/click states, with logic) ---
         WIN_BTN_W, WIN_BTN_H = 17, 16
@@ -725,13 +963,14 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
         else:
             screen.blit(btn_win_max.subsurface((win_btn_states[1]*WIN_BTN_W,0,WIN_BTN_W,WIN_BTN_H)), (win_max_x, win_btn_y))
         screen.blit(btn_win_exit.subsurface((win_btn_states[2]*WIN_BTN_W,0,WIN_BTN_W,WIN_BTN_H)), (win_exit_x, win_btn_y))
+        compositor.track("win_buttons", win_min_rect.union(win_exit_rect), (tuple(win_btn_states), dashboard_maximized))
         
         # Now respond to the click
         if btn_clicked == "exit":
             dashboard_running = False  # Exit dashboard
         elif btn_clicked == "min":
             pygame.display.iconify()
-            time.sleep(0.2)
+            scheduler.set_minimized()
         elif btn_clicked == "max":
             if not dashboard_maximized:
                 dashboard_maximized = True
@@ -746,42 +985,87 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
                         break
                 SCALE = best_scale
                 pygame.display.set_mode((info.current_w, info.current_h), pygame.FULLSCREEN)
+                invalidate_assets()
+                assets_stale = True
+                scheduler.request_redraw()
                 time.sleep(0.25)  # Give the OS a moment to settle
             else:
                 dashboard_maximized = False
                 # Restore previous scale and window size
                 SCALE = prev_scale
                 pygame.display.set_mode((SCREEN_W * SCALE, SCREEN_H * SCALE), pygame.RESIZABLE)
+                invalidate_assets()
+                assets_stale = True
+                scheduler.request_redraw()
                 time.sleep(0.25)
 
-        # Embedded info bar (bottom) Stretch the bottom info bar (3-slice, horizontal) across the full width of the screen
-        embed_bar_height = box_embed.get_height()
-        embed_y = SCREEN_H - embed_bar_height
-        draw_3slice_h(screen, 0, embed_y, SCREEN_W, box_embed)
-        info_text_y = embed_y + (embed_bar_height - font_regular_img.get_height()) // 2
-        draw_text(screen, "23% Confirmed", 150, info_text_y + 2, font_regular_img, font_regular_cmap, color=(128,255,128), scale=1)
+        # --- Notices count + analysis status (header, live) ---
+        notice_text_x = notices_btn_x + 7 + notice_icon.get_height() + 5
+        notice_text_y = notices_btn_y + (NOTICES_BTN_H - font_regular_img.get_height()) // 2 + 2
+        draw_text(screen, "(x%d)" % len(notices), notice_text_x, notice_text_y,
+                  font_regular_img, font_regular_cmap, color=(255,224,128), scale=1)
+        compositor.track("notices_count", (notice_text_x, notice_text_y, notices_btn_x + NOTICES_BTN_W - 3 - notice_text_x,
+                                           font_regular_img.get_height()), len(notices))
+        if analysis.busy:
+            status = "Analyzing %d%%" % int(analysis.progress() * 100)
+            status_w = get_text_width(status, font_regular_img, font_regular_cmap, 1)
+            status_x = notices_btn_x - 8 - status_w
+            draw_text(screen, status, status_x, notice_text_y, font_regular_img, font_regular_cmap, color=(128,192,255), scale=1)
+            compositor.track("analysis_status", (status_x, notice_text_y, status_w, font_regular_img.get_height()), status)
+
+        # --- Coverage: info bar numbers + progress fill (live numbers, drawn over the chrome) ---
+        embed_y = SCREEN_H - box_embed.get_height()
+        info_text_y = embed_y + (box_embed.get_height() - font_regular_img.get_height()) // 2
+        confirmed_pct, uncertain_pct, _ = classification.coverage()
+        # "Left" is what remains, so the three shown numbers always add up to 100
+        confirmed_num = round(confirmed_pct * 100)
+        uncertain_num = min(round(uncertain_pct * 100), 100 - confirmed_num)
+        coverage_nums = (confirmed_num, uncertain_num, 100 - confirmed_num - uncertain_num)
+        draw_text(screen, "%d%% Confirmed" % coverage_nums[0], 150, info_text_y + 2, font_regular_img, font_regular_cmap, color=(128,255,128), scale=1)
         draw_text(screen, "|", 230, info_text_y + 2, font_regular_img, font_regular_cmap, color=(255,255,255), scale=1)
-        draw_text(screen, "45% Uncertain", 240, info_text_y + 2, font_regular_img, font_regular_cmap, color=(255,224,128), scale=1)
+        draw_text(screen, "%d%% Uncertain" % coverage_nums[1], 240, info_text_y + 2, font_regular_img, font_regular_cmap, color=(255,224,128), scale=1)
         draw_text(screen, "|", 320, info_text_y + 2, font_regular_img, font_regular_cmap, color=(255,255,255), scale=1)
-        draw_text(screen, "32% Left", 330, info_text_y + 2, font_regular_img, font_regular_cmap, color=(255,64,64), scale=1)
+        draw_text(screen, "%d%% Left" % coverage_nums[2], 330, info_text_y + 2, font_regular_img, font_regular_cmap, color=(255,64,64), scale=1)
+        compositor.track("coverage_text", (150, info_text_y, 230, font_regular_img.get_height() + 4), coverage_nums)
 
-        # Tray menu - Stretch across the left edge (3-slice horizontal)
+        # --- Progress Fill: 100px interior for juice ---
+        pb_x = 374
+        pb_y = SCREEN_H - 1 - pb_bar.get_height()
+        fill_start = pb_x + 3  # start after left wall (8px left, but 3px inner gap)
+        fill_y = pb_y + 2      # adjust as needed
+
+        fill_width = 100       # interior fill width (px)
+
+        # Fill colors: 0=green, 1=yellow, 2=red (use slice order in your .png)
+        # --- Draw Progress Bar Fill (green and yellow segments, smooth fill) ---
+        fill_seg_w = pb_fill_img.get_width() // 3
+        fill_seg_h = pb_fill_img.get_height()
+
+        curr_x = fill_start
+        # Green fill (Confirmed)
+        g_w = min(int(round(fill_width * confirmed_pct)), fill_width)
+        if g_w > 0:
+            # Always stretch the green fill from its source segment
+            green_src = pb_fill_img.subsurface((0, 0, fill_seg_w, fill_seg_h))
+            green_scaled = pygame.transform.scale(green_src, (g_w, fill_seg_h))
+            screen.blit(green_scaled, (curr_x, fill_y +1))
+            curr_x += g_w
+
+        # Yellow fill (Uncertain)
+        y_w = min(int(round(fill_width * uncertain_pct)), fill_width - g_w)
+        if y_w > 0:
+            yellow_src = pb_fill_img.subsurface((fill_seg_w, 0, fill_seg_w, fill_seg_h))
+            yellow_scaled = pygame.transform.scale(yellow_src, (y_w, fill_seg_h))
+            screen.blit(yellow_scaled, (curr_x, fill_y +1))
+            curr_x += y_w
+
+        # Do NOT draw red segment for now (unidentified is just empty)
+        compositor.track("coverage_fill", (fill_start, fill_y, fill_width, fill_seg_h + 2), (g_w, y_w))
+
+        # Tray menu geometry (panel itself is part of the static chrome)
         tray_height = panel_tray.get_height()
-        tray_width = 133  # Or however wide you want the tray menu (try matching the mockup visually)
         tray_y = SCREEN_H - tray_height
-        draw_3slice_h(screen, 0, tray_y, tray_width, panel_tray)
-        
-        # --- Tray icons (6 total, spaced out to fit the tray width) ---
-        tray_icons = [
-            ("icon_system_main_undo.png",    "sfx_main_undo.wav"),
-            ("icon_system_main_redo.png",    "sfx_main_redo.wav"),
-            ("icon_system_main_save.png",    "sfx_main_save.wav"),
-            ("icon_system_main_backtodashboard.png", "sfx_main_back.wav"),
-            ("icon_system_main_preferences.png", "sfx_main_preferences.wav"),
-            ("icon_system_main_help.png",    "sfx_main_help.wav"),
-        ]
-
-        tray_icon_imgs = [pygame.image.load(asset_path(fname)).convert_alpha() for fname, _ in tray_icons]
+
         icon_y = tray_y + (tray_height - 12) // 2  # center in tray
         icon_x = 7
         icon_spacing = 21
@@ -815,6 +1099,8 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
                 elif not tooltip_active and pygame.time.get_ticks() - tooltip_timer > TOOLTIP_DELAY:
                     tooltip_active = True
                     tooltip_mouse_pos = (mx, my)
+                if not tooltip_active:
+                    scheduler.wake_at(tooltip_timer + TOOLTIP_DELAY + 1)  # Come back to show it
             elif tooltip_idx == i:
                 # Left the icon; reset tooltip
                 tooltip_idx = -1
@@ -843,24 +1129,26 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
 
             # Draw the icon itself
             screen.blit(img, (icon_x, icon_y))
+            compositor.track(("tray_icon", i), (icon_x-2, icon_y-2, img.get_width()+4, img.get_height()+4), (hovered, held))
 
             # Play SFX & detect click on release (mouse_up)
             if hovered and mouse_up:
-                sfx = pygame.mixer.Sound(asset_path(tray_icons[i][1]))
-                sfx.play()
+                get_sound(tray_icons[i][1]).play()
                 tray_icon_clicked = i
 
             icon_x += icon_spacing
 
-        # --- Handle Tray Icon Actions (just print for now) ---
+        # --- Handle Tray Icon Actions (navigation ones still just print) ---
         if tray_icon_clicked != -1:
             # You can add real functionality later
             if tray_icon_clicked == 0:
-                print("UNDO")
+                if history.undo():
+                    scheduler.request_redraw()  # Coverage was drawn before the click
             elif tray_icon_clicked == 1:
-                print("REDO")
+                if history.redo():
+                    scheduler.request_redraw()
             elif tray_icon_clicked == 2:
-                print("SAVE")
+                project.save()
             elif tray_icon_clicked == 3:
                 print("BACK TO DASHBOARD")
             elif tray_icon_clicked == 4:
@@ -870,7 +1158,7 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
 
         # --- Play SFX on Click (optional: add your sfx logic here) ---
         # e.g. if tray_click_idx != -1:
-        #       pygame.mixer.Sound(asset_path(tray_icons[tray_click_idx][1])).play()
+        #       get_sound(tray_icons[tray_click_idx][1]).play()
 
         # --- Draw tooltip if needed ---
         if tooltip_active and 0 <= tooltip_idx < len(tray_tooltip_labels):
@@ -892,23 +1180,8 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
             tip_x = max(0, min(SCREEN_W - tip_w, tip_x))
             tip_y = max(0, tip_y)
 
-            # --- Top row ---
-            TL = tooltip_img.subsurface(pygame.Rect(0,0,cs,cs))
-            T  = tooltip_img.subsurface(pygame.Rect(cs,0,tooltip_img.get_width()-2*cs,cs))
-            TR = tooltip_img.subsurface(pygame.Rect(tooltip_img.get_width()-cs,0,cs,cs))
-            # --- Bottom row ---
-            BL = tooltip_img.subsurface(pygame.Rect(0,tooltip_img.get_height()-cs,cs,cs))
-            B  = tooltip_img.subsurface(pygame.Rect(cs,tooltip_img.get_height()-cs,tooltip_img.get_width()-2*cs,cs))
-            BR = tooltip_img.subsurface(pygame.Rect(tooltip_img.get_width()-cs,tooltip_img.get_height()-cs,cs,cs))
-
-            # Draw top row
-            screen.blit(TL, (tip_x, tip_y))
-            screen.blit(pygame.transform.scale(T, (tip_w-2*cs, cs)), (tip_x+cs, tip_y))
-            screen.blit(TR, (tip_x+tip_w-cs, tip_y))
-            # Draw bottom row **immediately below top**
-            screen.blit(BL, (tip_x, tip_y+cs))
-            screen.blit(pygame.transform.scale(B, (tip_w-2*cs, cs)), (tip_x+cs, tip_y+cs))
-            screen.blit(BR, (tip_x+tip_w-cs, tip_y+cs))
+            # Corners + edges only (no middle row), composed once per width
+            draw_9slice_flat(screen, tip_x, tip_y, tip_w, tooltip_img, cs)
 
             # --- Draw the text perfectly centered in the popup (horizontal & vertical)
             tip_text_x = tip_x + (tip_w - tip_text_w) // 2
@@ -919,64 +1192,27 @@ def dashboard_screen(real_screen, font_bold_img, font_bold_cmap, font_regular_im
                 tip_text_y,
                 font_regular_img, font_regular_cmap, color=(255,255,255), scale=1
             )
+            compositor.track("tooltip", (tip_x, tip_y, tip_w, tip_h), tooltip_idx)
 
             # Hide tooltip if mouse moves too far
             if abs(mx - tooltip_mouse_pos[0]) > TOOLTIP_DIST or abs(my - tooltip_mouse_pos[1]) > TOOLTIP_DIST:
                 tooltip_active = False
                 tooltip_idx = -1
 
-        # Progress Bar (bottom right, over tray, use 3-slice)
-        pb_bar_w = 106
-        pb_bar_h = pb_bar.get_height()
-        pb_x = 374
-        pb_y = SCREEN_H - 1 - pb_bar_h
-        draw_3slice_h(screen, pb_x, pb_y, pb_bar_w, pb_bar)
+        profiler.end("draw")
 
-        # --- Progress Fill: 100px interior for juice ---
-        pb_fill_img = pygame.image.load(asset_path("system_progressbar_fills.png")).convert_alpha()
-        fill_start = pb_x + 3  # start after left wall (8px left, but 3px inner gap)
-        fill_y = pb_y + 2      # adjust as needed
-
-        fill_width = 100       # interior fill width (px)
-        # These numbers can be set as variables later!
-        confirmed_pct = 0.23
-        uncertain_pct = 0.45
-        unidentified_pct = 1.0 - confirmed_pct - uncertain_pct
+        # Rolling frame-phase timings (F3), tracked like any other widget
+        if profiler_hud.visible:
+            hud_rect, hud_lines = profiler_hud.draw_hud(screen, 4, 36, font_regular_img, font_regular_cmap)
+            compositor.track("profiler_hud", hud_rect, hud_lines)
 
-        # Fill colors: 0=green, 1=yellow, 2=red (use slice order in your .png)
-        # --- Draw Progress Bar Fill (green and yellow segments, smooth fill) ---
-        fill_seg_w = pb_fill_img.get_width() // 3
-        fill_seg_h = pb_fill_img.get_height()
+        # Push only what changed (scaled) to the physical window
+        compositor.present(real_screen, screen, SCALE)
+        profiler.frame_end()
+        scheduler.frame_done()
 
-        curr_x = fill_start
-        # Green fill (Confirmed)
-        g_w = min(int(round(fill_width * confirmed_pct)), fill_width)
-        if g_w > 0:
-            # Always stretch the green fill from its source segment
-            green_src = pb_fill_img.subsurface((0, 0, fill_seg_w, fill_seg_h))
-            green_scaled = pygame.transform.scale(green_src, (g_w, fill_seg_h))
-            screen.blit(green_scaled, (curr_x, fill_y +1))
-            curr_x += g_w
-
-        # Yellow fill (Uncertain)
-        y_w = min(int(round(fill_width * uncertain_pct)), fill_width - g_w)
-        if y_w > 0:
-            yellow_src = pb_fill_img.subsurface((fill_seg_w, 0, fill_seg_w, fill_seg_h))
-            yellow_scaled = pygame.transform.scale(yellow_src, (y_w, fill_seg_h))
-            screen.blit(yellow_scaled, (curr_x, fill_y +1))
-            curr_x += y_w
-
-        # Do NOT draw red segment for now (unidentified is just empty)
-
-        # Center the scaled app in the physical window
-        real_w, real_h = real_screen.get_size()
-        surf_w, surf_h = SCREEN_W * SCALE, SCREEN_H * SCALE
-        offset_x = (real_w - surf_w) // 2
-        offset_y = (real_h - surf_h) // 2
-        real_screen.fill((0,0,0))  # Black bars
-        real_screen.blit(pygame.transform.scale(screen, (surf_w, surf_h)), (offset_x, offset_y))
-        pygame.display.flip()
-        clock.tick(60)
+    analysis.cancel()  # ROM closed: stop whatever is still running
+    project.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,253 @@
+# --- Hex view ---
+# Scrolls through the ROM 16 bytes per row.  Only the rows on screen are
+# read (straight from the classification map's memory-mapped ROM and state
+# arrays) and drawn, as blits from a pre-rendered hex glyph atlas, so a
+# 32 MB ROM scrolls as cheaply as a 32 KB one and jumping anywhere is just
+# setting the top row.  Bytes are tinted by their classification (brighter
+# once confirmed).
+#
+# Keys: arrows / PgUp / PgDn / Home / End move the cursor, the mouse wheel
+# scrolls, G opens "Go to" (hex offset, Enter to jump), F opens "Find" (a
+# core.search pattern such as A9 ?? 8D "TEXT"; Enter jumps to the next
+# match, N to the one after), ESC goes back.
+import numpy as np
+import pygame
+
+from core.assets import SCREEN_W, SCREEN_H
+from core.asset_cache import get_image
+from core.coverage import CONFIRMED, KIND_MASK, KIND_NAMES
+from core.search import SearchIndex, parse_pattern
+from ui.compositor import Compositor
+from ui.frame_scheduler import FrameScheduler
+from ui.hex_atlas import get_atlas
+from ui.panel_cache import draw_3slice_h
+from ui.text_cache import draw_text
+
+BYTES_PER_ROW = 16
+ROW_GAP = 2
+WHEEL_ROWS = 3
+
+# (guessed, confirmed) color per kind, in KIND_NAMES order
+KIND_COLORS = {
+    "unknown":  ((112, 112, 112), (160, 160, 160)),
+    "code":     ((96, 144, 208), (128, 192, 255)),
+    "data":     ((192, 168, 96), (255, 224, 128)),
+    "graphics": ((96, 176, 96), (128, 255, 128)),
+    "text":     ((192, 120, 176), (255, 160, 224)),
+}
+ADDRESS_COLOR = (90, 90, 110)
+
+
+def _palette():
+    # Atlas colors + a 256-entry LUT from state byte to color index
+    colors = []
+    index = {}
+    for kind, name in KIND_NAMES.items():
+        for confirmed, color in enumerate(KIND_COLORS[name]):
+            index[(kind, confirmed)] = len(colors)
+            colors.append(color)
+    address_index = len(colors)
+    colors.append(ADDRESS_COLOR)
+    lut = np.array([index.get((v & KIND_MASK, int(bool(v & CONFIRMED))), 0) for v in range(256)], dtype=np.uint8)
+    return colors, lut, address_index
+
+
+def hex_view_screen(real_screen, scale, font_img, font_cmap, font_bold_img, font_bold_cmap, classification, offset=0,
+                    search=None):
+    scheduler = FrameScheduler()
+    compositor = Compositor((SCREEN_W, SCREEN_H))
+    screen = pygame.Surface((SCREEN_W, SCREEN_H))
+    colors, lut, address_color = _palette()
+    rom = classification.rom
+    size = classification.size
+
+    header_img = get_image("panel_headerspecial_3slice.png")
+    box_embed = get_image("box_embeddedtext_3slice.png")
+    atlas = get_atlas(font_img, font_cmap, colors)
+
+    # --- Layout ---
+    header_h = header_img.get_height()
+    footer_h = box_embed.get_height()
+    row_h = atlas.cell_h + ROW_GAP
+    col_w = atlas.cell_w + 4
+    addr_x = 10
+    hex_x = addr_x + atlas.cell_w * 4 + 10
+    char_x = hex_x + col_w * BYTES_PER_ROW + 8
+    rows_y = header_h + 4
+    visible_rows = (SCREEN_H - footer_h - rows_y - 2) // row_h
+    total_rows = (size + BYTES_PER_ROW - 1) // BYTES_PER_ROW
+    max_top = max(0, total_rows - visible_rows)
+    rows_rect = pygame.Rect(0, rows_y, SCREEN_W, visible_rows * row_h)
+
+    cursor = max(0, min(size - 1, offset))
+    top = min(max_top, cursor // BYTES_PER_ROW)
+    goto_text = None   # None = not typing an offset
+    find_text = None   # None = not typing a pattern
+    last_find = None   # (pattern, mask) for N
+    swallow_f = False
+    message = None     # Footer message until the cursor moves
+    if search is None:
+        search = SearchIndex(rom)   # No index (yet): queries scan instead
+
+    def draw_chrome(surface):
+        surface.fill((16, 16, 16))
+        draw_3slice_h(surface, 0, 0, SCREEN_W, header_img, 8, 8)
+        draw_text(surface, "Hex View", 10, (header_h - font_bold_img.get_height()) // 2,
+                  font_bold_img, font_bold_cmap, color=(128, 192, 255), scale=1)
+        draw_3slice_h(surface, 0, SCREEN_H - footer_h, SCREEN_W, box_embed)
+
+    def find_next(start):
+        nonlocal top, message
+        if not last_find:
+            return
+        hit = search.find_next(*last_find, start=min(start, size - 1))
+        if hit < 0:
+            message = "Find: no match"
+            return
+        follow(hit)
+        top = min(max_top, cursor // BYTES_PER_ROW)
+        message = "Found at 0x%06X" % hit
+
+    def follow(new_cursor):
+        nonlocal cursor, top, message
+        message = None
+        cursor = max(0, min(size - 1, new_cursor))
+        row = cursor // BYTES_PER_ROW
+        if row < top:
+            top = row
+        elif row >= top + visible_rows:
+            top = row - visible_rows + 1
+
+    running = size > 0
+    while running:
+        events = scheduler.poll()
+        if scheduler.became_visible:
+            compositor.invalidate()
+        for event in events:
+            if event.type == pygame.QUIT:
+                pygame.event.post(event)  # Let the dashboard see it too
+                running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+                compositor.invalidate()
+            elif event.type == pygame.MOUSEWHEEL:
+                top = max(0, min(max_top, top - event.y * WHEEL_ROWS))
+            elif find_text is not None:
+                if event.type == pygame.TEXTINPUT:
+                    if not (swallow_f and event.text in "fF"):  # The F that opened the prompt
+                        find_text += event.text
+                    swallow_f = False
+                elif event.type == pygame.KEYDOWN:
+                    swallow_f = False
+                    if event.key == pygame.K_BACKSPACE:
+                        find_text = find_text[:-1]
+                    elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+                        try:
+                            last_find = parse_pattern(find_text) if find_text.strip() else None
+                        except ValueError as e:
+                            message = "Find: %s" % e
+                        else:
+                            find_next(cursor)
+                        find_text = None
+                    elif event.key == pygame.K_ESCAPE:
+                        find_text = None
+            elif goto_text is not None:
+                if event.type == pygame.TEXTINPUT:
+                    goto_text += "".join(c for c in event.text if c in "0123456789abcdefABCDEF")[:8 - len(goto_text)]
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_BACKSPACE:
+                        goto_text = goto_text[:-1]
+                    elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+                        if goto_text:
+                            follow(int(goto_text, 16))
+                            top = min(max_top, cursor // BYTES_PER_ROW)  # Jump: put it at the top
+                        goto_text = None
+                    elif event.key == pygame.K_ESCAPE:
+                        goto_text = None
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_g:
+                    goto_text = ""
+                elif event.key == pygame.K_f:
+                    find_text = ""
+                    swallow_f = True
+                elif event.key == pygame.K_n and last_find:
+                    find_next(cursor + 1)
+                elif event.key == pygame.K_LEFT:
+                    follow(cursor - 1)
+                elif event.key == pygame.K_RIGHT:
+                    follow(cursor + 1)
+                elif event.key == pygame.K_UP:
+                    follow(cursor - BYTES_PER_ROW)
+                elif event.key == pygame.K_DOWN:
+                    follow(cursor + BYTES_PER_ROW)
+                elif event.key == pygame.K_PAGEUP:
+                    top = max(0, top - visible_rows)
+                    follow(cursor - visible_rows * BYTES_PER_ROW)
+                elif event.key == pygame.K_PAGEDOWN:
+                    top = min(max_top, top + visible_rows)
+                    follow(cursor + visible_rows * BYTES_PER_ROW)
+                elif event.key == pygame.K_HOME:
+                    follow(0)
+                elif event.key == pygame.K_END:
+                    follow(size - 1)
+
+        if not running or not scheduler.should_draw():
+            continue
+
+        compositor.background_for("hex_view", draw_chrome)
+        compositor.begin(screen)
+
+        # --- Visible rows only: read, tint and blit from the atlas ---
+        start = top * BYTES_PER_ROW
+        end = min(size, start + visible_rows * BYTES_PER_ROW)
+        values = rom[start:end].tolist()
+        tints = lut[classification.state[start:end]].tolist()
+        surf = atlas.surface
+        blits = []
+        for r in range(visible_rows):
+            row_start = start + r * BYTES_PER_ROW
+            if row_start >= end:
+                break
+            y = rows_y + r * row_h
+            for i, b in enumerate(row_start.to_bytes(4, "big")):
+                blits.append((surf, (addr_x + i * atlas.cell_w, y), atlas.hex_area(address_color, b)))
+            base = r * BYTES_PER_ROW
+            for i in range(min(BYTES_PER_ROW, end - row_start)):
+                v = values[base + i]
+                c = tints[base + i]
+                blits.append((surf, (hex_x + i * col_w, y), atlas.hex_area(c, v)))
+                blits.append((surf, (char_x + i * atlas.char_w, y), atlas.char_area(c, v)))
+        if start <= cursor < end:
+            row, col = divmod(cursor - start, BYTES_PER_ROW)
+            y = rows_y + row * row_h - 1
+            pygame.draw.rect(screen, (60, 90, 160), (hex_x + col * col_w - 2, y, atlas.cell_w + 4, row_h))
+            pygame.draw.rect(screen, (60, 90, 160), (char_x + col * atlas.char_w, y, atlas.char_w, row_h))
+        screen.blits(blits, doreturn=False)
+
+        # Scroll position
+        if max_top:
+            track_h = rows_rect.height
+            thumb_h = max(6, track_h * visible_rows // total_rows)
+            thumb_y = rows_y + (track_h - thumb_h) * top // max_top
+            pygame.draw.rect(screen, (40, 40, 48), (SCREEN_W - 6, rows_y, 3, track_h))
+            pygame.draw.rect(screen, (128, 192, 255), (SCREEN_W - 6, thumb_y, 3, thumb_h))
+        compositor.track("rows", rows_rect, (top, cursor, classification.version))
+
+        # --- Footer: cursor info or the Go to prompt ---
+        footer_y = SCREEN_H - footer_h + (footer_h - font_img.get_height()) // 2 + 2
+        if goto_text is not None:
+            status = "Go to: 0x%s_" % goto_text.upper()
+        elif find_text is not None:
+            status = "Find: %s_" % find_text
+        elif message:
+            status = message
+        else:
+            status = "0x%06X / 0x%06X   %s%s" % (
+                cursor, size - 1, KIND_NAMES[classification.kind_at(cursor)],
+                " (confirmed)" if classification.is_confirmed(cursor) else "")
+        draw_text(screen, status, 10, footer_y, font_img, font_cmap, color=(255, 255, 255), scale=1)
+        compositor.track("footer", (0, SCREEN_H - footer_h, SCREEN_W, footer_h), status)
+
+        compositor.present(real_screen, screen, scale)
+        scheduler.frame_done()
@@ -0,0 +1,241 @@
+# --- Tile view ---
+# Shows ROM bytes (or a decompressed block) as 8x8 tiles, 16 per row, in
+# any of the core.tiles formats.  The view is drawn from cached sheets of
+# 16x16 tiles (ui.tile_cache): scrolling blits the two or three sheets
+# that overlap the window and decodes a new sheet only when one scrolls
+# into view for the first time, which keeps a scroll through a whole ROM
+# at full frame rate.
+#
+# Keys: Up / Down / PgUp / PgDn / Home / End and the wheel scroll, Left /
+# Right shift the start by one byte (to line tiles up), F cycles the
+# format, Z the zoom, P the palette (gray, then the best palette
+# candidates core.palettes finds in the ROM), [ and ] step through the
+# compressed streams found by analysis, R goes back to the raw ROM, ESC
+# goes back.  The palette search runs as an analysis job (a second or so
+# per 8 MB and palette size), so the view keeps scrolling meanwhile.
+import numpy as np
+import pygame
+
+from core.assets import SCREEN_W, SCREEN_H
+from core.asset_cache import get_image
+from core.compression.base import DecodeError
+from core.compression.cache import get_block
+from core.jobs import DONE, ERROR, get_scheduler, search_palettes
+from core.palettes import SYSTEM_COLOR_FORMATS, get_palette
+from core.tiles import FORMATS, SYSTEM_FORMATS
+from ui.compositor import Compositor
+from ui.frame_scheduler import FrameScheduler
+from ui.panel_cache import draw_3slice_h
+from ui.text_cache import draw_text
+from ui.tile_cache import SHEET_COLUMNS, SHEET_ROWS, get_sheet, gray_palette, sheet_bytes
+
+ZOOMS = (1, 2, 3)
+WHEEL_ROWS = 2
+
+
+def tile_view_screen(real_screen, scale, font_img, font_cmap, font_bold_img, font_bold_cmap, classification,
+                     system=None, streams=(), rom_key=None, offset=0):
+    scheduler = FrameScheduler()
+    compositor = Compositor((SCREEN_W, SCREEN_H))
+    screen = pygame.Surface((SCREEN_W, SCREEN_H))
+    rom_key = rom_key or classification.rom_path
+
+    header_img = get_image("panel_headerspecial_3slice.png")
+    box_embed = get_image("box_embeddedtext_3slice.png")
+
+    formats = list(SYSTEM_FORMATS.get(system, ()))
+    formats += [name for name in FORMATS if name not in formats]
+    fmt = formats[0]
+    zoom = 2
+
+    # --- Layout ---
+    header_h = header_img.get_height()
+    footer_h = box_embed.get_height()
+    rows_y = header_h + 4
+    rows_rect = pygame.Rect(10, rows_y, SCREEN_W - 20, SCREEN_H - footer_h - rows_y - 2)
+
+    # Source: the ROM file or one decompressed stream
+    stream_index = -1
+    source = ("rom", rom_key)
+    data = classification.rom
+    message = None
+
+    # Palettes: -1 = gray ramp, else an index into the candidates for this size
+    color_format = SYSTEM_COLOR_FORMATS.get(system)
+    palette_index = -1
+    candidates = {}   # palette size -> [PaletteCandidate], searched on first use
+    searching = {}    # job id -> palette size being searched
+    wanted = None     # palette size P was pressed for while its search ran
+    analysis = get_scheduler()
+
+    # Position: origin (0 .. row bytes - 1) + top tile row
+    row_bytes = FORMATS[fmt].tile_bytes * SHEET_COLUMNS
+    origin = offset % row_bytes
+    top = offset // row_bytes
+
+    def visible_rows():
+        return rows_rect.height // (8 * zoom)
+
+    def max_top():
+        return max(0, (len(data) - origin + row_bytes - 1) // row_bytes - visible_rows())
+
+    def set_format(name):
+        nonlocal fmt, row_bytes, origin, top
+        start = origin + top * row_bytes   # Keep the top-left byte in place
+        fmt = name
+        row_bytes = FORMATS[fmt].tile_bytes * SHEET_COLUMNS
+        origin, top = start % row_bytes, start // row_bytes
+
+    def palette_size():
+        return min(256, 1 << FORMATS[fmt].bpp)
+
+    def current_palette():
+        if palette_index < 0:
+            if palette_size() in searching.values():
+                return gray_palette(FORMATS[fmt].bpp), "gray (searching palettes...)"
+            return gray_palette(FORMATS[fmt].bpp), "gray"
+        found = candidates[palette_size()][palette_index]
+        return (get_palette(rom_key, classification.rom, found.offset, color_format, palette_size()),
+                "palette @ 0x%06X" % found.offset)
+
+    def next_palette():
+        nonlocal palette_index, message, wanted
+        size = palette_size()
+        if size not in candidates:
+            if size not in searching.values():
+                job_id = analysis.submit("palettes", search_palettes, classification.rom_path,
+                                         color_format, size, thread=True)
+                searching[job_id] = size
+            wanted = size   # Step to the first candidate once the search is done
+            return
+        if not candidates[size]:
+            message = "No %d-color palettes found" % size
+            palette_index = -1
+            return
+        palette_index += 1
+        if palette_index >= len(candidates[size]):
+            palette_index = -1
+
+    def open_stream(index):
+        nonlocal stream_index, source, data, origin, top, message
+        stream = streams[index]
+        try:
+            block = get_block(rom_key, classification.rom, stream.offset, stream.codec)
+        except DecodeError as e:
+            message = "Block at 0x%06X: %s" % (stream.offset, e)
+            return
+        stream_index = index
+        source = ("block", rom_key, stream.offset, stream.codec)
+        data = np.frombuffer(block, dtype=np.uint8)
+        origin = top = 0
+
+    def draw_chrome(surface):
+        surface.fill((16, 16, 16))
+        draw_3slice_h(surface, 0, 0, SCREEN_W, header_img, 8, 8)
+        draw_text(surface, "Tile View", 10, (header_h - font_bold_img.get_height()) // 2,
+                  font_bold_img, font_bold_cmap, color=(128, 192, 255), scale=1)
+        draw_3slice_h(surface, 0, SCREEN_H - footer_h, SCREEN_W, box_embed)
+
+    running = classification.size > 0
+    while running:
+        events = scheduler.poll()
+        if scheduler.became_visible:
+            compositor.invalidate()
+        # --- Palette searches (the dashboard's own messages stay queued for it) ---
+        for msg in analysis.drain(only=searching):
+            if msg.kind not in (DONE, ERROR):
+                continue
+            size = searching.pop(msg.job_id)
+            candidates[size] = msg.payload if msg.kind == DONE else []
+            if msg.kind == ERROR:
+                message = "Palette search failed: %s" % msg.payload
+            elif wanted == size == palette_size() and palette_index < 0:
+                next_palette()
+            if wanted == size:
+                wanted = None
+            scheduler.request_redraw()
+        if searching:
+            scheduler.wake_in(50)
+        for event in events:
+            if event.type == pygame.QUIT:
+                pygame.event.post(event)  # Let the dashboard see it too
+                running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+                compositor.invalidate()
+            elif event.type == pygame.MOUSEWHEEL:
+                top = max(0, min(max_top(), top - event.y * WHEEL_ROWS))
+            elif event.type == pygame.KEYDOWN:
+                message = None
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_UP:
+                    top = max(0, top - 1)
+                elif event.key == pygame.K_DOWN:
+                    top = min(max_top(), top + 1)
+                elif event.key == pygame.K_PAGEUP:
+                    top = max(0, top - visible_rows())
+                elif event.key == pygame.K_PAGEDOWN:
+                    top = min(max_top(), top + visible_rows())
+                elif event.key == pygame.K_HOME:
+                    top = 0
+                elif event.key == pygame.K_END:
+                    top = max_top()
+                elif event.key == pygame.K_LEFT:
+                    origin -= 1
+                    if origin < 0:
+                        origin, top = row_bytes - 1, max(0, top - 1)
+                elif event.key == pygame.K_RIGHT:
+                    origin = (origin + 1) % row_bytes
+                elif event.key == pygame.K_f:
+                    set_format(formats[(formats.index(fmt) + 1) % len(formats)])
+                    palette_index = -1   # Candidates are per palette size
+                elif event.key == pygame.K_p and color_format:
+                    next_palette()
+                elif event.key == pygame.K_z:
+                    zoom = ZOOMS[(ZOOMS.index(zoom) + 1) % len(ZOOMS)]
+                    top = min(top, max_top())
+                elif event.key == pygame.K_RIGHTBRACKET and streams:
+                    open_stream((stream_index + 1) % len(streams))
+                elif event.key == pygame.K_LEFTBRACKET and streams:
+                    open_stream((stream_index - 1) % len(streams))
+                elif event.key == pygame.K_r and stream_index >= 0:
+                    start = streams[stream_index].offset
+                    stream_index, source, data = -1, ("rom", rom_key), classification.rom
+                    origin, top = start % row_bytes, start // row_bytes
+
+        if not running or not scheduler.should_draw():
+            continue
+
+        compositor.background_for("tile_view", draw_chrome)
+        compositor.begin(screen)
+
+        # --- Tiles: blit the sheets overlapping the window ---
+        palette, palette_name = current_palette()
+        screen.set_clip(rows_rect)
+        first = top // SHEET_ROWS
+        last = (top + visible_rows()) // SHEET_ROWS
+        for k in range(first, last + 1):
+            start = origin + k * sheet_bytes(fmt)
+            if start >= len(data):
+                break
+            surface = get_sheet(data, source, start, fmt, palette, zoom)
+            screen.blit(surface, (rows_rect.x, rows_y + (k * SHEET_ROWS - top) * 8 * zoom))
+        screen.set_clip(None)
+        compositor.track("tiles", rows_rect, (source, fmt, origin, top, zoom, palette))
+
+        # --- Footer ---
+        footer_y = SCREEN_H - footer_h + (footer_h - font_img.get_height()) // 2 + 2
+        where = origin + top * row_bytes
+        if message:
+            status = message
+        elif stream_index >= 0:
+            stream = streams[stream_index]
+            status = "%s block %d/%d @ 0x%06X  +0x%04X  %s  %s  x%d" % (
+                stream.codec, stream_index + 1, len(streams), stream.offset, where, fmt, palette_name, zoom)
+        else:
+            status = "0x%06X / 0x%06X  %s  %s  x%d" % (where, classification.size - 1, fmt, palette_name, zoom)
+        draw_text(screen, status, 10, footer_y, font_img, font_cmap, color=(255, 255, 255), scale=1)
+        compositor.track("footer", (0, SCREEN_H - footer_h, SCREEN_W, footer_h), status)
+
+        compositor.present(real_screen, screen, scale)
+        scheduler.frame_done()
@@ -0,0 +1,53 @@
+import numpy as np
+
+from core.coverage import CODE, CONFIRMED, DATA, UNKNOWN, ClassificationMap
+from core.project import Project
+
+
+def _open(rom, project_dir):
+    project = Project.open_for_rom(str(rom), str(project_dir))
+    classification = ClassificationMap(str(rom), state=project.state)
+    project.attach(classification)
+    return project, classification
+
+
+def _rom(tmp_path, size=1 << 16):
+    rom = tmp_path / "game.sfc"
+    rom.write_bytes(bytes(range(256)) * (size // 256))
+    return rom
+
+
+def test_guesses_are_not_saved_in_the_base_file(tmp_path):
+    rom = _rom(tmp_path)
+    project, classification = _open(rom, tmp_path / "projects")
+    with project.suspended():
+        classification.suggest(0, 4096, CODE)
+    classification.assign(8192, 9000, DATA, confirmed=True)
+    project.save()      # First save: base file written by compact()
+    project.close()
+
+    project, classification = _open(rom, tmp_path / "projects")
+    assert (classification.state[:4096] == UNKNOWN).all()
+    assert (classification.state[8192:9000] == DATA | CONFIRMED).all()
+    project.close()
+
+
+def test_guesses_are_not_journaled(tmp_path):
+    rom = _rom(tmp_path)
+    project, classification = _open(rom, tmp_path / "projects")
+    project.save()
+    project.close()
+
+    project, classification = _open(rom, tmp_path / "projects")
+    classification.suggest(0, 4096, CODE)     # Not suspended: masked when journaled
+    values = np.full(1024, CODE, dtype=np.uint8)
+    values[512:] = DATA | CONFIRMED
+    classification.assign_values(2048, values)
+    project.save()
+    project.close()
+
+    project, classification = _open(rom, tmp_path / "projects")
+    assert (classification.state[:2560] == UNKNOWN).all()
+    assert (classification.state[2560:3072] == DATA | CONFIRMED).all()
+    assert (classification.state[3072:4096] == UNKNOWN).all()
+    project.close()
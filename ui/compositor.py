@@ -0,0 +1,123 @@
+# --- Retained-layer compositor for the 1x virtual screen ---
+# Static chrome is rendered once into a cached background.  Each frame the
+# screen restores that background, draws its live widgets and reports them
+# with track(); present() then compares against the previous frame and only
+# rescales / pushes the regions that actually changed, using
+# pygame.display.update(rects) instead of a full flip.
+import pygame
+from core import profiler
+
+# Past this fraction of the virtual screen a single full blit is cheaper
+# than many small scaled ones
+FULL_REDRAW_RATIO = 0.6
+
+
+class Compositor:
+    def __init__(self, size):
+        self.size = size
+        self.background = None
+        self._bg_key = None
+        self._prev_widgets = {}
+        self._widgets = {}
+        self._extra_dirty = []
+        self._full = True
+        self._present_key = None
+
+    # --- Static layer ---
+    def background_for(self, key, render):
+        # render(surface) draws the static chrome; only re-run when key changes
+        if self.background is None or key != self._bg_key:
+            self.background = pygame.Surface(self.size)
+            render(self.background)
+            self._bg_key = key
+            self._full = True
+        return self.background
+
+    def reset(self):
+        # Drop the background (e.g. the chrome surfaces were reloaded)
+        self.background = None
+        self._bg_key = None
+        self._prev_widgets = {}
+        self._full = True
+
+    def invalidate(self, rect=None):
+        # Force a region (or, with no rect, the whole window) to be pushed
+        if rect is None:
+            self._full = True
+        else:
+            self._extra_dirty.append(pygame.Rect(rect))
+
+    # --- Per-frame ---
+    def begin(self, screen):
+        screen.blit(self.background, (0, 0))
+        self._widgets = {}
+
+    def track(self, key, rect, state=None):
+        # Record a live widget: its 1x rect and whatever decides its look
+        self._widgets[key] = (pygame.Rect(rect), state)
+
+    def _collect_dirty(self):
+        dirty = list(self._extra_dirty)
+        for key, (rect, state) in self._widgets.items():
+            prev = self._prev_widgets.get(key)
+            if prev is None:
+                dirty.append(rect)
+            elif prev[0] != rect or prev[1] != state:
+                dirty.append(rect)
+                dirty.append(prev[0])
+        for key, (rect, _) in self._prev_widgets.items():
+            if key not in self._widgets:
+                dirty.append(rect)
+        self._prev_widgets = self._widgets
+        self._extra_dirty = []
+        return dirty
+
+    def _merge(self, rects):
+        bounds = pygame.Rect((0, 0), self.size)
+        merged = []
+        for r in rects:
+            r = r.clip(bounds)
+            if r.width <= 0 or r.height <= 0:
+                continue
+            # Fold in anything this rect touches until it is stable
+            i = 0
+            while i < len(merged):
+                if merged[i].colliderect(r):
+                    r = r.union(merged.pop(i))
+                    i = 0
+                else:
+                    i += 1
+            merged.append(r)
+        return merged
+
+    @profiler.timed("present")
+    def present(self, real_screen, screen, scale):
+        real_w, real_h = real_screen.get_size()
+        surf_w, surf_h = self.size[0] * scale, self.size[1] * scale
+        offset_x = (real_w - surf_w) // 2
+        offset_y = (real_h - surf_h) // 2
+
+        dirty = self._merge(self._collect_dirty())
+        present_key = (real_w, real_h, scale)
+        if present_key != self._present_key:
+            self._present_key = present_key
+            self._full = True
+
+        area = sum(r.width * r.height for r in dirty)
+        if self._full or area > self.size[0] * self.size[1] * FULL_REDRAW_RATIO:
+            self._full = False
+            real_screen.fill((0, 0, 0))  # Black bars
+            real_screen.blit(pygame.transform.scale(screen, (surf_w, surf_h)), (offset_x, offset_y))
+            pygame.display.flip()
+            return
+
+        if not dirty:
+            return
+        update_rects = []
+        for r in dirty:
+            # Integer nearest-neighbour scaling, so a scaled sub-rect matches
+            # the same pixels of a full-screen scale exactly
+            scaled = pygame.transform.scale(screen.subsurface(r), (r.width * scale, r.height * scale))
+            dest = (offset_x + r.x * scale, offset_y + r.y * scale)
+            update_rects.append(real_screen.blit(scaled, dest))
+        pygame.display.update(update_rects)
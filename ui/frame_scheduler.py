@@ -0,0 +1,110 @@
+# --- Render-on-demand frame scheduler ---
+# Replaces the fixed clock.tick(60) loops: when nothing changed the loop
+# blocks in pygame.event.wait() instead of redrawing, and only wakes up for
+# input, window events, requested redraws or timers (e.g. tooltip delays).
+# While the window is minimized nothing is drawn at all, and while it is
+# unfocused the frame rate cap drops.
+#
+# Typical loop:
+#     events = scheduler.poll()
+#     ...handle events...
+#     if scheduler.should_draw():
+#         ...draw + present...
+#         scheduler.frame_done()
+import pygame
+
+ACTIVE_FPS = 60
+BACKGROUND_FPS = 15
+IDLE_TIMEOUT = 1000     # ms; wake up now and then even with nothing to do
+HIDDEN_TIMEOUT = 5000   # ms; while minimized
+
+
+def _event_type(name):
+    # Window events differ between pygame versions; missing ones just never match
+    return getattr(pygame, name, -1)
+
+
+class FrameScheduler:
+    def __init__(self, fps=ACTIVE_FPS, background_fps=BACKGROUND_FPS):
+        self.fps = fps
+        self.background_fps = background_fps
+        self.clock = pygame.time.Clock()
+        self.redraw = True
+        self.minimized = False
+        self.focused = True
+        self.became_visible = False   # set by poll() when the window came back
+        self._deadline = None
+
+    # --- Wake-up sources ---
+    def request_redraw(self):
+        self.redraw = True
+
+    def wake_at(self, ticks):
+        # Redraw once pygame.time.get_ticks() reaches ticks
+        if self._deadline is None or ticks < self._deadline:
+            self._deadline = ticks
+
+    def wake_in(self, ms):
+        self.wake_at(pygame.time.get_ticks() + ms)
+
+    def set_minimized(self, minimized=True):
+        self.minimized = minimized
+        if not minimized:
+            self.redraw = True
+
+    # --- Loop hooks ---
+    def _timeout(self):
+        if self.minimized:
+            return HIDDEN_TIMEOUT
+        if self._deadline is not None:
+            return max(1, min(IDLE_TIMEOUT, self._deadline - pygame.time.get_ticks()))
+        return IDLE_TIMEOUT
+
+    def _timer_due(self):
+        return self._deadline is not None and pygame.time.get_ticks() >= self._deadline
+
+    def _track_window(self, event):
+        if event.type == _event_type("WINDOWMINIMIZED") or event.type == _event_type("WINDOWHIDDEN"):
+            self.minimized = True
+        elif event.type in (_event_type("WINDOWRESTORED"), _event_type("WINDOWSHOWN"),
+                            _event_type("WINDOWMAXIMIZED"), _event_type("WINDOWEXPOSED")):
+            if self.minimized:
+                self.became_visible = True
+            self.minimized = False
+        elif event.type == _event_type("WINDOWFOCUSLOST"):
+            self.focused = False
+        elif event.type == _event_type("WINDOWFOCUSGAINED"):
+            self.focused = True
+        elif event.type == pygame.ACTIVEEVENT:
+            # Legacy SDL1-style notification: state 2 = input focus, 4 = iconified
+            if event.state & 4:
+                if event.gain and self.minimized:
+                    self.became_visible = True
+                self.minimized = not event.gain
+            elif event.state & 2:
+                self.focused = bool(event.gain)
+
+    def poll(self):
+        # Returns this iteration's events, blocking while there is nothing to do
+        self.became_visible = False
+        events = pygame.event.get()
+        if not events and not self.redraw and not self._timer_due():
+            event = pygame.event.wait(self._timeout())
+            if event.type != pygame.NOEVENT:
+                events = [event] + pygame.event.get()
+        for event in events:
+            self._track_window(event)
+        if events:
+            self.redraw = True
+        if self._timer_due():
+            self._deadline = None
+            self.redraw = True
+        return events
+
+    def should_draw(self):
+        return self.redraw and not self.minimized
+
+    def frame_done(self):
+        # Call after presenting; caps the frame rate while input keeps coming
+        self.redraw = False
+        self.clock.tick(self.fps if self.focused else self.background_fps)
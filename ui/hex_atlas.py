@@ -0,0 +1,72 @@
+# --- Pre-rendered hex glyph atlas ---
+# One surface holding every byte value as a two-digit hex pair and as a
+# character (printable ASCII, else "."), once per color, rendered through
+# the normal bitmap-font path.  A hex dump row then becomes a list of
+# (atlas, dest, area) entries for Surface.blits() with no text rendering
+# per frame.  Pairs sit in fixed-width cells so columns line up even with
+# a proportional font.
+#
+# Atlases are converted to the display format, so they are dropped with
+# core.asset_cache on display mode changes.
+import pygame
+from ui import elements
+from core.asset_cache import on_invalidate
+
+_atlases = {}
+
+
+class HexAtlas:
+    def __init__(self, font_img, font_cmap, colors, scale=1):
+        self.colors = [tuple(c) for c in colors]
+        widths = [elements.get_text_width("%02X" % v, font_img, font_cmap, scale) for v in range(256)]
+        char_widths = [elements.get_text_width(_char(v), font_img, font_cmap, scale) for v in range(256)]
+        self.cell_w = max(widths)
+        self.char_w = max(char_widths)
+        self.cell_h = font_img.get_height() * scale
+        # Layout: one band per color, each band = a row of hex cells over a row of char cells
+        band_h = self.cell_h * 2
+        self.surface = pygame.Surface((256 * max(self.cell_w, self.char_w), band_h * len(self.colors)), pygame.SRCALPHA)
+        stride = max(self.cell_w, self.char_w)
+        self._hex = []
+        self._char = []
+        for ci, color in enumerate(self.colors):
+            y = ci * band_h
+            hex_rects = []
+            char_rects = []
+            for v in range(256):
+                x = v * stride
+                elements.draw_text(self.surface, "%02X" % v, x + self.cell_w - widths[v], y,
+                                   font_img, font_cmap, color=color, scale=scale)
+                elements.draw_text(self.surface, _char(v), x + (self.char_w - char_widths[v]) // 2, y + self.cell_h,
+                                   font_img, font_cmap, color=color, scale=scale)
+                hex_rects.append(pygame.Rect(x, y, self.cell_w, self.cell_h))
+                char_rects.append(pygame.Rect(x, y + self.cell_h, self.char_w, self.cell_h))
+            self._hex.append(hex_rects)
+            self._char.append(char_rects)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+
+    def hex_area(self, color_index, value):
+        return self._hex[color_index][value]
+
+    def char_area(self, color_index, value):
+        return self._char[color_index][value]
+
+
+def _char(value):
+    return chr(value) if 0x20 <= value < 0x7F else "."
+
+
+def get_atlas(font_img, font_cmap, colors, scale=1):
+    key = (font_img, tuple(tuple(c) for c in colors), scale)
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = _atlases[key] = HexAtlas(font_img, font_cmap, colors, scale)
+    return atlas
+
+
+def clear():
+    _atlases.clear()
+
+
+on_invalidate(clear)
@@ -0,0 +1,126 @@
+# --- Cached 9-slice / 3-slice panels ---
+# Drop-in replacements for the ui.elements slice helpers.  Each distinct
+# (kind, source image, size, slice args, state) combination is composed once
+# through ui.elements into a finished surface and reused afterwards, so a
+# panel that keeps its geometry costs a single blit per frame.
+#
+# Composed panels are converted to the display format, so the cache is
+# flushed together with core.asset_cache (i.e. on display mode / scale
+# changes).
+from collections import OrderedDict
+import pygame
+from ui import elements
+from core import profiler
+from core.asset_cache import on_invalidate
+
+MAX_PANELS = 256
+
+_panels = OrderedDict()
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+
+def _compose(key, size, draw):
+    entry = _panels.get(key)
+    if entry is not None:
+        _panels.move_to_end(key)
+        _stats["hits"] += 1
+        return entry
+    _stats["misses"] += 1
+
+    scratch = pygame.Surface((max(1, size[0]), max(1, size[1])), pygame.SRCALPHA)
+    draw(scratch)
+    # 3-slices may draw less than the scratch area (e.g. one row of a state
+    # sheet), so keep only the painted part plus its offset
+    bounds = scratch.get_bounding_rect()
+    if bounds.width == 0 or bounds.height == 0:
+        entry = (None, (0, 0))
+    else:
+        panel = scratch.subsurface(bounds).copy()
+        if pygame.display.get_surface() is not None:
+            panel = panel.convert_alpha()
+        entry = (panel, bounds.topleft)
+
+    _panels[key] = entry
+    if len(_panels) > MAX_PANELS:
+        _panels.popitem(last=False)
+        _stats["evictions"] += 1
+    return entry
+
+
+def _blit(surface, entry, x, y):
+    panel, (ox, oy) = entry
+    if panel is not None:
+        surface.blit(panel, (x + ox, y + oy))
+
+
+def _key(kind, img, size, args, kwargs):
+    return (kind, img, size, args, tuple(sorted(kwargs.items())))
+
+
+@profiler.timed("slice")
+def draw_9slice(surface, x, y, w, h, img, *args, **kwargs):
+    entry = _compose(
+        _key("9slice", img, (w, h), args, kwargs), (w, h),
+        lambda s: elements.draw_9slice(s, 0, 0, w, h, img, *args, **kwargs))
+    _blit(surface, entry, x, y)
+
+
+@profiler.timed("slice")
+def draw_3slice_h(surface, x, y, w, img, *args, **kwargs):
+    entry = _compose(
+        _key("3slice_h", img, w, args, kwargs), (w, img.get_height()),
+        lambda s: elements.draw_3slice_h(s, 0, 0, w, img, *args, **kwargs))
+    _blit(surface, entry, x, y)
+
+
+@profiler.timed("slice")
+def draw_3slice_v(surface, x, y, h, img, *args, **kwargs):
+    entry = _compose(
+        _key("3slice_v", img, h, args, kwargs), (img.get_width(), h),
+        lambda s: elements.draw_3slice_v(s, 0, 0, h, img, *args, **kwargs))
+    _blit(surface, entry, x, y)
+
+
+@profiler.timed("slice")
+def draw_3slice_button(surface, x, y, w, img, *args, **kwargs):
+    # The button state is part of args/kwargs, so each state is its own entry
+    entry = _compose(
+        _key("3slice_button", img, w, args, kwargs), (w, img.get_height()),
+        lambda s: elements.draw_3slice_button(s, 0, 0, w, img, *args, **kwargs))
+    _blit(surface, entry, x, y)
+
+
+@profiler.timed("slice")
+def draw_9slice_flat(surface, x, y, w, img, csize):
+    # Top and bottom rows of a 9-slice only (no stretched middle), as used by
+    # the tray tooltips: height is always 2 * csize
+    def draw(s):
+        iw, ih = img.get_size()
+        edge_w = iw - 2 * csize
+        for row, sy in ((0, 0), (csize, ih - csize)):
+            s.blit(img.subsurface((0, sy, csize, csize)), (0, row))
+            s.blit(pygame.transform.scale(img.subsurface((csize, sy, edge_w, csize)), (w - 2 * csize, csize)), (csize, row))
+            s.blit(img.subsurface((iw - csize, sy, csize, csize)), (w - csize, row))
+
+    entry = _compose(("9slice_flat", img, w, csize), (w, 2 * csize), draw)
+    _blit(surface, entry, x, y)
+
+
+def clear():
+    _panels.clear()
+
+
+def stats():
+    out = dict(_stats)
+    lookups = _stats["hits"] + _stats["misses"]
+    out["hit_rate"] = _stats["hits"] / lookups if lookups else 0.0
+    out["panels_cached"] = len(_panels)
+    return out
+
+
+on_invalidate(clear)
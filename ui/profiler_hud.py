@@ -0,0 +1,77 @@
+# --- Profiler HUD ---
+# Rolling per-phase frame timings from core.profiler, drawn with the
+# bitmap font in a small translucent box.  F3 toggles it (and the timing
+# behind it), F4 starts / stops a Chrome trace recording; handle_key()
+# does both so every screen shares the same bindings.  Where the trace went
+# (or why it could not be written) is queued for the dashboard's notices,
+# see take_notices().
+#
+# The numbers change every frame, so the lines go through ui.elements
+# directly rather than ui.text_cache: caching them would only push the
+# screens' own text runs out of the LRU.
+import pygame
+from core import profiler
+from ui import elements
+
+PADDING = 3
+LINE_GAP = 1
+BG_COLOR = (0, 0, 0, 170)
+TEXT_COLOR = (160, 255, 160)
+PHASE_COLOR = (220, 220, 220)
+
+visible = False
+_notices = []
+
+
+def handle_key(event):
+    # True when the key was a profiler binding
+    global visible
+    if event.key == pygame.K_F3:
+        visible = not visible
+        profiler.set_enabled(visible)
+        return True
+    if event.key == pygame.K_F4:
+        if profiler.tracing:
+            profiler.stop_trace()
+            profiler.set_enabled(visible)
+            try:
+                path = profiler.dump_trace()
+            except OSError as e:
+                _notices.append("Could not write the trace: %s" % e)  # Kept for the next F4
+            else:
+                _notices.append("Trace written to %s" % path)
+                profiler.clear_trace()
+        else:
+            profiler.start_trace()
+        return True
+    return False
+
+
+def take_notices():
+    # Messages from handle_key() since the last call
+    out = _notices[:]
+    _notices.clear()
+    return out
+
+
+def hud_lines():
+    mean_ms, max_ms, phases = profiler.summary()
+    lines = ["frame %5.2f ms  max %5.2f%s" % (mean_ms, max_ms, "  REC" if profiler.tracing else "")]
+    lines += ["%-8s %5.2f" % (name, ms) for name, ms in phases]
+    return lines
+
+
+def draw_hud(surface, x, y, font_img, font_cmap, scale=1):
+    # Draws the HUD; returns (rect, lines) for compositor.track()
+    lines = hud_lines()
+    line_h = font_img.get_height() + LINE_GAP
+    width = max(elements.get_text_width(line, font_img, font_cmap, 1) for line in lines) + 2 * PADDING
+    height = line_h * len(lines) + 2 * PADDING
+    box = pygame.Surface((width, height), pygame.SRCALPHA)
+    box.fill(BG_COLOR)
+    for i, line in enumerate(lines):
+        elements.draw_text(box, line, PADDING, PADDING + i * line_h, font_img, font_cmap,
+                           color=TEXT_COLOR if i == 0 else PHASE_COLOR, scale=1)
+    if scale != 1:
+        box = pygame.transform.scale(box, (width * scale, height * scale))
+    return surface.blit(box, (x, y)), tuple(lines)
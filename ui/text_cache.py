@@ -0,0 +1,97 @@
+# --- Memoized bitmap-font text ---
+# Drop-in replacements for ui.elements.draw_text / get_text_width.  Each
+# distinct (text, font surface, color, scale, space_px) run is rendered once
+# through ui.elements into a pre-tinted surface, so drawing a string becomes a
+# single blit instead of one blit per glyph.  Widths are memoized the same way.
+# Both caches are bounded LRUs.
+from collections import OrderedDict
+import pygame
+from ui import elements
+from core import profiler
+from core.asset_cache import on_invalidate
+
+MAX_RUNS = 512
+MAX_WIDTHS = 2048
+
+_runs = OrderedDict()
+_widths = OrderedDict()
+
+_stats = {
+    "run_hits": 0,
+    "run_misses": 0,
+    "width_hits": 0,
+    "width_misses": 0,
+    "evictions": 0,
+}
+
+
+def _spacing(space_px):
+    # Only forward space_px when the caller gave one, so ui.elements keeps
+    # its own default otherwise
+    return {} if space_px is None else {"space_px": space_px}
+
+
+def get_text_width(text, font_img, font_cmap, scale=1, space_px=None):
+    key = (text, font_img, scale, space_px)
+    width = _widths.get(key)
+    if width is not None:
+        _widths.move_to_end(key)
+        _stats["width_hits"] += 1
+        return width
+    _stats["width_misses"] += 1
+    width = elements.get_text_width(text, font_img, font_cmap, scale, **_spacing(space_px))
+    _widths[key] = width
+    if len(_widths) > MAX_WIDTHS:
+        _widths.popitem(last=False)
+        _stats["evictions"] += 1
+    return width
+
+
+def render_text(text, font_img, font_cmap, color=(255,255,255), scale=1, space_px=None):
+    # Returns the cached, pre-tinted surface for one single-line string
+    color = tuple(color)
+    key = (text, font_img, color, scale, space_px)
+    run = _runs.get(key)
+    if run is not None:
+        _runs.move_to_end(key)
+        _stats["run_hits"] += 1
+        return run
+    _stats["run_misses"] += 1
+    width = get_text_width(text, font_img, font_cmap, scale, space_px)
+    height = font_img.get_height() * scale
+    run = pygame.Surface((max(1, width), max(1, height)), pygame.SRCALPHA)
+    elements.draw_text(run, text, 0, 0, font_img, font_cmap, color=color, scale=scale, **_spacing(space_px))
+    if pygame.display.get_surface() is not None:
+        run = run.convert_alpha()
+    _runs[key] = run
+    if len(_runs) > MAX_RUNS:
+        _runs.popitem(last=False)
+        _stats["evictions"] += 1
+    return run
+
+
+@profiler.timed("text")
+def draw_text(surface, text, x, y, font_img, font_cmap, color=(255,255,255), scale=1, space_px=None):
+    if not text:
+        return
+    if "\n" in text:
+        # Multi-line layout stays with ui.elements (line spacing lives there)
+        elements.draw_text(surface, text, x, y, font_img, font_cmap, color=color, scale=scale, **_spacing(space_px))
+        return
+    surface.blit(render_text(text, font_img, font_cmap, color, scale, space_px), (x, y))
+
+
+def clear():
+    _runs.clear()
+    _widths.clear()
+
+
+def stats():
+    out = dict(_stats)
+    out["runs_cached"] = len(_runs)
+    out["widths_cached"] = len(_widths)
+    return out
+
+
+# Runs are converted to the display format, so flush them with the images
+on_invalidate(_runs.clear)
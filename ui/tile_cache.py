@@ -0,0 +1,94 @@
+# --- Cached tile sheets ---
+# A sheet is a block of decoded tiles (SHEET_COLUMNS x SHEET_ROWS) turned
+# into one display-format surface.  Two bounded LRUs:
+#   indexed: (source, offset, format, zoom) -> 8-bit surface of palette
+#            indices, built once via core.tiles and pygame.surfarray
+#   sheets:  the same key + palette -> that surface with the palette set
+#            (a 256-entry lookup table) and converted for display
+# so scrolling back over graphics already seen is pure blits, and trying
+# another palette on a sheet re-maps indices without decoding tiles again.
+#
+# Sheets are converted to the display format, so the cache is flushed
+# together with core.asset_cache.
+from collections import OrderedDict
+import numpy as np
+import pygame
+from core.asset_cache import on_invalidate
+from core.tiles import FORMATS, decode, sheet
+
+SHEET_COLUMNS = 16
+SHEET_ROWS = 16
+MAX_SHEETS = 64
+MAX_INDEXED = 64
+
+_sheets = OrderedDict()
+_indexed = OrderedDict()
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "decodes": 0,
+}
+
+
+def gray_palette(bpp):
+    # Even ramp from black to white; the stand-in when no real palette is known
+    count = 1 << bpp
+    return tuple((v, v, v) for v in (i * 255 // (count - 1) for i in range(count)))
+
+
+def sheet_bytes(fmt):
+    return FORMATS[fmt].tile_bytes * SHEET_COLUMNS * SHEET_ROWS
+
+
+def get_sheet(data, source, offset, fmt, palette, zoom=1):
+    # source: any hashable naming data (the ROM, a decompressed block)
+    key = (source, offset, fmt, palette, zoom)
+    surface = _sheets.get(key)
+    if surface is not None:
+        _sheets.move_to_end(key)
+        _stats["hits"] += 1
+        return surface
+    _stats["misses"] += 1
+
+    indexed = _get_indexed(data, source, offset, fmt, zoom)
+    indexed.set_palette(list(palette[:256]) + [(0, 0, 0)] * (256 - min(256, len(palette))))
+    surface = indexed.convert() if pygame.display.get_surface() is not None else indexed.copy()
+
+    _sheets[key] = surface
+    if len(_sheets) > MAX_SHEETS:
+        _sheets.popitem(last=False)
+        _stats["evictions"] += 1
+    return surface
+
+
+def _get_indexed(data, source, offset, fmt, zoom):
+    key = (source, offset, fmt, zoom)
+    surface = _indexed.get(key)
+    if surface is not None:
+        _indexed.move_to_end(key)
+        return surface
+    _stats["decodes"] += 1
+    indices = sheet(decode(data, offset, SHEET_COLUMNS * SHEET_ROWS, fmt), SHEET_COLUMNS)
+    surface = pygame.surfarray.make_surface(np.ascontiguousarray(indices.T))
+    if zoom != 1:
+        surface = pygame.transform.scale(surface, (surface.get_width() * zoom, surface.get_height() * zoom))
+    _indexed[key] = surface
+    if len(_indexed) > MAX_INDEXED:
+        _indexed.popitem(last=False)
+    return surface
+
+
+def clear():
+    _sheets.clear()
+    _indexed.clear()
+
+
+def stats():
+    out = dict(_stats)
+    out["sheets_cached"] = len(_sheets)
+    return out
+
+
+on_invalidate(clear)